@@ -0,0 +1,9 @@
+"""Benchmarks for the email summary pipeline.
+
+Run from the email_summary_function directory, e.g.::
+
+    python -m benchmarks.bench_keywords
+
+``bench_pipeline`` times every stage on mailboxes from ``synthetic.py`` and
+writes the results as JSON for comparing runs over time.
+"""
@@ -0,0 +1,79 @@
+"""Input adapters: per-email shape probing vs the adapter detected once per payload.
+
+    python -m benchmarks.bench_adapters --emails 100000
+    python -m benchmarks.bench_adapters --mail ~/exports/inbox.mbox --owner me@example.com
+
+The payloads are ``synthetic.py`` inbox mail with every sender rewritten
+to one shape, Graph or Power Automate.  With ``--mail`` the ``.eml`` / mbox files are read with
+``mailfiles.iter_mail_files`` and run through the whole pipeline instead,
+timing the read, classification and rendering separately.
+"""
+import argparse
+import logging
+import time
+
+from benchmarks import synthetic
+from shared_code import adapters, mailfiles, render
+from shared_code.classify import Classifier
+from shared_code.records import parse_sender
+
+
+def make_emails(count, seed, shape):
+    emails = []
+    for email in synthetic.iter_folder('inbox', count, seed):
+        _, _, name, address = parse_sender(email)
+        email.pop('sender', None)
+        if shape == 'graph':
+            email['from'] = {'emailAddress': {'name': name, 'address': address}}
+        else:
+            email['from'] = address
+        emails.append(('inbox', email))
+    return emails
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_shapes(count, seed):
+    print(f"{'payload':>15} {'generic s':>10} {'adapter s':>10}")
+    for shape in ('graph', 'power_automate'):
+        emails = make_emails(count, seed, shape)
+        generic_time, expected = timed(Classifier(adapter=adapters.GENERIC).feed, emails)
+        adapter_time, result = timed(Classifier().feed, emails)
+        assert result.adapter.name == shape
+        assert ([list(r.participants.values()) for r in result.important_inbox]
+                == [list(r.participants.values()) for r in expected.important_inbox])
+        print(f"{shape:>15} {generic_time:>10.3f} {adapter_time:>10.3f}")
+
+
+def bench_mail(paths, owner):
+    read_time, emails = timed(list, mailfiles.iter_mail_files(paths, owner=owner))
+    classify_time, classifier = timed(Classifier().feed, emails)
+    render_time, report = timed(render.render_report, classifier)
+    print(f"{len(emails)} messages ({classifier.inbox_seen} inbox, {classifier.sent_seen} sent), "
+          f"{classifier.important_messages} important, {len(classifier.old_sent_emails)} awaiting a reply")
+    print(f"read {read_time:.3f}s, classify {classify_time:.3f}s, render {render_time:.3f}s "
+          f"({len(report.encode('utf-8')) / 2**20:.1f} MiB)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--mail', nargs='+', help='.eml / mbox files or directories to replay')
+    parser.add_argument('--owner', help='address whose messages count as sent')
+    args = parser.parse_args(argv)
+    # The synthetic mailboxes have broken dates on purpose
+    logging.disable(logging.WARNING)
+
+    if args.mail:
+        bench_mail(args.mail, args.owner)
+    else:
+        bench_shapes(args.emails, args.seed)
+
+
+if __name__ == '__main__':
+    main()
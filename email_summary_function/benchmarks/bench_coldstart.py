@@ -0,0 +1,122 @@
+"""Cold start of the function module, checked against a budget.
+
+    python -m benchmarks.bench_coldstart
+    python -m benchmarks.bench_coldstart --update
+
+Every run starts fresh interpreters, as a cold worker does:
+
+* ``python -X importtime -c "import shared_code.pipeline"`` - the cumulative
+  import time of the pipeline (``azure.functions`` is the host's and not
+  counted)
+* a process that imports the pipeline and handles one ``process_emails``
+  request of a ``--emails`` synthetic payload with the default settings
+
+The medians of ``--runs`` runs are compared with ``coldstart_budget.json``
+next to this file; the script exits with status 1 if either is over budget,
+or if the first request loaded a module that should stay lazy
+(``LAZY_MODULES``).  ``--update`` writes the current medians, with
+``--headroom``, as the new budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks import synthetic
+
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'coldstart_budget.json')
+FUNCTION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed by some requests; loading them on every cold start is a regression.
+# (email.utils is lazy too, but the synthetic payload's broken dates need it.)
+LAZY_MODULES = ('multiprocessing', 'concurrent.futures.process', 'sqlite3', 'mailbox', 'email.parser',
+                'tempfile', 'shared_code.batch', 'shared_code.state', 'shared_code.mailfiles',
+                'shared_code.aio')
+
+FIRST_REQUEST = """
+import json, sys, time
+start = time.perf_counter()
+from shared_code import pipeline
+imported = time.perf_counter()
+with open(sys.argv[1], 'rb') as f:
+    body = f.read()
+response = pipeline.handle_emails(body, {}, pipeline.settings_from_env({}))
+done = time.perf_counter()
+print(json.dumps({
+    'status': response.status_code,
+    'first_request_ms': (done - imported) * 1000,
+    'loaded': [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+"""
+
+
+def import_time_ms():
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import shared_code.pipeline'],
+                            cwd=FUNCTION_DIR, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        # "import time: <self us> | <cumulative us> | <indented name>"
+        _, cumulative, name = line.rsplit('|', 2)
+        if name.strip() == 'shared_code.pipeline':
+            return int(cumulative) / 1000
+    raise RuntimeError('shared_code.pipeline missing from -X importtime output')
+
+
+def first_request(payload_path):
+    result = subprocess.run([sys.executable, '-c', FIRST_REQUEST, payload_path, json.dumps(LAZY_MODULES)],
+                            cwd=FUNCTION_DIR, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=500)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--update', action='store_true', help='write the measured medians as the new budget')
+    parser.add_argument('--headroom', type=float, default=2.0, help='budget = median * headroom with --update')
+    args = parser.parse_args(argv)
+
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+        synthetic.write_payload(f, args.emails)
+        payload_path = f.name
+    try:
+        imports, requests, loaded = [], [], set()
+        for _ in range(args.runs):
+            imports.append(import_time_ms())
+            run = first_request(payload_path)
+            if run['status'] != 200:
+                raise SystemExit(f"first request failed with status {run['status']}")
+            requests.append(run['first_request_ms'])
+            loaded.update(run['loaded'])
+    finally:
+        os.remove(payload_path)
+
+    measured = {'import_ms': statistics.median(imports), 'first_request_ms': statistics.median(requests)}
+    if args.update:
+        budget = {name: round(value * args.headroom, 1) for name, value in measured.items()}
+        budget['emails'] = args.emails
+        with open(BUDGET_FILE, 'w', encoding='utf-8') as f:
+            json.dump(budget, f, indent=2)
+            f.write('\n')
+        print(f"Budget written to {BUDGET_FILE}: {budget}")
+        return
+
+    with open(BUDGET_FILE, encoding='utf-8') as f:
+        budget = json.load(f)
+    failed = False
+    for name, value in measured.items():
+        over = value > budget[name]
+        failed |= over
+        print(f"{name:>17} {value:>8.1f} ms  budget {budget[name]:>8.1f} ms  {'OVER' if over else 'ok'}")
+    if loaded:
+        failed = True
+        print(f"Loaded on the first request, should be lazy: {', '.join(sorted(loaded))}")
+    if budget.get('emails') != args.emails:
+        print(f"Note: the budget was recorded with --emails {budget.get('emails')}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
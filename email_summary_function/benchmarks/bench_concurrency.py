@@ -0,0 +1,92 @@
+"""Throughput of the sync and async pipelines under concurrent requests.
+
+    python -m benchmarks.bench_concurrency --emails 2000 --requests 32 --concurrency 1 4 8
+
+Every request gets its own synthetic payload (a different seed), so the
+response cache never hits; the memo is off for the same reason.  Paths:
+
+* ``sync`` - ``pipeline.handle_emails`` on a thread pool of
+  ``--concurrency`` threads, which is how the Functions host runs a sync
+  ``main``
+* ``async-thread`` - ``aio.handle_emails_async`` with at most
+  ``--concurrency`` requests in flight, classifying on the loop's thread pool
+* ``async-process`` - the same on a process pool of ``--workers``
+
+Threads share the GIL, so only the process pool adds CPU; the async paths
+mainly keep the worker responsive while requests wait on I/O.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import synthetic
+from shared_code import aio, parallel, pipeline
+
+
+def make_settings():
+    return pipeline.settings_from_env({
+        'EMAIL_SUMMARY_RESPONSE_CACHE': 'off',
+        'EMAIL_SUMMARY_MEMO_ENTRIES': '0',
+        'EMAIL_SUMMARY_PARALLEL_THRESHOLD': '0',
+    })
+
+
+def run_sync(bodies, settings, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(lambda body: pipeline.handle_emails(body, {}, settings), bodies))
+
+
+def run_async(bodies, settings, concurrency, executor):
+    async def run_all():
+        hooks = aio.AsyncHooks(settings)
+        in_flight = asyncio.Semaphore(concurrency)
+
+        async def one(body):
+            async with in_flight:
+                return await aio.handle_emails_async(body, {}, settings, hooks, executor)
+        return await asyncio.gather(*(one(body) for body in bodies))
+    return asyncio.run(run_all())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=2000, help='emails per request')
+    parser.add_argument('--requests', type=int, default=32)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--workers', type=int, default=max(2, os.cpu_count() or 1))
+    args = parser.parse_args(argv)
+    # The synthetic mailboxes have broken dates on purpose
+    logging.disable(logging.WARNING)
+
+    settings = make_settings()
+    bodies = [synthetic.make_payload(args.emails, seed=seed) for seed in range(args.requests)]
+    pool = parallel.get_pool('process', args.workers)
+    # Warm the pool up so worker start-up is not counted
+    run_async(bodies[:args.workers], settings, args.workers, pool)
+
+    paths = {
+        'sync': lambda concurrency: run_sync(bodies, settings, concurrency),
+        'async-thread': lambda concurrency: run_async(bodies, settings, concurrency, None),
+        'async-process': lambda concurrency: run_async(bodies, settings, concurrency, pool),
+    }
+    print(f"{args.requests} requests of {args.emails} emails, {args.workers} pool workers, {os.cpu_count()} CPUs")
+    print(f"{'concurrency':>11} " + ' '.join(f"{name + ' req/s':>18}" for name in paths))
+    for concurrency in args.concurrency:
+        rates = []
+        for name, run in paths.items():
+            start = time.perf_counter()
+            responses = run(concurrency)
+            seconds = time.perf_counter() - start
+            failed = [r.status_code for r in responses if r.status_code != 200]
+            if failed:
+                raise SystemExit(f"{name}: {len(failed)} requests failed")
+            rates.append(args.requests / seconds)
+        print(f"{concurrency:>11} " + ' '.join(f"{rate:>18.1f}" for rate in rates))
+    parallel.shutdown_pools()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Date checks: the original per-row ``fromisoformat`` + ``datetime.now()`` vs ``dates``.
+
+    python -m benchmarks.bench_dates --count 100000
+
+The timestamps are the ``receivedDateTime`` of ``synthetic.py`` inbox mail:
+``Z`` with and without Graph's seven-digit fractions, UTC offsets, and a
+few broken ones.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import synthetic
+from shared_code.dates import Clock, parse_timestamp
+
+
+def make_timestamps(count, seed):
+    return [email.get('receivedDateTime', '') for email in synthetic.iter_folder('inbox', count, seed)]
+
+
+def legacy(timestamps):
+    # As process_emails.main did it for every row
+    older = errors = 0
+    for date_str in timestamps:
+        try:
+            parsed = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+            if parsed.replace(tzinfo=None) < datetime.now() - timedelta(days=1):
+                older += 1
+        except ValueError:
+            errors += 1
+    return older, errors
+
+
+def current(timestamps):
+    clock = Clock()
+    older = errors = 0
+    for date_str in timestamps:
+        try:
+            if clock.is_older_than(parse_timestamp(date_str), 1):
+                older += 1
+        except ValueError:
+            errors += 1
+    return older, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    timestamps = make_timestamps(args.count, args.seed)
+    print(f"{'path':>8} {'time s':>8} {'older':>8} {'errors':>8}")
+    for name, func in (('legacy', legacy), ('dates', current)):
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            older, errors = func(timestamps)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>8} {best:>8.3f} {older:>8} {errors:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Duplicate suppression on a notification-heavy mailbox, per ``dedup`` mode.
+
+    python -m benchmarks.bench_dedup --emails 10000 100000 --alerts 0.3
+
+The synthetic mailbox gets ``--alerts`` (a share of the inbox) of repeated
+notifications, each in a conversation of its own as Graph delivers them:
+identical CI alerts, build failures that differ only in build and step
+numbers, and a digest with one word swapped.  With the row limits off, the
+report grows with the rows left after folding duplicates.
+"""
+import argparse
+import logging
+import random
+import time
+
+from benchmarks import synthetic
+from shared_code import render
+from shared_code.classify import Classifier
+from shared_code.rules import DEFAULT_RULES, RuleSet
+
+ALERTS = [
+    # (sender, subject, preview): {n} is a number, {w} a word
+    (('CI Bot', 'ci@builds.example.com'), 'Urgent: nightly build failed',
+     'The nightly build of main failed. Open the pipeline for the logs.'),
+    (('CI Bot', 'ci@builds.example.com'), 'Urgent: build {n} failed on main',
+     'Build {n} failed at step {n} of the test-linux job, see run {n} for the full log and artifacts.'),
+    (('Newsletter Service', 'news@service.com'), 'Important: your weekly digest',
+     'This week: {w} tips for the project, release notes for the client dashboard and the team schedule.'),
+]
+
+
+def alert(rnd, index):
+    (name, address), subject, preview = rnd.choice(ALERTS)
+
+    def fill(text):
+        while '{n}' in text:
+            text = text.replace('{n}', str(rnd.randint(1, 99999)), 1)
+        return text.replace('{w}', rnd.choice(synthetic.WORDS))
+    return {
+        'id': f"AAMkalert{index:08d}",
+        'conversationId': f"alert-{index}",
+        'subject': fill(subject),
+        'bodyPreview': fill(preview),
+        'from': {'emailAddress': {'name': name, 'address': address}},
+        'receivedDateTime': synthetic.REFERENCE_NOW.strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+
+
+def make_emails(count, share, seed):
+    rnd = random.Random(seed)
+    emails = list(synthetic.iter_mailbox(count, seed))
+    inbox = sum(1 for folder, _ in emails if folder == 'inbox')
+    alerts = [('inbox', alert(rnd, i)) for i in range(int(inbox * share))]
+    # Spread the alerts through the inbox part of the stream
+    positions = sorted(rnd.randrange(inbox) for _ in alerts)
+    for offset, (position, item) in enumerate(zip(positions, alerts)):
+        emails.insert(position + offset, item)
+    return emails
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--alerts', type=float, default=0.3, help='repeated notifications, as a share of the inbox')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    # The synthetic mailboxes have broken dates on purpose
+    logging.disable(logging.WARNING)
+
+    print(f"{'emails':>8} {'dedup':>6} {'classify s':>11} {'kept':>7} {'rows':>7} {'folded':>7} {'report MiB':>11}")
+    for count in args.emails:
+        emails = make_emails(count, args.alerts, args.seed)
+        for mode in ('off', 'exact', 'near'):
+            rules = RuleSet(dict(DEFAULT_RULES, dedup=mode, limits={'urgent': 0, 'inbox': 0, 'sent': 0}))
+            start = time.perf_counter()
+            classifier = Classifier(rules, now=synthetic.REFERENCE_NOW).feed(emails)
+            seconds = time.perf_counter() - start
+            size = sum(len(piece.encode('utf-8')) for piece in render.iter_report(classifier))
+            print(f"{len(emails):>8} {mode:>6} {seconds:>11.3f} {classifier.important_messages:>7} "
+                  f"{len(classifier.important_inbox):>7} {classifier.important_duplicates:>7} {size / 2**20:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Keyword matching: per-email any() scan vs the compiled KeywordMatcher.
+
+    python -m benchmarks.bench_keywords --emails 10000 100000 --keywords 10 50 100 500
+
+Subjects and previews come from ``synthetic.py``; past the default
+keywords the list is padded with random words, and one email in ten gets
+one of them added to its preview.
+"""
+import argparse
+import random
+import string
+import time
+
+from benchmarks import synthetic
+from shared_code.keywords import KeywordMatcher
+from shared_code.rules import IMPORTANT_KEYWORDS
+
+
+def make_keywords(count, rnd):
+    keywords = list(IMPORTANT_KEYWORDS[:count])
+    while len(keywords) < count:
+        word = ''.join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(4, 12)))
+        keywords.append(word)
+    return keywords
+
+
+def make_emails(count, keywords, seed, rnd):
+    emails = []
+    for email in synthetic.iter_folder('inbox', count, seed):
+        subject = str(email.get('subject', '')).lower()
+        body = str(email.get('bodyPreview', '')).lower()
+        if rnd.random() < 0.1:
+            body += ' ' + rnd.choice(keywords)
+        emails.append((subject, body))
+    return emails
+
+
+def run_any(emails, keywords):
+    # The original per-email path from process_emails.main
+    return sum(1 for subject, body in emails
+               if any(keyword in subject or keyword in body for keyword in keywords))
+
+
+def run_search(emails, matcher):
+    return sum(1 for subject, body in emails if matcher.search(subject, body))
+
+
+def run_find(emails, matcher):
+    return sum(1 for subject, body in emails if matcher.find(subject, body))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--keywords', type=int, nargs='+', default=[10, 50, 100, 500])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    print(f"{'emails':>8} {'keywords':>8} {'any() s':>9} {'search s':>9} {'find s':>9} {'speedup':>8}")
+    for keyword_count in args.keywords:
+        rnd = random.Random(args.seed)
+        keywords = make_keywords(keyword_count, rnd)
+        build_time, matcher = timed(KeywordMatcher, keywords)
+        for email_count in args.emails:
+            emails = make_emails(email_count, keywords, args.seed, rnd)
+            any_time, expected = timed(run_any, emails, keywords)
+            search_time, searched = timed(run_search, emails, matcher)
+            find_time, found = timed(run_find, emails, matcher)
+            assert expected == searched == found, (expected, searched, found)
+            print(f"{email_count:>8} {keyword_count:>8} {any_time:>9.3f} {search_time:>9.3f} "
+                  f"{find_time:>9.3f} {any_time / find_time:>7.1f}x")
+        print(f"{'':>8} {keyword_count:>8} matcher build: {build_time * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
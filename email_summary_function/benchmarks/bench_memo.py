@@ -0,0 +1,76 @@
+"""Classifying a rolling window with and without the per-message memo.
+
+    python -m benchmarks.bench_memo --emails 10000 100000 --new 0.1
+
+Each run classifies a window of already-parsed emails from ``synthetic.py``;
+the second window drops the oldest ``--new`` share and adds as many new
+messages, as a scheduled flow does.  ``cold`` is the second window without a
+memo, ``warm`` with the memo filled by the first.  Parsing is left out, so
+this is the most the memo can save per request.
+"""
+import argparse
+import logging
+import time
+
+from benchmarks import synthetic
+from shared_code.classify import Classifier
+from shared_code.memo import ClassificationMemo
+from shared_code.rules import default_rules
+
+
+def classify(window, rules, memo=None):
+    classifier = Classifier(rules, now=synthetic.REFERENCE_NOW, memo=memo)
+    return classifier.feed(window)
+
+
+def summary(classifier):
+    return ([(r.latest.subject, r.latest.timestamp, r.count) for r in classifier.important_inbox],
+            [r.subject for r in classifier.vip_emails_needing_reply],
+            [r.subject for r in classifier.old_sent_emails])
+
+
+def best_of(repeat, func, *args):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--new', type=float, default=0.1, help='share of new messages in the second window')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    # The synthetic mailboxes have broken dates on purpose
+    logging.disable(logging.WARNING)
+
+    rules = default_rules()
+    print(f"{'emails':>9} {'cold ms':>10} {'warm ms':>10} {'speedup':>8} {'hits':>8}")
+    for count in args.emails:
+        shift = int(count * args.new)
+        emails = list(synthetic.iter_mailbox(count + shift, args.seed))
+        inbox = [item for item in emails if item[0] == 'inbox']
+        sent = [item for item in emails if item[0] == 'sent']
+        inbox_shift = len(inbox) * shift // (count + shift)
+        sent_shift = shift - inbox_shift
+        first = inbox[:len(inbox) - inbox_shift] + sent[:len(sent) - sent_shift]
+        second = inbox[inbox_shift:] + sent[sent_shift:]
+
+        cold, expected = best_of(args.repeat, classify, second, rules)
+        warm = float('inf')
+        for _ in range(args.repeat):
+            memo = ClassificationMemo(max_entries=count)
+            classify(first, rules, memo)
+            seconds, result = best_of(1, classify, second, rules, memo)
+            warm = min(warm, seconds)
+        if summary(result) != summary(expected):
+            raise SystemExit(f"memoized report differs for {count} emails")
+        print(f"{count:>9} {cold * 1000:>10.1f} {warm * 1000:>10.1f} {cold / warm:>7.1f}x {result.memo_hits:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Classification: sequential vs ``parallel.classify_parallel`` on process/thread pools.
+
+    python -m benchmarks.bench_parallel --emails 1000 10000 50000 200000 --workers 4
+
+Mailboxes come from ``synthetic.py``.  The pool is warmed up before
+timing, as it is on a warm function worker.
+The crossover is the smallest payload where the process pool wins; use it
+to pick ``EMAIL_SUMMARY_PARALLEL_THRESHOLD``.
+"""
+import argparse
+import logging
+import os
+import time
+
+from benchmarks import synthetic
+from shared_code import parallel
+from shared_code.classify import Classifier
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def signature(classifier):
+    return ([(row.latest.subject, row.count) for row in classifier.important_inbox],
+            [row.subject for row in classifier.old_sent_emails])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, nargs='+', default=[1_000, 10_000, 50_000, 200_000])
+    parser.add_argument('--workers', type=int, default=max(2, os.cpu_count() or 1))
+    parser.add_argument('--chunk-size', type=int, default=parallel.DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    # The synthetic mailboxes have broken dates on purpose
+    logging.disable(logging.WARNING)
+
+    executors = ('process', 'thread')
+    for executor in executors:
+        # Warm the pools up so worker start-up is not counted
+        parallel.classify_parallel(list(synthetic.iter_mailbox(100, 0)), threshold=1, chunk_size=10,
+                                   executor=executor, workers=args.workers)
+
+    print(f"{'emails':>8} {'sequential s':>13} {'process s':>10} {'thread s':>9}")
+    crossover = None
+    for count in args.emails:
+        emails = list(synthetic.iter_mailbox(count, args.seed))
+        seq_time, expected = timed(Classifier().feed, emails)
+        times = {}
+        for executor in executors:
+            times[executor], result = timed(parallel.classify_parallel, emails, threshold=1,
+                                            chunk_size=args.chunk_size, executor=executor,
+                                            workers=args.workers)
+            assert signature(result) == signature(expected), executor
+        print(f"{count:>8} {seq_time:>13.3f} {times['process']:>10.3f} {times['thread']:>9.3f}")
+        if crossover is None and times['process'] < seq_time:
+            crossover = count
+    parallel.shutdown_pools()
+    print(f"process pool crossover: {crossover if crossover is not None else 'not reached'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Whole pipeline, stage by stage, on synthetic mailboxes; results as JSON.
+
+    python -m benchmarks.bench_pipeline --emails 1000 10000 100000 --output results.json
+    python -m benchmarks.bench_pipeline --emails 1000000 --compare results.json
+
+Stages:
+
+* ``parse`` - streaming the payload with ``ingest.iter_emails`` (and
+  discarding the emails)
+* ``classify`` - parse + ``Classifier.add`` for every email, minus ``parse``
+* ``date_checks`` - ``Classifier.finish`` (VIP reply ages, follow-ups)
+* ``render`` - ``render.render_report``
+
+Payloads come from ``synthetic.py`` and are written to a temporary file
+first, so even 1M emails are parsed as a stream.  ``--compare`` prints the
+change per stage against an earlier results file.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks import synthetic
+from shared_code import ingest, render
+from shared_code.classify import Classifier
+from shared_code.rules import default_rules
+
+STAGES = ('parse', 'classify', 'date_checks', 'render')
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def best_of(repeat, func, *args):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def parse_only(path):
+    with open(path, 'rb') as f:
+        return sum(1 for _ in ingest.iter_emails(f))
+
+
+def parse_and_classify(path):
+    classifier = Classifier(default_rules(), now=synthetic.REFERENCE_NOW)
+    with open(path, 'rb') as f:
+        for folder, email in ingest.iter_emails(f):
+            classifier.add(folder, email)
+    return classifier
+
+
+def run(count, seed, repeat):
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+        synthetic.write_payload(f, count, seed)
+        path = f.name
+    try:
+        payload_bytes = os.path.getsize(path)
+        parse_time, _ = best_of(repeat, parse_only, path)
+        parse_classify_time, classifier = best_of(repeat, parse_and_classify, path)
+    finally:
+        os.remove(path)
+    date_time, _ = best_of(1, classifier.finish)
+    render_time, report = best_of(repeat, render.render_report, classifier)
+
+    return {
+        'emails': count,
+        'inbox': classifier.inbox_seen,
+        'sent': classifier.sent_seen,
+        'payload_bytes': payload_bytes,
+        'report_bytes': len(report.encode('utf-8')),
+        'kept': {
+            'important_inbox': classifier.important_messages,
+            'vip_needing_reply': len(classifier.vip_emails_needing_reply) + classifier.urgent_more,
+            'old_sent': len(classifier.old_sent_emails) + classifier.follow_up_more,
+            'date_errors': classifier.date_errors,
+        },
+        'seconds': {
+            'parse': parse_time,
+            'classify': max(parse_classify_time - parse_time, 0.0),
+            'date_checks': date_time,
+            'render': render_time,
+        },
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {run['emails']: run for run in json.load(f)['runs']}
+    print(f"\nvs {baseline_path}")
+    for run in results['runs']:
+        old = baseline.get(run['emails'])
+        if old is None:
+            continue
+        changes = ' '.join(
+            f"{stage} {run['seconds'][stage] / old['seconds'][stage] - 1:+.0%}"
+            for stage in STAGES if old['seconds'].get(stage))
+        print(f"{run['emails']:>9} {changes}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', metavar='RESULTS', help='an earlier --output file to compare with')
+    args = parser.parse_args(argv)
+    # The synthetic mailboxes have broken dates on purpose
+    logging.disable(logging.WARNING)
+
+    results = {
+        'benchmark': 'pipeline',
+        'started': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'runs': [],
+    }
+    print(f"{'emails':>9} " + ' '.join(f"{stage + ' ms':>14}" for stage in STAGES) + f" {'kept':>8}")
+    for count in args.emails:
+        result = run(count, args.seed, args.repeat)
+        results['runs'].append(result)
+        print(f"{count:>9} " + ' '.join(f"{result['seconds'][stage] * 1000:>14.1f}" for stage in STAGES)
+              + f" {result['kept']['important_inbox']:>8}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
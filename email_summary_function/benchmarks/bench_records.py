@@ -0,0 +1,112 @@
+"""Kept-email memory: the original dict rows vs ``records.EmailRecord``.
+
+    python -m benchmarks.bench_records --emails 10000 100000
+
+Every ``synthetic.py`` inbox email is made to match a keyword, so all of
+them are kept.  Both sides stop at the same stage: one row per email, built
+by the original inbox loop (``legacy_row``) or by ``classify_inbox_email``,
+and kept in a list.  The numbers are the time, the memory still held by
+that list and the peak while building it, as traced by ``tracemalloc``.
+Threads, the digest and the ranking of a full ``Classifier`` are left out
+on purpose; they cost the same whatever a row is.
+"""
+import argparse
+import gc
+import logging
+import time
+import tracemalloc
+
+from benchmarks import synthetic
+from shared_code.classify import build_nav_link, classify_inbox_email
+from shared_code.rules import default_rules
+
+
+def make_emails(count, seed):
+    # Synthetic inbox mail, each email made to match a keyword
+    emails = []
+    for email in synthetic.iter_folder('inbox', count, seed):
+        email['subject'] = f"Urgent: {email.get('subject', '')}"
+        emails.append(email)
+    return emails
+
+
+def legacy_row(email, rules):
+    # The dict row the original inbox loop built for every kept email
+    subject = str(email.get('subject', '')).lower()
+    body = str(email.get('bodyPreview', '')).lower()
+    from_field = email.get('from', email.get('sender', ''))
+    sender = ''
+    sender_email = ''
+    if isinstance(from_field, dict):
+        email_address_field = from_field.get('emailAddress', from_field)
+        if isinstance(email_address_field, dict):
+            sender = str(email_address_field.get('name', '')).lower()
+            sender_email = str(email_address_field.get('address', '')).lower()
+        else:
+            sender = str(from_field.get('name', '')).lower()
+            sender_email = str(from_field.get('address', '')).lower()
+    elif isinstance(from_field, str) and from_field:
+        sender_email = from_field.lower()
+        sender = sender_email.split('@')[0].replace('.', ' ').replace('_', ' ')
+
+    vip_rules = rules.match_vip(sender, sender_email)
+    matched_keywords = rules.match_keywords(subject, body)
+    if not (matched_keywords or vip_rules):
+        return None
+    full_preview = email.get('bodyPreview', '')
+    return {
+        'subject': email.get('subject', 'No Subject'),
+        'sender': sender.title() if sender else 'Unknown Sender',
+        'sender_email': from_field if isinstance(from_field, str) and from_field else sender_email,
+        'received': email.get('receivedDateTime', ''),
+        'preview_short': full_preview[:100] + '...' if len(full_preview) > 100 else full_preview,
+        'preview_full': full_preview,
+        'has_long_preview': len(full_preview) > 100,
+        'is_vip': bool(vip_rules),
+        'reply_after_days': min((rule['reply_after_days'] for rule in vip_rules), default=None),
+        'matched_keywords': matched_keywords,
+        'score': rules.keyword_score(matched_keywords) + sum(rule['weight'] for rule in vip_rules),
+        'nav_link': build_nav_link(email),
+        'received_at': 0.0,
+    }
+
+
+def legacy(emails, rules):
+    return [row for row in (legacy_row(email, rules) for email in emails) if row is not None]
+
+
+def records(emails, rules):
+    return [record for record in (classify_inbox_email(email, rules) for email in emails) if record is not None]
+
+
+def measure(func, emails, rules):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = func(emails, rules)
+    seconds = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, current, peak, len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    # The synthetic mailboxes have broken dates on purpose
+    logging.disable(logging.WARNING)
+
+    rules = default_rules()
+    print(f"{'emails':>8} {'row':>8} {'time s':>8} {'held MiB':>9} {'peak MiB':>9} {'B/row':>7}")
+    for count in args.emails:
+        emails = make_emails(count, args.seed)
+        for name, func in (('dict', legacy), ('record', records)):
+            seconds, current, peak, kept = measure(func, emails, rules)
+            print(f"{count:>8} {name:>8} {seconds:>8.3f} {current / 2**20:>9.1f} {peak / 2**20:>9.1f} "
+                  f"{current // max(kept, 1):>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""HTML rendering: the original f-string + ``+=`` report vs ``render.render_report`` / ``spool_report``.
+
+    python -m benchmarks.bench_render --rows 1000 10000 50000
+
+The rows are made from ``synthetic.py`` emails, one row per email.  The
+JSON, text and Adaptive Card formats (``renderers.py``) are timed on the
+same summary.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+
+from benchmarks import synthetic
+from shared_code import render, renderers
+from shared_code.adapters import detect_adapter
+from shared_code.classify import build_nav_link
+from shared_code.dates import try_parse_timestamp
+from shared_code.digest import Digest
+from shared_code.records import EmailRecord, parse_sender
+from shared_code.rules import default_rules
+from shared_code.threads import Conversation, ThreadIndex
+
+
+def inbox_record(email, vip_addresses):
+    _, _, sender, sender_email = parse_sender(email)
+    date = email.get('receivedDateTime', '')
+    return EmailRecord(
+        'inbox',
+        subject=email.get('subject', 'No Subject'),
+        date=date,
+        timestamp=try_parse_timestamp(date),
+        preview=email.get('bodyPreview', ''),
+        nav_link=build_nav_link(email),
+        sender=sender,
+        sender_email=sender_email,
+        is_vip=sender_email in vip_addresses,
+        matched_keywords=['urgent'],
+    )
+
+
+def sent_record(email):
+    return EmailRecord(
+        'sent',
+        subject=email.get('subject', ''),
+        date=email.get('sentDateTime', ''),
+        preview=email.get('bodyPreview', ''),
+        recipients=detect_adapter(email).recipients(email),
+    )
+
+
+def make_summary(rows, seed):
+    # Every synthetic email becomes a row, whether or not the rules would keep it
+    vip_addresses = {address for _, address in synthetic.VIP_SENDERS}
+    inbox = [inbox_record(email, vip_addresses) for email in synthetic.iter_folder('inbox', rows, seed)]
+    sent = [sent_record(email) for email in synthetic.iter_folder('sent', rows // 4, seed)]
+    digest = Digest()
+    for email_data in inbox:
+        digest.add_inbox(email_data)
+    return SimpleNamespace(
+        # Every row its own thread, so both renderers draw the same rows
+        important_inbox=[Conversation(e, 0.0) for e in inbox],
+        important_messages=rows,
+        inbox_seen=rows,
+        sent_seen=rows // 4,
+        vip_emails_needing_reply=[e for e in inbox if e.is_vip],
+        old_sent_emails=sent,
+        important_more=0,
+        urgent_more=0,
+        follow_up_more=0,
+        rules=default_rules(),
+        digest=digest.finish(ThreadIndex()),
+    )
+
+
+def legacy_row(record):
+    # The dict rows the original code built, short preview stored up front
+    row = {
+        'subject': record.subject,
+        'preview_short': record.preview_short,
+        'preview_full': record.preview,
+        'has_long_preview': record.has_long_preview,
+    }
+    if record.folder == 'inbox':
+        row.update(sender=record.sender, sender_email=record.sender_email, received=record.date,
+                   is_vip=record.is_vip, nav_link=record.nav_link)
+    else:
+        row.update(recipients=record.recipients, sent=record.date)
+    return row
+
+
+def legacy_summary(summary):
+    return SimpleNamespace(
+        important_inbox=[legacy_row(c.latest) for c in summary.important_inbox],
+        vip_emails_needing_reply=[legacy_row(e) for e in summary.vip_emails_needing_reply],
+        old_sent_emails=[legacy_row(e) for e in summary.old_sent_emails],
+        rules=summary.rules,
+    )
+
+
+def legacy_render(summary):
+    # The report exactly as process_emails.main used to build it: one big
+    # f-string for the page head followed by += for every row (no escaping).
+    def create_preview_cell(email_data, index):
+        if not email_data.get('has_long_preview', False):
+            return f'<td class="preview-cell">{email_data.get("preview_short", "")}</td>'
+
+        return f'''<td class="preview-cell">
+                <div class="preview-short" id="short-{index}">{email_data.get("preview_short", "")}</div>
+                <div class="preview-full" id="full-{index}" style="display: none;">{email_data.get("preview_full", "")}</div>
+                <span class="read-more-btn" onclick="togglePreview(this, '{index}')">Read More</span>
+            </td>'''
+
+    html_report = f"""<!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <style>{render.STYLE}</style>            <script>{render.SCRIPT}</script>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>📧 Daily Email Summary Report</h1>
+                    <div class="subtitle">Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}</div>
+                </div>
+                <div class="content">
+                    <div class="summary">
+                        <span class="summary-number">{len(summary.important_inbox)}</span>
+                        <span class="summary-number">{len(summary.vip_emails_needing_reply)}</span>
+                        <span class="summary-number">{len(summary.old_sent_emails)}</span>
+                    </div>
+                    <div class="section">
+                        <h2>🚨 URGENT: Sahithi's Emails Needing Reply (>1 day old)</h2>
+        """
+    html_report += """
+            <div class="urgent">
+            <table>"""
+    for i, email in enumerate(summary.vip_emails_needing_reply):
+        open_link = (f'<a href="{email["nav_link"]}" target="_blank" class="email-link urgent-link">Open Email</a>'
+                     if email.get("nav_link") else "N/A")
+        preview_cell = create_preview_cell(email, f"urgent-{i}")
+        html_report += f"""
+                <tr class="sahithi-row">
+                    <td class="subject-cell"><strong>{email['subject']}</strong></td>
+                    <td class="sender-cell"><strong>{email['sender']}</strong></td>
+                    <td class="email-cell">{email['sender_email']}</td>
+                    <td class="date-cell">{email['received']}</td>
+                    {preview_cell}
+                    <td>{open_link}</td>
+                </tr>
+                """
+    html_report += "</table></div>"
+    html_report += "<h2>🔍 All Important Inbox Emails</h2><table>"
+    for i, email in enumerate(summary.important_inbox):
+        row_class = "sahithi-row" if email.get('is_vip') else ""
+        open_link = (f'<a href="{email["nav_link"]}" target="_blank" class="email-link">Open Email</a>'
+                     if email.get("nav_link") else "N/A")
+        preview_cell = create_preview_cell(email, f"inbox-{i}")
+        html_report += f"""
+                <tr class="{row_class}">
+                    <td class="subject-cell">{email['subject']}</td>
+                    <td class="sender-cell">{email['sender']}</td>
+                    <td class="email-cell">{email['sender_email']}</td>
+                    <td class="date-cell">{email['received']}</td>
+                    {preview_cell}
+                    <td>{open_link}</td>
+                </tr>
+                """
+    html_report += "</table>"
+    html_report += "<h2>⏰ Old Sent Emails (Older than 2 days - May need follow-up)</h2><table>"
+    for i, email in enumerate(summary.old_sent_emails):
+        preview_cell = create_preview_cell(email, f"sent-{i}")
+        html_report += f"""
+                <tr>
+                    <td class="subject-cell">{email['subject']}</td>
+                    <td class="sender-cell">{email['recipients']}</td>
+                    <td class="date-cell">{email['sent']}</td>
+                    {preview_cell}
+                </tr>
+                """
+    html_report += "</table></body></html>"
+    return html_report
+
+
+def spool_bytes(summary):
+    # What process_emails returns with EMAIL_SUMMARY_OUTPUT_MODE=spool
+    with render.spool_report(summary) as report_file:
+        return report_file.read()
+
+
+def output_format(name):
+    def render_format(summary):
+        return renderers.render_formats(summary, (name,))[0]
+    return render_format
+
+
+def measure(func, summary, repeat):
+    gc.collect()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        report = func(summary)
+        best = min(best, time.perf_counter() - start)
+    del report
+    gc.collect()
+    tracemalloc.start()
+    report = func(summary)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    size = len(report) if isinstance(report, bytes) else len(report.encode('utf-8'))
+    return best, peak, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 50_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    funcs = [('legacy', legacy_render), ('render', render.render_report), ('spool', spool_bytes)]
+    funcs += [(name, output_format(name)) for name in renderers.RENDERERS if name != 'html']
+    print(f"{'rows':>7} {'renderer':>9} {'time s':>8} {'peak MiB':>9} {'size MiB':>9}")
+    for rows in args.rows:
+        summary = make_summary(rows, args.seed)
+        legacy = legacy_summary(summary)
+        for name, func in funcs:
+            seconds, peak, size = measure(func, legacy if func is legacy_render else summary, args.repeat)
+            print(f"{rows:>7} {name:>9} {seconds:>8.3f} {peak / 2**20:>9.1f} {size / 2**20:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
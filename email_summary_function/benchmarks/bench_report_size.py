@@ -0,0 +1,92 @@
+"""Report sizes in bytes, full page vs mail-safe compact, checked against a budget.
+
+    python -m benchmarks.bench_report_size
+    python -m benchmarks.bench_report_size --update
+
+Seeded synthetic mailboxes of ``--emails`` messages are classified with the
+default rules at ``synthetic.REFERENCE_NOW`` and rendered with
+``render.render_report`` and ``render.render_mail_report``, so the sizes only
+change when the templates or the classification do.  The smallest default
+mailbox gives a report about the size of ``test_output.html``.
+
+The sizes are compared with ``report_size_budget.json`` next to this file;
+the script exits with status 1 if a report is over budget or if the mail
+report carries script (``MAIL_UNSAFE``).  ``--update`` writes the current
+sizes, with ``--headroom``, as the new budget.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+from benchmarks import synthetic
+from shared_code import render
+from shared_code.classify import Classifier
+from shared_code.rules import default_rules
+
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_size_budget.json')
+# Markup a mail client strips or blocks
+MAIL_UNSAFE = ('<script', 'onclick=', 'javascript:')
+
+RENDERERS = [('html', render.render_report), ('mail', render.render_mail_report)]
+
+
+def report_sizes(count, seed):
+    classifier = Classifier(default_rules(), now=synthetic.REFERENCE_NOW).feed(synthetic.iter_mailbox(count, seed))
+    reports = {name: func(classifier, synthetic.REFERENCE_NOW) for name, func in RENDERERS}
+    return classifier, reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, nargs='+', default=[60, 1_000, 20_000])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--update', action='store_true', help='write the measured sizes as the new budget')
+    parser.add_argument('--headroom', type=float, default=1.05, help='budget = size * headroom with --update')
+    args = parser.parse_args(argv)
+    # The synthetic mailboxes have broken dates on purpose
+    logging.disable(logging.WARNING)
+
+    measured, failed = {}, False
+    print(f"{'emails':>7} {'rows':>5} {'html bytes':>11} {'mail bytes':>11} {'mail/html':>9}")
+    for count in args.emails:
+        classifier, reports = report_sizes(count, args.seed)
+        sizes = {name: len(report.encode('utf-8')) for name, report in reports.items()}
+        measured[str(count)] = sizes
+        rows = (len(classifier.vip_emails_needing_reply) + len(classifier.important_inbox)
+                + len(classifier.old_sent_emails))
+        print(f"{count:>7} {rows:>5} {sizes['html']:>11} {sizes['mail']:>11} {sizes['mail'] / sizes['html']:>9.2f}")
+        unsafe = [marker for marker in MAIL_UNSAFE if marker in reports['mail']]
+        if unsafe:
+            failed = True
+            print(f"  mail report contains {', '.join(unsafe)}")
+
+    if args.update:
+        budget = {count: {name: int(size * args.headroom) for name, size in sizes.items()}
+                  for count, sizes in measured.items()}
+        budget['seed'] = args.seed
+        with open(BUDGET_FILE, 'w', encoding='utf-8') as f:
+            json.dump(budget, f, indent=2)
+            f.write('\n')
+        print(f"Budget written to {BUDGET_FILE}")
+        return
+
+    with open(BUDGET_FILE, encoding='utf-8') as f:
+        budget = json.load(f)
+    if budget.get('seed') != args.seed:
+        print(f"Note: the budget was recorded with --seed {budget.get('seed')}")
+    for count, sizes in measured.items():
+        if count not in budget:
+            print(f"Note: no budget for --emails {count}")
+            continue
+        for name, size in sizes.items():
+            if size > budget[count][name]:
+                failed = True
+                print(f"  {name} report of {count} emails is {size} bytes, budget {budget[count][name]}: OVER")
+    print('over budget' if failed else 'ok')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Seeded synthetic mailboxes for the benchmarks.
+
+The same seed always gives the same mailbox.  The mix is meant to look like
+a real one rather than a best case:
+
+* every sender shape the pipeline handles - Graph ``from.emailAddress``,
+  a flat ``from`` object, a plain address string, ``sender`` instead of
+  ``from``, and no sender at all
+* a few VIP senders, keyword hits in subjects and previews, previews up to
+  Graph's 255 characters
+* Graph timestamps with and without seven-digit fractions, UTC offsets,
+  and some missing or broken dates, subjects and previews
+* sent emails sharing conversations with inbox emails, some answered later
+
+Emails are generated lazily and ``write_payload`` streams the JSON, so a
+1M-email mailbox never has to be held in memory.
+"""
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+# Emails are dated within SPAN_DAYS before this time
+REFERENCE_NOW = datetime(2025, 6, 20, 12, 0, tzinfo=timezone.utc)
+SPAN_DAYS = 14
+
+WORDS = ['meeting', 'update', 'project', 'report', 'review', 'client', 'status', 'team',
+         'please', 'tomorrow', 'invoice', 'release', 'notes', 'follow', 'agenda', 'budget',
+         'schedule', 'design', 'draft', 'contract', 'feedback', 'slides', 'demo', 'sprint']
+KEYWORDS = ['akshay', '@sahithin', 'action required', 'important', 'urgent',
+            'deadline', 'asap', 'priority', 'critical', 'time sensitive']
+VIP_SENDERS = [('Sahithi N', 'sahithin@kensium.com')]
+SENDERS = [('John Doe', 'john.doe@example.com'), ('Jane Smith', 'jane_smith@example.com'),
+           ('CI Bot', 'ci@builds.example.com'), ('Newsletter Service', 'news@service.com'),
+           ('Priya R', 'priya.r@client.example.org'), ('Tom Lee', 'tom@partner.example.net')]
+OWNER = ('Akshay', 'akshay@kensium.com')
+
+# Probabilities per email
+VIP_RATE = 0.05
+KEYWORD_RATE = 0.15
+LONG_PREVIEW_RATE = 0.3
+MISSING_FIELD_RATE = 0.02
+BAD_DATE_RATE = 0.005
+SENDER_SHAPES = [('graph', 0.6), ('flat', 0.1), ('string', 0.2), ('sender', 0.05), ('none', 0.05)]
+
+
+def _text(rnd, words):
+    return ' '.join(rnd.choice(WORDS) for _ in range(words))
+
+
+def _timestamp(rnd, now):
+    if rnd.random() < BAD_DATE_RATE:
+        return rnd.choice(['', 'not a date', '2025-13-45T99:00:00Z'])
+    moment = now - timedelta(seconds=rnd.randint(0, SPAN_DAYS * 86400))
+    shape = rnd.random()
+    if shape < 0.5:
+        return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+    if shape < 0.9:
+        return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f"{rnd.randint(0, 9999999):07d}Z"
+    return (moment + timedelta(hours=5, minutes=30)).strftime('%Y-%m-%dT%H:%M:%S+05:30')
+
+
+def _from_fields(rnd, name, address):
+    shape = rnd.choices([s for s, _ in SENDER_SHAPES], [w for _, w in SENDER_SHAPES])[0]
+    if shape == 'graph':
+        return {'from': {'emailAddress': {'name': name, 'address': address}}}
+    if shape == 'flat':
+        return {'from': {'name': name, 'address': address}}
+    if shape == 'string':
+        return {'from': address}
+    if shape == 'sender':
+        return {'sender': {'emailAddress': {'name': name, 'address': address}}}
+    return {}
+
+
+def _email(rnd, index, folder, conversations, now):
+    subject = _text(rnd, rnd.randint(3, 8)).capitalize()
+    preview_words = rnd.randint(25, 40) if rnd.random() < LONG_PREVIEW_RATE else rnd.randint(3, 12)
+    preview = _text(rnd, preview_words)
+    if rnd.random() < KEYWORD_RATE:
+        keyword = rnd.choice(KEYWORDS)
+        if rnd.random() < 0.5:
+            subject = f"{keyword.capitalize()}: {subject}"
+        else:
+            preview = f"{preview} {keyword}"
+    preview = preview[:255]
+
+    conversation = rnd.randrange(conversations)
+    email = {
+        'id': f"AAMk{folder[0]}{index:08d}",
+        'conversationId': f"conv-{conversation}",
+        'subject': ('RE: ' if folder == 'inbox' and rnd.random() < 0.3 else '') + subject,
+        'bodyPreview': preview,
+    }
+    if folder == 'inbox':
+        name, address = rnd.choice(VIP_SENDERS) if rnd.random() < VIP_RATE else rnd.choice(SENDERS)
+        email.update(_from_fields(rnd, name, address))
+        email['receivedDateTime'] = _timestamp(rnd, now)
+        if rnd.random() < 0.5:
+            email['webLink'] = f"https://outlook.office365.com/owa/?ItemID={email['id']}"
+    else:
+        email.update(_from_fields(rnd, *OWNER))
+        email['sentDateTime'] = _timestamp(rnd, now)
+        recipients = rnd.sample(SENDERS + VIP_SENDERS, rnd.randint(1, 3))
+        if 'from' in email and isinstance(email['from'], str):
+            # Power Automate flattens recipients into one string as well
+            email['toRecipients'] = ';'.join(address for _, address in recipients)
+        else:
+            email['toRecipients'] = [{'emailAddress': {'name': name, 'address': address}}
+                                     for name, address in recipients]
+
+    if rnd.random() < MISSING_FIELD_RATE:
+        del email[rnd.choice(['subject', 'bodyPreview', 'id'])]
+    return email
+
+
+def counts(count, sent_ratio=0.25):
+    """``(inbox, sent)`` sizes of a ``count``-email mailbox."""
+    sent = int(count * sent_ratio)
+    return count - sent, sent
+
+
+def iter_folder(folder, count, seed=42, conversations=None, now=REFERENCE_NOW):
+    """Yield ``count`` emails of one folder; each folder has its own stream."""
+    rnd = random.Random(f"{seed}:{folder}")
+    conversations = conversations or max(1, count // 3)
+    for index in range(count):
+        yield _email(rnd, index, folder, conversations, now)
+
+
+def iter_mailbox(count, seed=42, sent_ratio=0.25, now=REFERENCE_NOW):
+    """Yield ``(folder, email)`` pairs: the inbox first, then sent mail."""
+    inbox, sent = counts(count, sent_ratio)
+    conversations = max(1, count // 3)
+    for folder, size in (('inbox', inbox), ('sent', sent)):
+        for email in iter_folder(folder, size, seed, conversations, now):
+            yield folder, email
+
+
+def write_payload(f, count, seed=42, sent_ratio=0.25, now=REFERENCE_NOW):
+    """Stream a ``{"inbox": [...], "sent": [...]}`` payload to a text file."""
+    inbox, sent = counts(count, sent_ratio)
+    conversations = max(1, count // 3)
+    f.write('{')
+    for position, (folder, size) in enumerate((('inbox', inbox), ('sent', sent))):
+        f.write(f'{", " if position else ""}"{folder}": [')
+        for index, email in enumerate(iter_folder(folder, size, seed, conversations, now)):
+            if index:
+                f.write(',\n')
+            f.write(json.dumps(email))
+        f.write(']')
+    f.write('}')
+
+
+def make_payload(count, seed=42, sent_ratio=0.25, now=REFERENCE_NOW):
+    """The payload as bytes; for sizes that fit in memory."""
+    emails = {'inbox': [], 'sent': []}
+    for folder, email in iter_mailbox(count, seed, sent_ratio, now):
+        emails[folder].append(email)
+    return json.dumps(emails).encode('utf-8')
@@ -0,0 +1,18 @@
+import logging
+import azure.functions as func
+
+from shared_code import pipeline
+
+# App settings (EMAIL_SUMMARY_*), read once per worker
+SETTINGS = pipeline.settings_from_env()
+
+
+def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP trigger function processed a batch request.')
+
+    response = pipeline.handle_batch(req.get_body(), req.params, SETTINGS)
+    return func.HttpResponse(
+        response.body,
+        status_code=response.status_code,
+        headers=response.headers
+    )
@@ -0,0 +1,23 @@
+import logging
+import azure.functions as func
+
+from shared_code import aio, pipeline
+
+# App settings (EMAIL_SUMMARY_*), read once per worker
+SETTINGS = pipeline.settings_from_env()
+HOOKS = aio.AsyncHooks(SETTINGS)
+EXECUTOR = aio.get_executor(SETTINGS)
+
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP trigger function processed a request.')
+
+    # Same pipeline as process_emails, but I/O is awaited and classification
+    # runs on an executor, so concurrent invocations share the worker
+    response = await aio.handle_emails_async(req.get_body(), req.params, SETTINGS, HOOKS, EXECUTOR,
+                                            req.headers)
+    return func.HttpResponse(
+        response.body,
+        status_code=response.status_code,
+        headers=response.headers
+    )
@@ -0,0 +1,5 @@
+"""Core email summary pipeline shared by the process_emails function.
+
+Nothing in this package imports azure.functions, so it can be used from
+scripts and benchmarks without the Functions host.
+"""
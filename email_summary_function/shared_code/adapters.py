@@ -0,0 +1,73 @@
+"""Input adapters for the email shapes the function receives.
+
+The payload's shape is detected once, from its first email, and then a
+sender/recipient extractor specialized for that shape is used for every
+email of the request instead of probing each one with ``isinstance``:
+
+* ``graph`` - Microsoft Graph messages, ``from.emailAddress.{name,address}``
+  and ``toRecipients`` as a list of ``emailAddress`` objects
+* ``power_automate`` - the flattened "Get emails (V3)" output, where
+  ``from`` is the address string and ``toRecipients`` a ``;``-separated
+  string
+* ``generic`` - anything else, handled by ``records.parse_sender``
+
+A specialized extractor falls back to the generic one for an email that
+does not have the expected shape, so a mixed payload is still classified
+correctly, just more slowly.
+
+Local ``.eml`` and ``mbox`` mail is converted to the Graph shape by
+``mailfiles.py``, kept apart so the function never imports the ``email``
+package.
+"""
+from collections import namedtuple
+
+from .records import parse_sender, recipient_names
+
+InputAdapter = namedtuple('InputAdapter', 'name sender recipients')
+
+
+def graph_sender(email):
+    try:
+        address_field = email['from']['emailAddress']
+        name = str(address_field.get('name', '')).lower()
+        address = str(address_field.get('address', '')).lower()
+    except (KeyError, TypeError, AttributeError):
+        return parse_sender(email)
+    return name, address, name.title() if name else 'Unknown Sender', address if address else 'unknown@email.com'
+
+
+def power_automate_sender(email):
+    from_field = email.get('from')
+    if not isinstance(from_field, str) or not from_field:
+        return parse_sender(email)
+    address = from_field.lower()
+    # Extract name from email if possible (before @ symbol)
+    name = address.split('@')[0].replace('.', ' ').replace('_', ' ') if '@' in address else address
+    return name, address, name.title() if name else 'Unknown Sender', from_field
+
+
+def power_automate_recipients(email):
+    recipients = email.get('toRecipients')
+    if not isinstance(recipients, str):
+        return recipient_names(email)
+    names = [r.strip() for r in recipients.split(';') if r.strip()]
+    return ', '.join(names) if names else 'Unknown'
+
+
+GRAPH = InputAdapter('graph', graph_sender, recipient_names)
+POWER_AUTOMATE = InputAdapter('power_automate', power_automate_sender, power_automate_recipients)
+GENERIC = InputAdapter('generic', parse_sender, recipient_names)
+
+ADAPTERS = {adapter.name: adapter for adapter in (GRAPH, POWER_AUTOMATE, GENERIC)}
+
+
+def detect_adapter(email):
+    """Pick the adapter for a payload from one of its emails."""
+    if not isinstance(email, dict):
+        return GENERIC
+    from_field = email.get('from', email.get('sender'))
+    if isinstance(from_field, dict) and isinstance(from_field.get('emailAddress'), dict):
+        return GRAPH
+    if isinstance(from_field, str) and from_field:
+        return POWER_AUTOMATE
+    return GENERIC
@@ -0,0 +1,136 @@
+"""Async variant of the ``process_emails`` pipeline.
+
+``handle_emails_async`` gives the same response as ``pipeline.handle_emails``
+but never blocks the event loop, so one worker can serve several
+invocations at once:
+
+* I/O - loading the rules, the response cache, and an optional output sink
+  for finished reports - goes through ``AsyncHooks``.  The defaults run the
+  same blocking calls as the sync pipeline on the loop's default thread
+  pool; override them to use async clients (e.g. a storage SDK).
+* Classification and rendering, which are CPU-bound, run on ``executor``:
+  the loop's thread pool by default, or a process pool
+  (``EMAIL_SUMMARY_ASYNC_EXECUTOR=process``) to use more than one CPU.
+
+The rules are loaded once per request, through the hook, and both key the
+cache and classify the mail.  The cache is handled here rather than in the
+executor, so with a process pool the cached reports are still shared by
+all requests of the worker; a hit gets the same metrics headers and goes
+to ``write_output`` like a fresh report.
+``benchmarks/bench_concurrency.py`` compares the sync and async paths.
+"""
+import asyncio
+import logging
+import time
+
+from . import cache, parallel, pipeline, renderers
+from .metrics import Metrics
+from .rules import load_rules
+
+
+class AsyncHooks:
+    """Where the async pipeline does I/O."""
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    async def blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def load_rules(self):
+        return await self.blocking(load_rules)
+
+    async def cache_get(self, key):
+        response_cache = await self.blocking(pipeline.get_response_cache, self.settings)
+        if response_cache is None:
+            return None
+        return await self.blocking(response_cache.get, key)
+
+    async def cache_put(self, key, body, headers):
+        response_cache = await self.blocking(pipeline.get_response_cache, self.settings)
+        if response_cache is not None:
+            await self.blocking(response_cache.put, key, body, headers)
+
+    async def write_output(self, report, mailbox):
+        """Sink for finished reports (e.g. blob storage); nothing by default."""
+
+
+def get_executor(settings):
+    """The executor for classification: None is the loop's thread pool."""
+    if settings.async_executor == 'process':
+        return parallel.get_pool('process', settings.parallel_workers)
+    return None
+
+
+def _handle_emails(body, params, settings, request_headers, config, version):
+    # Rules travel as their config, which pickles, and are compiled once per process
+    return pipeline.handle_emails(body, params, settings, request_headers,
+                                  rules=parallel.worker_rules(config, version))
+
+
+async def handle_emails_async(body, params, settings, hooks=None, executor=None, request_headers=None):
+    """``pipeline.handle_emails`` for an ``async def main``."""
+    hooks = hooks or AsyncHooks(settings)
+    loop = asyncio.get_running_loop()
+    params = dict(params)
+    mailbox = params.get('mailbox')
+    started = time.perf_counter()
+    # Only Accept is used, and a plain dict can go to a process pool
+    accept = (request_headers or {}).get('Accept')
+    request_headers = {'Accept': accept} if accept else None
+    try:
+        formats = pipeline.request_formats(params, request_headers)
+    except renderers.NotAcceptable:
+        # handle_emails answers it
+        formats = None
+    try:
+        # The rules of the hook key the cache and classify the request
+        rules = await hooks.load_rules()
+    except Exception as e:
+        logging.error(f"Error loading rules: {e}")
+        return pipeline.Response(500, f"Error processing emails: {e}", {})
+
+    key = cached = None
+    if formats is not None and cache.is_enabled(settings.response_cache) and isinstance(body, (bytes, str)):
+        try:
+            # Hashing a big body releases the GIL, so it goes off the loop too
+            key = await loop.run_in_executor(None, pipeline.response_cache_key, body, mailbox, settings, rules,
+                                             formats)
+            cached = await hooks.cache_get(key)
+        except Exception as e:
+            logging.warning(f"Response cache lookup failed, processing the request: {e}")
+            key = cached = None
+    lookup_s = time.perf_counter() - started
+
+    if cached is not None:
+        logging.info("Returning the cached report for an identical request.")
+        report, headers = cached
+        headers = dict(headers, **{'X-Email-Summary-Cache': 'hit'})
+        if settings.metrics:
+            metrics = Metrics()
+            metrics.add_time('cache', lookup_s)
+            pipeline.add_metrics_headers(headers, metrics, started)
+        response = pipeline.Response(200, report, headers)
+    else:
+        # The cache was handled above; a pool worker must not start a pool of its own
+        worker_settings = settings._replace(response_cache='off')
+        if executor is not None:
+            worker_settings = worker_settings._replace(parallel_threshold=0)
+            response = await loop.run_in_executor(executor, _handle_emails, body, params, worker_settings,
+                                                  request_headers, rules.config, rules.version)
+        else:
+            response = await loop.run_in_executor(None, pipeline.handle_emails, body, params, worker_settings,
+                                                  request_headers, rules)
+        if response.status_code != 200:
+            return response
+        headers = dict(response.headers)
+        if key is not None:
+            await hooks.cache_put(key, response.body, {name: value for name, value in headers.items()
+                                                       if name not in pipeline.METRICS_HEADERS})
+            headers['X-Email-Summary-Cache'] = 'miss'
+            if 'Server-Timing' in headers:
+                headers['Server-Timing'] = f"cache;dur={lookup_s * 1000:.2f}, {headers['Server-Timing']}"
+        response = response._replace(headers=headers)
+
+    await hooks.write_output(response.body, mailbox)
+    return response
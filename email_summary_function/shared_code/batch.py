@@ -0,0 +1,148 @@
+"""Summaries for many mailboxes in one request.
+
+A batch payload holds a list of mailboxes, each with its own ``inbox`` and
+``sent`` arrays and optional rule overrides::
+
+    {"mailboxes": [
+        {"id": "akshay@example.com", "rules": {"vip_label": "Sahithi"}, "inbox": [...], "sent": [...]},
+        ...
+    ]}
+
+Overrides are merged over the base rules (see ``rules.py``) and compiled
+once per distinct document; rule sets with the same keywords share their
+matchers, and all mailboxes share the renderer's templates.  Each mailbox
+is classified and rendered on its own, so a bad mailbox only fails its own
+entry.  With more than one CPU mailboxes run on the ``parallel`` pool and
+results are yielded as they finish, not in payload order.
+"""
+import json
+import logging
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from . import ingest, parallel, render
+from .classify import Classifier
+from .dates import utc_now
+from .rules import RuleSet, load_rules
+
+MAX_RULE_SETS = 64
+
+_rule_sets = {}
+_UNSAFE_FILENAME = re.compile(r'[^A-Za-z0-9._@-]+')
+
+
+def rules_with_overrides(base, overrides):
+    """``base`` with the top-level keys of ``overrides`` replaced, compiled once."""
+    if not overrides:
+        return base
+    if not isinstance(overrides, dict):
+        raise ValueError(f"rules must be an object, got {type(overrides).__name__}")
+    config = dict(base.config, **overrides)
+    key = json.dumps(config, sort_keys=True, default=str)
+    rules = _rule_sets.get(key)
+    if rules is None:
+        if len(_rule_sets) >= MAX_RULE_SETS:
+            _rule_sets.pop(next(iter(_rule_sets)))
+        rules = _rule_sets[key] = RuleSet(config)
+    return rules
+
+
+def write_report(classifier, mailbox_id, report_dir, generated_at):
+    """Stream the report to ``report_dir`` and return its path."""
+    filename = f"{_UNSAFE_FILENAME.sub('_', mailbox_id)}-{generated_at:%Y%m%dT%H%M%SZ}.html"
+    path = os.path.join(report_dir, filename)
+    with open(path, 'wb') as f:
+        for chunk in render.iter_report_bytes(classifier):
+            f.write(chunk)
+    return path
+
+
+def summarize_mailbox(mailbox_id, mailbox, rules, now=None, report_dir=None):
+    """Classify and render one mailbox; returns its result entry."""
+    try:
+        classifier = Classifier(rules, now=now).feed(ingest.iter_document(mailbox))
+        result = {
+            'status': 'ok',
+            'rules_version': rules.version,
+            'inbox': classifier.inbox_seen,
+            'sent': classifier.sent_seen,
+            'important': classifier.important_messages,
+        }
+        if report_dir:
+            result['location'] = write_report(classifier, mailbox_id, report_dir, classifier.now)
+        else:
+            result['report'] = render.render_report(classifier)
+    except Exception as e:
+        return _failed(mailbox_id, e)
+    logging.info(f"Mailbox {mailbox_id}: {result['inbox']} inbox / {result['sent']} sent emails, "
+                 f"{result['important']} important")
+    return result
+
+
+def _summarize_remote(mailbox_id, mailbox, config, version, now, report_dir):
+    # Runs on the pool; rules travel as their config and are compiled once per worker
+    return summarize_mailbox(mailbox_id, mailbox, parallel.worker_rules(config, version), now, report_dir)
+
+
+def _failed(mailbox_id, error):
+    logging.warning(f"Mailbox {mailbox_id} failed: {error}")
+    return {'status': 'error', 'error': str(error)}
+
+
+def _collect(pending):
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        mailbox_id = pending.pop(future)
+        try:
+            result = future.result()
+        except Exception as e:
+            result = _failed(mailbox_id, e)
+        yield mailbox_id, result
+
+
+def iter_batch(mailboxes, rules=None, executor='process', workers=None, report_dir=None):
+    """Yield ``(mailbox_id, result)`` pairs as mailboxes finish.
+
+    ``result`` is ``{'status': 'ok', 'report': html, ...}`` (or
+    ``'location'`` instead of ``'report'`` with a ``report_dir``), or
+    ``{'status': 'error', 'error': message}``.  Mailboxes without an ``id``
+    (and repeated ids) are reported as ``#<position>``.  Errors in the
+    payload itself (e.g. malformed JSON) are raised by the ``mailboxes``
+    iterator as usual.
+    """
+    base = rules if rules is not None else load_rules()
+    now = utc_now()
+    workers = workers or os.cpu_count() or 1
+    pool = parallel.get_pool(executor, workers) if workers > 1 else None
+    pending = {}
+    seen = set()
+
+    for position, mailbox in enumerate(mailboxes):
+        mailbox_id = f"#{position}"
+        try:
+            if not isinstance(mailbox, dict):
+                raise ValueError(f"Expected a mailbox object, got {type(mailbox).__name__}")
+            given_id = str(mailbox.get('id') or mailbox_id)
+            if given_id in seen:
+                # Keep the earlier mailbox's result under its id
+                raise ValueError(f"Duplicate mailbox id {given_id!r}")
+            seen.add(given_id)
+            mailbox_id = given_id
+            mailbox_rules = rules_with_overrides(base, mailbox.get('rules'))
+        except Exception as e:
+            yield mailbox_id, _failed(mailbox_id, e)
+            continue
+
+        if pool is None:
+            yield mailbox_id, summarize_mailbox(mailbox_id, mailbox, mailbox_rules, now, report_dir)
+            continue
+        future = pool.submit(_summarize_remote, mailbox_id, mailbox, mailbox_rules.config,
+                             mailbox_rules.version, now, report_dir)
+        pending[future] = mailbox_id
+        # Bound the mailboxes in flight, handing back whatever has finished
+        while len(pending) > 2 * workers:
+            yield from _collect(pending)
+
+    while pending:
+        yield from _collect(pending)
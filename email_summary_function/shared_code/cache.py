@@ -0,0 +1,148 @@
+"""Response cache for repeated payloads.
+
+Power Automate retries a failed call with the same body, and overlapping
+schedules send the same window of mail more than once.  Each of those would
+otherwise be classified and rendered again, so finished responses are kept
+under a key made of the request body and everything else the report depends
+on: the rules version, the reference day (the day the ages of the emails
+are counted from), the mailbox and the output mode.  A hit skips parsing,
+classification and rendering altogether.
+
+The body is hashed as bytes, only trimmed of surrounding whitespace, so a
+lookup never has to parse it.  Reply ages move within a day, so entries
+also expire after a TTL.
+
+Two backends with the same ``get``/``put`` interface:
+
+* ``MemoryCache`` - an LRU dict in the worker process
+* ``SQLiteCache`` - a SQLite file that several workers (or the CLI and the
+  local server) can share
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 32
+DEFAULT_TTL = 600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    headers TEXT NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+"""
+
+
+def cache_key(body, *parts):
+    """Hex digest of ``parts`` and the trimmed request body (bytes or str)."""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    digest = hashlib.sha256('\0'.join(str(part) for part in parts).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(body.strip())
+    return digest.hexdigest()
+
+
+class MemoryCache:
+    """In-process LRU of ``(body, headers)`` with a TTL in seconds."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if time.time() - created > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, body, headers):
+        with self._lock:
+            self._entries[key] = (time.time(), (body, dict(headers)))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """``MemoryCache`` in a SQLite file shared between workers.
+
+    A str body is stored as TEXT and a bytes body as a BLOB, so it comes
+    back as the same type.  Database errors are logged and treated as a
+    miss; the cache never fails a request.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        # Imported here so the default in-memory cache does not load sqlite3
+        import sqlite3
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._errors = sqlite3.Error
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def get(self, key):
+        now = time.time()
+        try:
+            with self._lock, self._conn as conn:
+                row = conn.execute('SELECT body, headers FROM responses WHERE key = ? AND created >= ?',
+                                   (key, now - self.ttl)).fetchone()
+                if row is None:
+                    return None
+                conn.execute('UPDATE responses SET used = ? WHERE key = ?', (now, key))
+        except self._errors as e:
+            logging.warning(f"Response cache {self.path} unavailable: {e}")
+            return None
+        return row[0], json.loads(row[1])
+
+    def put(self, key, body, headers):
+        now = time.time()
+        try:
+            with self._lock, self._conn as conn:
+                conn.execute('INSERT OR REPLACE INTO responses (key, body, headers, created, used) '
+                             'VALUES (?, ?, ?, ?, ?)', (key, body, json.dumps(headers), now, now))
+                conn.execute('DELETE FROM responses WHERE created < ?', (now - self.ttl,))
+                conn.execute('DELETE FROM responses WHERE key NOT IN '
+                             '(SELECT key FROM responses ORDER BY used DESC LIMIT ?)', (self.max_entries,))
+        except self._errors as e:
+            logging.warning(f"Response cache {self.path} unavailable: {e}")
+
+    def clear(self):
+        with self._lock, self._conn as conn:
+            conn.execute('DELETE FROM responses')
+
+
+def is_enabled(spec):
+    return bool(spec) and spec.strip().lower() not in ('0', 'off', 'false', 'no')
+
+
+def open_cache(spec, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+    """``None`` for 'off', a ``MemoryCache`` for 'memory', else a SQLite file path."""
+    if not is_enabled(spec):
+        return None
+    if spec.strip().lower() == 'memory':
+        return MemoryCache(max_entries, ttl)
+    return SQLiteCache(spec, max_entries, ttl)
@@ -0,0 +1,351 @@
+"""Classification of inbox and sent emails into the report sections.
+
+Emails are fed one at a time (see ``ingest.iter_emails``) and only the ones
+that end up in the report are kept, as ``records.EmailRecord``, so memory
+depends on the number of kept emails rather than on the size of the payload.
+"""
+import logging
+import time
+
+from .adapters import GENERIC, detect_adapter
+from .dates import Clock, parse_timestamp
+from .dedup import DuplicateIndex
+from .digest import Digest
+from .memo import memo_key
+from .ranking import TopN
+from .records import EmailRecord, parse_sender, recipient_names
+from .rules import load_rules
+from .threads import ConversationIndex, ThreadIndex, thread_keys
+
+
+def build_nav_link(email):
+    # Create navigation link (prefer webLink if available, otherwise construct OWA link)
+    web_link = email.get('webLink', '')
+    email_id = email.get('id', '')
+    internet_message_id = email.get('internetMessageId', '')
+
+    if web_link:
+        return web_link
+    if email_id:
+        # Construct Outlook Web App link using email ID
+        return f"https://outlook.office.com/mail/inbox/id/{email_id}"
+    if internet_message_id:
+        # Alternative: use search by message ID, which has <, @ and > in it.
+        # Imported here, as few payloads get this far, to keep cold starts short
+        from urllib.parse import quote
+        return f"https://outlook.office.com/mail/search/id/{quote(str(internet_message_id), safe='')}"
+    return ''
+
+
+def match_inbox_email(email, rules, sender):
+    """Return what the rules make of an inbox email, or None if it is not kept.
+
+    ``sender`` is the email's ``parse_sender`` tuple.  The result is
+    ``(is_vip, reply_after_days, matched_keywords, score)``; it only depends
+    on the subject, preview and sender, so it is what ``memo.py`` keeps.
+    """
+    # Safely get email fields with defaults
+    subject = str(email.get('subject', '')).lower()
+    body = str(email.get('bodyPreview', '')).lower()
+
+    # Check if email is from a VIP sender (e.g. Sahithi) and might need a reply
+    vip_rules = rules.match_vip(sender[0], sender[1])
+    # Check if it's an important email (mentions Akshay, @sahithin, or important keywords)
+    matched_keywords = rules.match_keywords(subject, body)
+
+    if not (matched_keywords or vip_rules):
+        return None
+    return (bool(vip_rules),
+            min((rule['reply_after_days'] for rule in vip_rules), default=None),
+            matched_keywords,
+            rules.keyword_score(matched_keywords) + sum(rule['weight'] for rule in vip_rules))
+
+
+def inbox_record(email, match, sender):
+    """The ``EmailRecord`` of a kept inbox email, from its ``match_inbox_email`` result."""
+    is_vip, reply_after_days, matched_keywords, score = match
+    return EmailRecord(
+        'inbox',
+        subject=email.get('subject', 'No Subject'),
+        date=str(email.get('receivedDateTime') or ''),
+        preview=str(email.get('bodyPreview') or ''),
+        nav_link=build_nav_link(email),
+        sender=sender[2],
+        sender_email=sender[3],
+        is_vip=is_vip,
+        reply_after_days=reply_after_days,
+        matched_keywords=matched_keywords,
+        score=score,
+    )
+
+
+def classify_inbox_email(email, rules, sender_of=parse_sender):
+    """Return the ``EmailRecord`` for an inbox email, or None if it is not kept.
+
+    ``sender_of`` is the sender extractor of the payload's input adapter.
+    """
+    sender = sender_of(email)
+    match = match_inbox_email(email, rules, sender)
+    return None if match is None else inbox_record(email, match, sender)
+
+
+def classify_sent_email(email, recipients_of=recipient_names):
+    """Return the ``EmailRecord`` for a dated sent email, or None."""
+    sent_date_str = email.get('sentDateTime', '')
+    if not sent_date_str:
+        return None
+
+    return EmailRecord(
+        'sent',
+        subject=email.get('subject', ''),
+        date=str(sent_date_str),
+        timestamp=parse_timestamp(sent_date_str),
+        preview=str(email.get('bodyPreview') or ''),
+        recipients=recipients_of(email),
+        thread_keys=thread_keys(email),
+    )
+
+
+class Classifier:
+    """Collects the report sections while emails are fed in one by one.
+
+    Every kept inbox row is folded into its thread's
+    ``threads.Conversation``, or into an earlier conversation it duplicates
+    (the ``dedup`` rule); ``finish`` ranks the conversations into the inbox
+    section, one row per thread.  The other sections are
+    ``ranking.TopN``s, filled as rows come in: inbox rows from VIP senders
+    past their reply threshold go to the urgent one, and dated sent rows
+    past the follow-up threshold go to the sent one unless a reply was
+    already seen.  ``finish`` turns them into the ranked lists the report
+    shows, dropping sent rows whose reply only came later in the payload
+    and only then trimming the sent section to its limit.  ``feed`` calls
+    ``finish`` itself; callers using ``add`` directly must call it once all
+    emails are in.
+
+    ``digest`` (a ``digest.Digest``) counts the same rows by sender domain,
+    keyword and time, and the reply latency of sent threads.
+    """
+
+    def __init__(self, rules=None, now=None, adapter=None, metrics=None, memo=None):
+        self.rules = rules if rules is not None else load_rules()
+        # Optional memo.ClassificationMemo of earlier inbox rule matches per message id
+        self.memo = memo
+        if memo is not None:
+            memo.use_rules(self.rules.version)
+        self.memo_hits = 0
+        # Detected from the first email unless given (see adapters.py)
+        self.adapter = adapter
+        # Optional metrics.Metrics, timing sender extraction and finish()
+        self.metrics = metrics
+        self._timed_senders = {}
+        limits = self.rules.limits
+        # Threads are only complete once every email is in, so the inbox
+        # section is ranked in finish()
+        self.inbox_limit = limits['inbox']
+        self.conversations = ConversationIndex(
+            DuplicateIndex(near=self.rules.dedup == 'near') if self.rules.dedup != 'off' else None)
+        self.urgent_top = TopN(limits['urgent'])
+        # Not bounded: a reply later in the payload can still rule any of
+        # these out, so the sent section is only trimmed in finish()
+        self.sent_limit = limits['sent']
+        self.sent_top = TopN()
+        # The sections as rendered, highest priority first, and the number
+        # of rows left out of each; set by finish().  important_inbox holds
+        # threads.Conversation rows, the others records.EmailRecord rows.
+        self.important_inbox = []
+        self.important_messages = 0
+        self.important_duplicates = 0
+        self.vip_emails_needing_reply = []
+        self.old_sent_emails = []
+        self.important_more = 0
+        self.urgent_more = 0
+        self.follow_up_more = 0
+        self.threads = ThreadIndex()
+        self.digest = Digest()
+        self.inbox_seen = 0
+        self.sent_seen = 0
+        self.parse_errors = 0
+        self.date_errors = 0
+        self.clock = Clock(now)
+        self.now = self.clock.now
+        self.follow_up_cutoff = self.clock.cutoff(self.rules.follow_up_after_days)
+
+    def add(self, folder, email):
+        """Classify one email; returns its ``EmailRecord`` or None if not kept."""
+        if folder == 'inbox':
+            return self.add_inbox(email)
+        return self.add_sent(email)
+
+    def add_inbox(self, email):
+        self.inbox_seen += 1
+        try:
+            sender = self._sender_for(email)(email)
+            key = self.memo is not None and memo_key(email)
+            outcome = self.memo.get(key) if key else None
+            if outcome is not None:
+                self.memo_hits += 1
+                match = outcome[0]
+            else:
+                match = match_inbox_email(email, self.rules, sender)
+                if key:
+                    self.memo.put(key, (match,))
+            # Built from this request's email, even on a memo hit
+            email_data = None if match is None else inbox_record(email, match, sender)
+        except Exception as email_error:
+            self.parse_errors += 1
+            logging.warning(f"Error processing inbox email {self.inbox_seen}: {email_error}")
+            return None
+
+        # Every inbox message counts as a possible reply to a sent email
+        received_date_str = email.get('receivedDateTime', '')
+        received_at = None
+        keys = thread_keys(email)
+        if received_date_str:
+            try:
+                received_at = parse_timestamp(received_date_str)
+            except ValueError as date_error:
+                self._date_error(date_error)
+
+        if received_at is not None:
+            self.threads.add_inbound(keys, received_at)
+        if email_data is not None:
+            email_data.timestamp = received_at
+            email_data.thread_keys = keys
+            self.offer_inbox(email_data)
+        return email_data
+
+    def skip(self, folder, email):
+        """Count an email classified on an earlier run (see state.py) without classifying it."""
+        if folder == 'inbox':
+            self.inbox_seen += 1
+        else:
+            self.sent_seen += 1
+        # The payload's adapter is still detected from its first emails, as in a full run
+        self._adapter_for(email)
+
+    def offer_inbox(self, email_data):
+        """Fold a kept inbox row into its conversation and rank it for the urgent section."""
+        priority = self.rules.priority(email_data.score, email_data.timestamp, self.clock.now_ts)
+        self.conversations.add(email_data, priority)
+        self.digest.add_inbox(email_data)
+        # Older than the VIP rule's reply threshold (might need reply)
+        if email_data.is_vip and self.clock.is_older_than(email_data.timestamp, email_data.reply_after_days):
+            self.urgent_top.push(priority, email_data)
+
+    def add_sent(self, email):
+        self.sent_seen += 1
+        try:
+            email_data = classify_sent_email(email, self._adapter_for(email).recipients)
+        except ValueError as date_error:
+            self._date_error(date_error)
+            return None
+        except Exception as email_error:
+            self.parse_errors += 1
+            logging.warning(f"Error processing sent email {self.sent_seen}: {email_error}")
+            return None
+        if email_data is not None:
+            self.offer_sent(email_data)
+        return email_data
+
+    def offer_sent(self, email_data):
+        """Rank a dated sent row into the follow-up section if it qualifies."""
+        self.digest.add_sent(email_data)
+        # The cutoff moves with the clock, so this is decided on every run.
+        # Only replies later mail cannot undo rule a row out before finish().
+        if (email_data.timestamp < self.follow_up_cutoff
+                and not self.threads.has_final_reply(email_data.thread_keys, email_data.timestamp)):
+            self.sent_top.push(self.rules.priority(email_data.score, email_data.timestamp, self.clock.now_ts),
+                               email_data)
+
+    def _adapter_for(self, email):
+        adapter = self.adapter
+        if adapter is None:
+            adapter = detect_adapter(email)
+            # Keep probing until an email with a recognizable shape comes along
+            if adapter is not GENERIC:
+                self.adapter = adapter
+                logging.info(f"Reading the payload with the {adapter.name} adapter")
+        return adapter
+
+    def _sender_for(self, email):
+        sender_of = self._adapter_for(email).sender
+        if self.metrics is None:
+            return sender_of
+        timed = self._timed_senders.get(sender_of)
+        if timed is None:
+            timed = self._timed_senders[sender_of] = self.metrics.timed('normalize', sender_of)
+        return timed
+
+    def _date_error(self, error):
+        # Only the first few are logged; finish() reports the total
+        self.date_errors += 1
+        if self.date_errors <= 3:
+            logging.warning(f"Error parsing date: {error}")
+
+    def partial(self):
+        """The conversations, ranked rows, thread index and digest collected so far, before ``finish``."""
+        return (self.conversations.partial(), self.urgent_top.entries(), self.sent_top.entries(),
+                (self.urgent_top.more, self.sent_top.more), list(self.threads.items()), self.digest.partial(),
+                self.inbox_seen, self.sent_seen, self.parse_errors, self.date_errors)
+
+    def merge(self, partial):
+        """Add the ``partial()`` of another classifier, e.g. from a worker.
+
+        Conversations of the same thread are folded together.  Rows a worker
+        already left out of its top N cannot make the merged top N either,
+        so only its counts are carried over.  Sent rows are checked against
+        the merged thread index first.
+        """
+        (conversations, urgent, sent, more, threads, digest,
+         inbox_seen, sent_seen, parse_errors, date_errors) = partial
+        for key, latest in threads:
+            self.threads.add_inbound((key,), latest)
+        self.conversations.merge(conversations)
+        self.digest.merge(digest)
+        for priority, email_data in urgent:
+            self.urgent_top.push(priority, email_data)
+        self.urgent_top.more += more[0]
+        has_final_reply = self.threads.has_final_reply
+        for priority, email_data in sent:
+            if not has_final_reply(email_data.thread_keys, email_data.timestamp):
+                self.sent_top.push(priority, email_data)
+        self.sent_top.more += more[1]
+        self.inbox_seen += inbox_seen
+        self.sent_seen += sent_seen
+        self.parse_errors += parse_errors
+        self.date_errors += date_errors
+
+    def finish(self):
+        """Turn the ranked sections into the lists the report shows."""
+        start = time.perf_counter()
+        inbox_top = TopN(self.inbox_limit)
+        duplicates = 0
+        for conversation in self.conversations:
+            inbox_top.push(conversation.priority, conversation)
+            duplicates += conversation.duplicates
+        self.important_inbox = inbox_top.items()
+        self.important_more = inbox_top.more
+        self.important_messages = self.conversations.messages
+        self.important_duplicates = duplicates
+        self.vip_emails_needing_reply = self.urgent_top.items()
+        self.urgent_more = self.urgent_top.more
+        old_sent_emails = [
+            # No inbound message in the thread since, counting the whole payload
+            email_data for email_data in self.sent_top.items()
+            if not self.threads.has_reply_after(email_data.thread_keys, email_data.timestamp)
+        ]
+        shown = self.sent_limit or len(old_sent_emails)
+        self.old_sent_emails = old_sent_emails[:shown]
+        self.follow_up_more = self.sent_top.more + len(old_sent_emails) - len(self.old_sent_emails)
+        self.digest.finish(self.threads)
+        if self.date_errors:
+            logging.warning(f"{self.date_errors} emails had unparsable dates and were left out of the age checks")
+        if self.metrics is not None:
+            self.metrics.add_time('date_checks', time.perf_counter() - start)
+        return self
+
+    def feed(self, items):
+        """Consume ``(folder, email)`` pairs, e.g. from ``ingest.iter_emails``."""
+        for folder, email in items:
+            self.add(folder, email)
+        return self.finish()
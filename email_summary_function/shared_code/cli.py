@@ -0,0 +1,173 @@
+"""Command line entry point: run the summarizer without the Functions host.
+
+Run from the email_summary_function directory::
+
+    python -m shared_code summarize inbox.json -o report.html --timings
+    python -m shared_code summarize emails.jsonl --profile
+    python -m shared_code summarize export.mbox --owner me@example.com -o report.html
+    python -m shared_code summarize inbox.json --to text
+    python -m shared_code serve --port 7071
+
+``summarize`` runs the same pipeline as ``process_emails`` (see
+``pipeline.py``) on local files: a ``{"inbox": [...], "sent": [...]}``
+payload (streamed), JSON lines with one email per line, or ``.eml`` /
+mbox mail.  ``serve`` starts ``server.py``, a stand-in for the function
+endpoints.  App settings are read from the environment, as in Azure, and
+can be overridden with flags.
+"""
+import argparse
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import sys
+import time
+
+from . import ingest, mailfiles, pipeline, renderers
+from .metrics import Metrics, stage
+
+JSON_LINES_SUFFIXES = ('.jsonl', '.ndjson')
+MAIL_SUFFIXES = ('.eml', '.mbox')
+
+
+def input_format(path):
+    if os.path.isdir(path) or path.lower().endswith(MAIL_SUFFIXES):
+        return 'mail'
+    if path.lower().endswith(JSON_LINES_SUFFIXES):
+        return 'jsonl'
+    return 'json'
+
+
+def iter_input(path, fmt, settings, owner=None):
+    """``(folder, email)`` pairs from one input file ('-' is stdin)."""
+    fmt = fmt or ('json' if path == '-' else input_format(path))
+    if fmt == 'mail':
+        yield from mailfiles.iter_mail_files([path], owner=owner)
+        return
+    f = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    try:
+        if fmt == 'jsonl':
+            yield from ingest.iter_json_lines(f)
+        else:
+            yield from pipeline.read_emails(f, settings.ingest_mode)
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+
+
+def write_output(report, path):
+    data = report.encode('utf-8') if isinstance(report, str) else report
+    if path == '-':
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+    else:
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+def output_formats(value):
+    try:
+        return renderers.negotiate(value)
+    except renderers.NotAcceptable as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def summarize(args, settings):
+    metrics = Metrics() if args.timings else None
+    started = time.perf_counter()
+    emails = itertools.chain.from_iterable(
+        iter_input(path, args.input_format, settings, args.owner) for path in args.inputs)
+    classifier, _ = pipeline.classify(emails, settings, args.mailbox, metrics)
+    with stage(metrics, 'render'):
+        report, _ = pipeline.render_output(classifier, settings.output_mode, args.output_format)
+    with stage(metrics, 'write'):
+        write_output(report, args.output)
+
+    if metrics is not None:
+        metrics.add_time('total', time.perf_counter() - started)
+        metrics.count_classifier(classifier)
+        for name, seconds in metrics.ordered_timings():
+            print(f"{name:>17} {seconds * 1000:>10.1f} ms", file=sys.stderr)
+        print(' '.join(f"{name}={value}" for name, value in metrics.counters.items()), file=sys.stderr)
+
+
+def run_profiled(func, args, settings):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        func(args, settings)
+    finally:
+        profiler.disable()
+        if args.profile:
+            profiler.dump_stats(args.profile)
+            print(f"Profile written to {args.profile}", file=sys.stderr)
+        else:
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(args.profile_limit)
+            print(out.getvalue(), file=sys.stderr)
+
+
+def serve(args, settings):
+    from . import server
+    server.serve(args.host, args.port, settings)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m shared_code', description=__doc__.splitlines()[0])
+    parser.add_argument('-v', '--verbose', action='store_true', help='log at INFO level')
+    parser.add_argument('--ingest-mode', choices=['stream', 'json'], help='EMAIL_SUMMARY_INGEST_MODE')
+    parser.add_argument('--parallel-threshold', type=int, help='EMAIL_SUMMARY_PARALLEL_THRESHOLD')
+    parser.add_argument('--workers', type=int, help='EMAIL_SUMMARY_PARALLEL_WORKERS')
+    parser.add_argument('--state-db', help='EMAIL_SUMMARY_STATE_DB')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    summarize_parser = commands.add_parser('summarize', help='summarize local files into a report')
+    summarize_parser.add_argument('inputs', nargs='+', metavar='INPUT',
+                                  help="JSON payload, .jsonl/.ndjson, .eml, mbox or a directory ('-' for stdin)")
+    summarize_parser.add_argument('-o', '--output', default='-', help='report path (default: stdout)')
+    summarize_parser.add_argument('--format', dest='input_format', choices=['json', 'jsonl', 'mail'],
+                                  help='input format (default: from the file extension)')
+    summarize_parser.add_argument('--owner', help='for mail input: address whose messages count as sent')
+    summarize_parser.add_argument('--mailbox', help='mailbox id for incremental runs (needs --state-db)')
+    summarize_parser.add_argument('--output-mode', choices=['memory', 'spool'], help='EMAIL_SUMMARY_OUTPUT_MODE')
+    summarize_parser.add_argument('--to', dest='output_format', type=output_formats, default=('html',),
+                                  metavar='FORMAT[,FORMAT]',
+                                  help=f"output format: {', '.join(renderers.RENDERERS)} (default: html)")
+    summarize_parser.add_argument('--timings', action='store_true', help='print per-stage wall times and counters to stderr')
+    summarize_parser.add_argument('--profile', nargs='?', const='', default=None, metavar='FILE',
+                                  help='run under cProfile; print the top functions or write FILE')
+    summarize_parser.add_argument('--profile-limit', type=int, default=30, help=argparse.SUPPRESS)
+    summarize_parser.set_defaults(func=summarize)
+
+    serve_parser = commands.add_parser('serve', help='serve the function endpoints over local HTTP')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=7071)
+    serve_parser.set_defaults(func=serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(levelname)s %(message)s')
+
+    overrides = {
+        'ingest_mode': args.ingest_mode,
+        'parallel_threshold': args.parallel_threshold,
+        'parallel_workers': args.workers,
+        'state_db': args.state_db,
+        'output_mode': getattr(args, 'output_mode', None),
+    }
+    settings = pipeline.settings_from_env()._replace(
+        **{key: value for key, value in overrides.items() if value is not None})
+
+    try:
+        if getattr(args, 'profile', None) is not None:
+            run_profiled(args.func, args, settings)
+        else:
+            args.func(args, settings)
+    except (OSError, ValueError) as e:
+        sys.exit(f"error: {e}")
+    return 0
@@ -0,0 +1,142 @@
+"""Timestamp parsing and the per-request reference clock.
+
+Graph and Power Automate send ISO 8601 timestamps such as
+``2025-06-20T10:30:00Z``, ``2025-06-20T10:30:00.1234567Z`` (seven fraction
+digits) or ``2025-06-20T10:30:00+05:30``.  ``parse_timestamp`` hands those
+to ``datetime.fromisoformat``, which is implemented in C; before Python 3.11
+it rejects ``Z`` and more than six fraction digits, so the string is
+rewritten first.  Whatever ``fromisoformat`` refuses goes to a slicer, then
+to RFC 2822 parsing.
+
+All comparisons are done on epoch seconds against one UTC reference time
+captured per request, instead of mixing ``datetime.now()`` local time with
+UTC dates stripped of their timezone.
+"""
+import sys
+from datetime import date, datetime, timezone
+
+# Python 3.11 reads Z and any number of fraction digits
+_ISOFORMAT_READS_GRAPH = sys.version_info >= (3, 11)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_MAX_CACHED_DAYS = 4096
+_day_cache = {}
+
+
+def _epoch_day(date_str):
+    days = _day_cache.get(date_str)
+    if days is None:
+        days = date(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10])).toordinal() - _EPOCH_ORDINAL
+        if len(_day_cache) < _MAX_CACHED_DAYS:
+            _day_cache[date_str] = days
+    return days
+
+
+def _parse_isoformat(s):
+    if not _ISOFORMAT_READS_GRAPH:
+        if s[-1:] in ('Z', 'z'):
+            s = s[:-1] + '+00:00'
+        if len(s) > 32 and s[19] == '.' and s[-6] in '+-':
+            # Fraction of more than six digits before an offset; anything else goes to the slicer
+            s = s[:26] + s[-6:]
+    parsed = datetime.fromisoformat(s)
+    if parsed.tzinfo is None:
+        # Naive timestamps are taken as UTC, which is what Graph means by them
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _parse_iso(s):
+    # Slicer for the shapes fromisoformat refuses, e.g. a lowercase z
+    # YYYY-MM-DD[T ]HH:MM:SS[.fraction][Z|+HH:MM|-HH:MM]; None if not that shape
+    if len(s) < 19 or s[4] != '-' or s[7] != '-' or s[10] not in 'Tt ' or s[13] != ':' or s[16] != ':':
+        return None
+    hour, minute, second = int(s[11:13]), int(s[14:16]), int(s[17:19])
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+    timestamp = _epoch_day(s[:10]) * 86400 + hour * 3600 + minute * 60 + second
+
+    rest = s[19:]
+    if rest[:1] == '.':
+        end = 1
+        while end < len(rest) and rest[end].isdigit():
+            end += 1
+        if end == 1:
+            return None
+        timestamp += float(rest[:end])
+        rest = rest[end:]
+    if rest in ('', 'Z', 'z'):
+        # Naive timestamps are taken as UTC, which is what Graph means by them
+        return timestamp
+    if len(rest) == 6 and rest[0] in '+-' and rest[3] == ':':
+        offset = int(rest[1:3]) * 3600 + int(rest[4:6]) * 60
+        return timestamp - offset if rest[0] == '+' else timestamp + offset
+    return None
+
+
+def _parse_slow(s):
+    # email.utils is slow to import and Graph dates never get here
+    from email.utils import parsedate_to_datetime
+    try:
+        # RFC 2822, as found in .eml / mbox Date headers
+        parsed = parsedate_to_datetime(s)
+    except (TypeError, ValueError, IndexError):
+        parsed = None
+    if parsed is None:
+        parsed = datetime.fromisoformat(s.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_timestamp(value):
+    """Epoch seconds for a timestamp string; raises ValueError if unparsable."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"Invalid date {value!r}")
+    s = value.strip()
+    try:
+        return _parse_isoformat(s)
+    except (ValueError, OverflowError):
+        pass
+    try:
+        timestamp = _parse_iso(s)
+    except ValueError:
+        timestamp = None
+    if timestamp is not None:
+        return timestamp
+    try:
+        return _parse_slow(s)
+    except (TypeError, ValueError, OverflowError) as e:
+        raise ValueError(f"Invalid date {value!r}") from e
+
+
+def try_parse_timestamp(value):
+    """``parse_timestamp`` that returns None instead of raising."""
+    try:
+        return parse_timestamp(value)
+    except ValueError:
+        return None
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+class Clock:
+    """One UTC reference time for a whole request."""
+
+    def __init__(self, now=None):
+        if now is None:
+            now = utc_now()
+        elif now.tzinfo is None:
+            now = now.astimezone()
+        self.now = now
+        self.now_ts = now.timestamp()
+
+    def cutoff(self, days):
+        """Epoch seconds ``days`` before the reference time."""
+        return self.now_ts - days * 86400
+
+    def is_older_than(self, timestamp, days):
+        return timestamp is not None and timestamp < self.now_ts - days * 86400
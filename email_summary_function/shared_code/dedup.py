@@ -0,0 +1,164 @@
+"""Duplicate and near-duplicate suppression for the inbox section.
+
+Alerts, CI mails and newsletters arrive many times with the same sender and
+(nearly) the same text.  Each kept inbox message that starts a new
+conversation is fingerprinted, and if an earlier conversation has the same
+fingerprint it is folded into that conversation's row instead of getting
+one of its own (see ``threads.ConversationIndex``).
+
+Two fingerprints per message:
+
+* exact - a hash of the sender, the normalized subject and the
+  whitespace-collapsed preview
+* near - a 64-bit SimHash of the word bigrams of subject and preview, with
+  digits masked so build numbers and timestamps do not count.  Two
+  messages from the same sender are near-duplicates when their SimHashes
+  differ in at most ``MAX_DISTANCE`` bits.
+
+Near lookups use the pigeonhole principle: the SimHash is cut into
+``MAX_DISTANCE + 1`` bands, and two hashes within the distance share at
+least one band exactly, so only the few conversations filed under one of
+the message's bands are compared.  Buckets are capped at ``MAX_BUCKET``, so
+a lookup is O(1) and the index grows with the number of conversations.
+
+The SimHash is computed without a per-bit loop: each token hash is spread
+into 64 lanes of 16 bits of one Python int (cached per token), the lanes of
+all tokens are summed with plain integer additions, and one more addition
+carries the lanes that reached the majority into their top bit.  Those 64
+top bits are the fingerprint; it is never packed back into a 64-bit int,
+as distances and bands work on it as is.  Hashes are ``hashlib`` digests,
+not ``hash()``, so fingerprints from pool workers can be compared.
+"""
+import hashlib
+import re
+from functools import lru_cache
+
+from .threads import normalize_subject
+
+# Bits two SimHashes may differ in and still be near-duplicates
+MAX_DISTANCE = 3
+BANDS = MAX_DISTANCE + 1
+# Conversations kept per band value and sender
+MAX_BUCKET = 8
+# Tokens looked at per message; a lane must not overflow into the next
+MAX_TOKENS = 4096
+
+MODES = ('off', 'exact', 'near')
+
+_LANE = 16
+_LANES = 64
+_ONES = sum(1 << (_LANE * lane) for lane in range(_LANES))
+_TOP_BITS = _ONES << (_LANE - 1)
+_BAND_BITS = _LANE * _LANES // BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+_WORD = re.compile(r'\w+')
+_DIGITS = re.compile(r'\d+')
+# One byte of a token hash spread into 8 lanes
+_SPREAD_BYTE = [sum(1 << (_LANE * bit) for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+@lru_cache(maxsize=65536)
+def _spread_token(token):
+    # A word or a (word, word) bigram
+    if isinstance(token, tuple):
+        token = ' '.join(token)
+    digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+    return sum(_SPREAD_BYTE[byte] << (_LANE * 8 * i) for i, byte in enumerate(digest))
+
+
+def _tokens(text):
+    words = _WORD.findall(_DIGITS.sub('0', text.lower()))[:MAX_TOKENS]
+    if len(words) < 2:
+        return words
+    # Bigrams, so reordered text is not a duplicate
+    return list(zip(words, words[1:]))
+
+
+def simhash(text):
+    """SimHash of ``text`` as the top bits of 64 16-bit lanes (see the module docstring)."""
+    tokens = _tokens(text)
+    if not tokens:
+        return 0
+    total = sum(map(_spread_token, tokens))
+    # A lane's top bit ends up set when more than half of the tokens had its bit
+    majority = len(tokens) // 2 + 1
+    return (total + _ONES * ((1 << (_LANE - 1)) - majority)) & _TOP_BITS
+
+
+def distance(first, second):
+    """Number of bits two SimHashes differ in."""
+    return bin(first ^ second).count('1')
+
+
+class Fingerprint:
+    """The exact and near fingerprints of one message.
+
+    ``near`` is only worked out when first asked for, so exact copies never
+    pay for a SimHash; it is None if ``text`` was None.
+    """
+
+    __slots__ = ('sender', 'exact', '_text', '_near')
+
+    def __init__(self, sender, exact, text):
+        self.sender = sender
+        self.exact = exact
+        self._text = text
+        self._near = None
+
+    @property
+    def near(self):
+        if self._text is not None:
+            self._near = simhash(self._text)
+            self._text = None
+        return self._near
+
+    def complete(self):
+        """Work ``near`` out now, e.g. on a pool worker rather than in the merge."""
+        self.near
+        return self
+
+
+def fingerprint(email_data, near=True):
+    """``Fingerprint`` of a kept inbox ``records.EmailRecord``."""
+    sender = email_data.sender_email.lower()
+    subject = normalize_subject(email_data.subject)
+    preview = ' '.join(email_data.preview.lower().split())
+    exact = hashlib.blake2b('\0'.join((sender, subject, preview)).encode('utf-8'), digest_size=16).digest()
+    return Fingerprint(sender, exact, f"{subject}\n{preview}" if near else None)
+
+
+class DuplicateIndex:
+    """Conversation keys by fingerprint, exact and (optionally) near."""
+
+    def __init__(self, near=True):
+        self.near = near
+        self._exact = {}
+        self._bands = {}
+
+    def __len__(self):
+        return len(self._exact)
+
+    def fingerprint(self, email_data):
+        return fingerprint(email_data, self.near)
+
+    def file(self, fp, key):
+        """Key of an earlier conversation ``fp`` duplicates; else file ``fp`` under ``key`` and return None."""
+        earlier = self._exact.get(fp.exact)
+        if earlier is not None:
+            return earlier
+        fp_near = fp.near
+        if fp_near:
+            bands = [(fp.sender, band, fp_near >> (band * _BAND_BITS) & _BAND_MASK) for band in range(BANDS)]
+            for band in bands:
+                for near, earlier in self._bands.get(band, ()):
+                    if distance(near, fp_near) <= MAX_DISTANCE:
+                        # Exact copies of this one then skip the SimHash
+                        self._exact[fp.exact] = earlier
+                        return earlier
+            for band in bands:
+                bucket = self._bands.setdefault(band, [])
+                if len(bucket) < MAX_BUCKET:
+                    bucket.append((fp_near, key))
+        self._exact[fp.exact] = key
+        return None
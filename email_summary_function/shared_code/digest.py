@@ -0,0 +1,168 @@
+"""Running statistics over a classification pass, for the digest section.
+
+While emails are classified, ``Digest`` keeps counters rather than rows, so
+a mailbox of any size is summarized in memory that grows with the number of
+distinct keys, never with the number of messages:
+
+* important inbox messages per sender domain, per matched keyword (and VIP
+  sender), per hour of the day and per day, both in UTC.  Domains past
+  ``MAX_DOMAINS`` are counted under ``OTHER_DOMAIN``.
+* reply latency of sent threads: the latest sent time per thread, compared
+  in ``finish`` with the latest inbound time of the same thread.  A thread
+  counts as answered when something came in after the last message sent to
+  it, and its latency is the time between the two.  Only the latest inbound
+  time per thread is known (see ``threads.ThreadIndex``), so a thread that
+  was answered twice counts up to the second answer.
+
+Counts follow the rows offered to the ``Classifier``, so they also cover
+memoized, pooled and (in incremental runs) cached messages.
+"""
+from datetime import datetime, timezone
+from functools import lru_cache
+
+MAX_DOMAINS = 1000
+OTHER_DOMAIN = '(other)'
+UNKNOWN_DOMAIN = '(unknown)'
+PERCENTILES = (50, 90, 99)
+# Epoch seconds that ``day_label`` can show (years 1 to 9999); others count as undated
+FIRST_TIMESTAMP = datetime(1, 1, 1, tzinfo=timezone.utc).timestamp()
+END_TIMESTAMP = datetime(9999, 12, 31, tzinfo=timezone.utc).timestamp() + 86400
+
+
+# Senders repeat a lot within a mailbox
+@lru_cache(maxsize=4096)
+def sender_domain(address):
+    """Lowercased domain of an address, or ``UNKNOWN_DOMAIN``."""
+    _, at, domain = str(address or '').rpartition('@')
+    return domain.strip().lower() if at and domain.strip() else UNKNOWN_DOMAIN
+
+
+def day_label(day):
+    """``YYYY-MM-DD`` of a day number (days since the epoch, UTC)."""
+    return datetime.fromtimestamp(day * 86400, timezone.utc).date().isoformat()
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    rank = max(-(-len(ordered) * pct // 100), 1)
+    return ordered[int(rank) - 1]
+
+
+class Digest:
+    """Counters over the important inbox mail and latest sent time per thread."""
+
+    def __init__(self):
+        self.messages = 0
+        self.vip = 0
+        self.undated = 0
+        self.domains = {}
+        self.keywords = {}
+        self.hours = [0] * 24
+        # Day number (days since the epoch) -> messages
+        self.days = {}
+        # Thread keys -> latest sent time
+        self._sent = {}
+        # Set by finish(): answered sent threads and their latencies in seconds
+        self.sent_threads = 0
+        self.latencies = []
+
+    def add_inbox(self, email_data):
+        """Count a kept inbox ``records.EmailRecord``."""
+        self.messages += 1
+        self.vip += email_data.is_vip
+        domains = self.domains
+        domain = sender_domain(email_data.sender_email)
+        if domain not in domains and len(domains) >= MAX_DOMAINS:
+            domain = OTHER_DOMAIN
+        domains[domain] = domains.get(domain, 0) + 1
+        keywords = self.keywords
+        for keyword in email_data.matched_keywords:
+            keywords[keyword] = keywords.get(keyword, 0) + 1
+        timestamp = email_data.timestamp
+        # Also rejects NaN and infinite numeric dates
+        if timestamp is None or not FIRST_TIMESTAMP <= timestamp < END_TIMESTAMP:
+            self.undated += 1
+            return
+        day, seconds = divmod(int(timestamp), 86400)
+        self.hours[seconds // 3600] += 1
+        self.days[day] = self.days.get(day, 0) + 1
+
+    def add_sent(self, email_data):
+        """Note a dated sent ``records.EmailRecord`` for the reply latencies."""
+        keys = email_data.thread_keys
+        if keys == ('', ''):
+            return
+        sent = self._sent
+        if email_data.timestamp > sent.get(keys, float('-inf')):
+            sent[keys] = email_data.timestamp
+
+    def partial(self):
+        return (self.messages, self.vip, self.undated, self.domains, self.keywords, self.hours, self.days,
+                list(self._sent.items()))
+
+    def merge(self, partial):
+        """Add the ``partial()`` of another digest, e.g. from a pool worker."""
+        messages, vip, undated, domains, keywords, hours, days, sent = partial
+        self.messages += messages
+        self.vip += vip
+        self.undated += undated
+        for domain, count in domains.items():
+            if domain not in self.domains and len(self.domains) >= MAX_DOMAINS:
+                domain = OTHER_DOMAIN
+            self.domains[domain] = self.domains.get(domain, 0) + count
+        for keyword, count in keywords.items():
+            self.keywords[keyword] = self.keywords.get(keyword, 0) + count
+        self.hours = [mine + theirs for mine, theirs in zip(self.hours, hours)]
+        for day, count in days.items():
+            self.days[day] = self.days.get(day, 0) + count
+        for keys, timestamp in sent:
+            if timestamp > self._sent.get(keys, float('-inf')):
+                self._sent[keys] = timestamp
+
+    def finish(self, threads):
+        """Work out the reply latencies against the complete ``threads.ThreadIndex``."""
+        latencies = []
+        latest_inbound = threads.latest_inbound
+        for keys, sent_at in self._sent.items():
+            replied_at = latest_inbound(keys)
+            if replied_at is not None and replied_at > sent_at:
+                latencies.append(replied_at - sent_at)
+        latencies.sort()
+        self.sent_threads = len(self._sent)
+        self.latencies = latencies
+        return self
+
+    def top_domains(self, limit=None):
+        """``(domain, count)`` pairs, most messages first."""
+        ranked = sorted(self.domains.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
+
+    def top_keywords(self):
+        return sorted(self.keywords.items(), key=lambda item: (-item[1], item[0]))
+
+    def daily(self):
+        """``(YYYY-MM-DD, count)`` pairs, oldest first."""
+        return [(day_label(day), count) for day, count in sorted(self.days.items())]
+
+    def latency_percentiles(self):
+        """``{percentile: hours}`` of the reply latencies (None without answered threads)."""
+        return {pct: None if not self.latencies else round(percentile(self.latencies, pct) / 3600, 1)
+                for pct in PERCENTILES}
+
+    def to_dict(self):
+        return {
+            'messages': self.messages,
+            'vip': self.vip,
+            'undated': self.undated,
+            'domains': dict(self.top_domains()),
+            'keywords': dict(self.top_keywords()),
+            'hours_utc': list(self.hours),
+            'days_utc': dict(self.daily()),
+            'replies': {
+                'sent_threads': self.sent_threads,
+                'answered': len(self.latencies),
+                **{f"p{pct}_hours": hours for pct, hours in self.latency_percentiles().items()},
+            },
+        }
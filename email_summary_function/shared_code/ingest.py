@@ -0,0 +1,263 @@
+"""Streaming ingestion of the Power Automate payload.
+
+The payload is one JSON object holding an ``inbox`` and a ``sent`` array.
+Instead of materializing the whole document with ``json.loads`` we walk the
+top-level object by hand and decode the array elements one at a time, so
+each email can be classified (and dropped) before the next one is read.
+Batch payloads (a ``mailboxes`` array of such objects) are walked the same
+way, one mailbox at a time.  Offline runs can also feed JSON lines, one
+email per line.
+"""
+import codecs
+import json
+import logging
+
+CHUNK_SIZE = 64 * 1024
+EMAIL_FOLDERS = ('inbox', 'sent')
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+# Characters that can continue a number raw_decode stopped short of
+_NUMBER_TAIL = '.eE+-'
+
+
+class EmptyPayloadError(ValueError):
+    """Raised when the request body holds no email data at all."""
+
+
+def iter_chunks(source, chunk_size=CHUNK_SIZE):
+    """Yield text chunks from bytes, str or a binary/text file object."""
+    if isinstance(source, str):
+        yield source
+        return
+
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for start in range(0, len(view), chunk_size):
+            yield decoder.decode(view[start:start + chunk_size])
+    else:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk if isinstance(chunk, str) else decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+
+class _Scanner:
+    """Minimal pull parser over a stream of text chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        for chunk in self._chunks:
+            if chunk:
+                self._buf = self._buf[self._pos:] + chunk
+                self._pos = 0
+                return True
+        self._eof = True
+        return False
+
+    def peek(self):
+        # Skip whitespace and return the next character ('' at end of input)
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self._buf, self._pos)
+        self._pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # Most likely the value is split across chunks - read more and retry
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk;
+            # so may one cut after '.' or an exponent, which decodes to a prefix
+            if (not self._eof
+                    and (end == len(self._buf)
+                         or (isinstance(obj, (int, float)) and self._buf[end] in _NUMBER_TAIL))
+                    and self._fill()):
+                continue
+            self._pos = end
+            return obj
+
+    def at_end(self):
+        return self.peek() == ''
+
+
+def _iter_array(scanner, folder):
+    scanner.expect('[')
+    if scanner.peek() == ']':
+        scanner.expect(']')
+        return
+    while True:
+        yield folder, scanner.value()
+        if scanner.peek() == ',':
+            scanner.expect(',')
+            continue
+        scanner.expect(']')
+        return
+
+
+def _iter_members(scanner, keys):
+    # Walk the top-level object, yielding (key, element) for the arrays in keys
+    scanner.expect('{')
+    if scanner.peek() == '}':
+        raise EmptyPayloadError('Request body is an empty object')
+
+    while True:
+        key = scanner.value()
+        scanner.expect(':')
+        if key in keys:
+            if scanner.peek() == '[':
+                yield from _iter_array(scanner, key)
+            else:
+                value = scanner.value()
+                logging.warning(f"{key} is not a list, it's {type(value)}")
+        else:
+            scanner.value()
+
+        if scanner.peek() == ',':
+            scanner.expect(',')
+            continue
+        scanner.expect('}')
+        break
+
+    if not scanner.at_end():
+        raise ValueError('Unexpected data after the JSON object')
+
+
+def iter_emails(source, chunk_size=CHUNK_SIZE):
+    """Yield ``(folder, email)`` pairs from a raw JSON payload.
+
+    ``folder`` is ``'inbox'`` or ``'sent'``; emails come out in document
+    order.  Other top-level keys are decoded and discarded.  Raises
+    ``ValueError`` for malformed JSON and ``EmptyPayloadError`` when the
+    payload is empty.
+    """
+    scanner = _Scanner(iter_chunks(source, chunk_size))
+    first = scanner.peek()
+
+    if first == '':
+        raise EmptyPayloadError('Request body is empty')
+    if first == '"':
+        # Power Automate sometimes sends the JSON document as a JSON string
+        inner = scanner.value()
+        if not inner:
+            raise EmptyPayloadError('Request body is empty')
+        yield from iter_emails(inner, chunk_size)
+        return
+    if first != '{':
+        if not scanner.value():
+            raise EmptyPayloadError('Request body is empty')
+        raise ValueError('Expected a JSON object with inbox and sent arrays')
+
+    yield from _iter_members(scanner, EMAIL_FOLDERS)
+
+
+def iter_document(req_body):
+    """Yield ``(folder, email)`` pairs from an already parsed payload."""
+    if not req_body:
+        raise EmptyPayloadError('Request body is empty')
+    if isinstance(req_body, str):
+        req_body = json.loads(req_body)
+    if not isinstance(req_body, dict):
+        raise ValueError('Expected a JSON object with inbox and sent arrays')
+
+    for folder in EMAIL_FOLDERS:
+        emails = req_body.get(folder, [])
+        if not isinstance(emails, list):
+            logging.warning(f"{folder} is not a list, it's {type(emails)}")
+            continue
+        for email in emails:
+            yield folder, email
+
+
+def iter_mailboxes(source, chunk_size=CHUNK_SIZE):
+    """Yield the mailbox objects of a raw batch payload one at a time.
+
+    The payload is ``{"mailboxes": [...]}`` or just the list; each mailbox
+    is an object with its own ``inbox`` and ``sent`` arrays (see
+    ``batch.py``).  Only one mailbox is decoded at a time.
+    """
+    scanner = _Scanner(iter_chunks(source, chunk_size))
+    first = scanner.peek()
+
+    if first == '':
+        raise EmptyPayloadError('Request body is empty')
+    if first == '"':
+        inner = scanner.value()
+        if not inner:
+            raise EmptyPayloadError('Request body is empty')
+        yield from iter_mailboxes(inner, chunk_size)
+        return
+    if first == '{':
+        for _, mailbox in _iter_members(scanner, ('mailboxes',)):
+            yield mailbox
+        return
+    if first != '[':
+        raise ValueError('Expected a JSON object with a mailboxes array')
+
+    for _, mailbox in _iter_array(scanner, 'mailboxes'):
+        yield mailbox
+    if not scanner.at_end():
+        raise ValueError('Unexpected data after the JSON array')
+
+
+def iter_mailbox_document(req_body):
+    """Yield the mailbox objects of an already parsed batch payload."""
+    if not req_body:
+        raise EmptyPayloadError('Request body is empty')
+    if isinstance(req_body, str):
+        req_body = json.loads(req_body)
+    if isinstance(req_body, dict):
+        req_body = req_body.get('mailboxes', [])
+    if not isinstance(req_body, list):
+        raise ValueError('Expected a JSON object with a mailboxes array')
+    yield from req_body
+
+
+def iter_json_lines(source):
+    """Yield ``(folder, email)`` pairs from JSON lines, one email per line.
+
+    Each line is an email object with an optional ``"folder"`` key
+    (``"inbox"`` when missing); blank lines are skipped.  ``source`` is a
+    text or binary file, or any iterable of lines.
+    """
+    for number, line in enumerate(source, 1):
+        if isinstance(line, (bytes, bytearray)):
+            line = line.decode('utf-8-sig')
+        if not line.strip():
+            continue
+        try:
+            email = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}") from None
+        if not isinstance(email, dict):
+            logging.warning(f"Skipping line {number}: expected an email object")
+            continue
+        folder = email.pop('folder', 'inbox')
+        if folder not in EMAIL_FOLDERS:
+            logging.warning(f"Skipping line {number}: unknown folder {folder!r}")
+            continue
+        yield folder, email
@@ -0,0 +1,85 @@
+"""Single-pass multi-keyword matching.
+
+The keyword list is compiled once into one regular expression whose
+alternation is factored into a trie (``urgent|urgency`` becomes
+``urgen(?:t|cy)``), so the regex engine branches on each character instead
+of retrying every keyword at every position.  The pattern is wrapped in a
+lookahead so overlapping keywords are all reported.
+
+For short keyword lists CPython's substring search is faster than any regex
+(see ``benchmarks/bench_keywords.py``), so below ``REGEX_THRESHOLD`` keywords
+the matcher just runs ``keyword in text`` for each keyword.
+"""
+import re
+
+REGEX_THRESHOLD = 64
+
+
+def _trie_pattern(words):
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        if list(node) == ['']:
+            return ''
+        optional = '' in node
+        branches = [re.escape(char) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        pattern = '(?:' + '|'.join(branches) + ')'
+        return pattern + '?' if optional else pattern
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Matches a fixed set of lowercase keywords against lowercase text."""
+
+    def __init__(self, keywords):
+        self.keywords = tuple(dict.fromkeys(k.lower().strip() for k in keywords if k and k.strip()))
+        # Shorter keywords that are a prefix of a longer match at the same
+        # position are not reported by the regex, so look them up here.
+        self._contained = {
+            keyword: tuple(k for k in self.keywords if k != keyword and keyword.startswith(k))
+            for keyword in self.keywords
+        }
+        self._order = {keyword: i for i, keyword in enumerate(self.keywords)}
+        self.uses_regex = bool(self.keywords) and len(self.keywords) >= REGEX_THRESHOLD
+        if self.uses_regex:
+            body = _trie_pattern(self.keywords)
+            self._search = re.compile(body).search
+            self._finditer = re.compile(f'(?=({body}))').finditer
+        else:
+            self._search = self._finditer = None
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def search(self, *texts):
+        """Return True if any keyword occurs in any of ``texts``."""
+        if self._search is None:
+            # Keywords never contain a newline, so they cannot match across texts
+            text = '\n'.join(texts)
+            return any(keyword in text for keyword in self.keywords)
+        return any(self._search(text) is not None for text in texts if text)
+
+    def find(self, *texts):
+        """Return the keywords found in ``texts``, in keyword-list order."""
+        if self._finditer is None:
+            text = '\n'.join(texts)
+            return [keyword for keyword in self.keywords if keyword in text]
+        found = set()
+        for text in texts:
+            if not text:
+                continue
+            for match in self._finditer(text):
+                keyword = match.group(1)
+                if keyword not in found:
+                    found.add(keyword)
+                    found.update(self._contained[keyword])
+        return sorted(found, key=self._order.__getitem__)
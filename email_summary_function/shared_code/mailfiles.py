@@ -0,0 +1,104 @@
+"""Local ``.eml`` files and ``mbox`` mailboxes as Graph-shaped emails.
+
+``iter_mail_files`` reads mail with the standard ``email`` package and
+converts each message to the Graph shape (see ``adapters.py``), so real
+mail can be replayed and benchmarked without a tenant.  Only the CLI and
+the benchmarks import this module; the ``email`` package is slow to import
+and the function never needs it.
+"""
+import logging
+import mailbox
+import os
+import re
+from datetime import timezone
+from email import policy
+from email.parser import BytesParser
+from email.utils import getaddresses, parseaddr, parsedate_to_datetime
+
+# Graph's bodyPreview is the first 255 characters of the body
+PREVIEW_CHARS = 255
+
+_TAG = re.compile(r'<[^>]+>')
+
+
+def _iso(date_header):
+    try:
+        parsed = parsedate_to_datetime(str(date_header))
+    except (TypeError, ValueError, IndexError):
+        return ''
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _preview(message):
+    body = message.get_body(preferencelist=('plain', 'html'))
+    if body is None:
+        return ''
+    try:
+        text = body.get_content()
+    except (LookupError, ValueError):
+        return ''
+    if body.get_content_subtype() == 'html':
+        text = _TAG.sub(' ', text)
+    return ' '.join(text.split())[:PREVIEW_CHARS]
+
+
+def message_to_email(message, folder='inbox', fallback_id=''):
+    """Convert an ``email.message.EmailMessage`` to a Graph-shaped dict."""
+    name, address = parseaddr(str(message.get('From', '')))
+    message_id = str(message.get('Message-ID', '')).strip()
+    # The thread root: first References id, else In-Reply-To, else the message itself
+    references = str(message.get('References', '')).split() or str(message.get('In-Reply-To', '')).split()
+    # No Graph 'id': a Message-ID is not one, and would make a dead OWA link.
+    # The internetMessageId keys the message and its search link instead.
+    email = {
+        'internetMessageId': message_id,
+        'conversationId': references[0] if references else message_id or fallback_id,
+        'subject': str(message.get('Subject', '')),
+        'bodyPreview': _preview(message),
+        'from': {'emailAddress': {'name': name, 'address': address}},
+        'toRecipients': [{'emailAddress': {'name': to_name or to_address, 'address': to_address}}
+                         for to_name, to_address in getaddresses(
+                             [str(value) for value in message.get_all('To', [])]) if to_address],
+    }
+    email['sentDateTime' if folder == 'sent' else 'receivedDateTime'] = _iso(message.get('Date', ''))
+    return email
+
+
+def _iter_messages(path):
+    parser = BytesParser(policy=policy.default)
+    if path.lower().endswith('.eml'):
+        with open(path, 'rb') as f:
+            yield f"{path}#0", parser.parse(f)
+        return
+    box = mailbox.mbox(path, factory=parser.parse, create=False)
+    try:
+        for index, message in enumerate(box):
+            yield f"{path}#{index}", message
+    finally:
+        box.close()
+
+
+def iter_mail_files(paths, owner=None):
+    """Yield ``(folder, email)`` pairs from ``.eml`` files and mbox mailboxes.
+
+    ``paths`` may name files or directories (read recursively, ``.eml``
+    and ``.mbox`` files only).  Messages sent from ``owner`` (an address)
+    go to ``sent``, everything else to ``inbox``.
+    """
+    owner = owner.lower() if owner else None
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, name) for root, _, names in os.walk(path)
+                           for name in names if name.lower().endswith(('.eml', '.mbox')))
+        else:
+            files = [path]
+        for file_path in files:
+            try:
+                for fallback_id, message in _iter_messages(file_path):
+                    address = parseaddr(str(message.get('From', '')))[1].lower()
+                    folder = 'sent' if owner and address == owner else 'inbox'
+                    yield folder, message_to_email(message, folder, fallback_id)
+            except (OSError, mailbox.Error) as e:
+                logging.warning(f"Skipping {file_path}: {e}")
@@ -0,0 +1,83 @@
+"""Per-message rule matches, kept across requests in a worker.
+
+A rolling inbox window sends mostly the same messages on every run.  The
+memo remembers what the rules made of each inbox message - the
+``classify.match_inbox_email`` result, ``(is_vip, reply_after_days,
+matched_keywords, score)`` or None when it is not kept - keyed by message
+``id`` (or ``internetMessageId``), so a message seen before skips
+lowercasing and keyword scanning.  Outcomes are stored as 1-tuples, so a
+stored None is told apart from a miss.
+
+Only the match is memoized: the record shown in the report (subject, dates,
+sender, link) is rebuilt from the email of the current request.  The memo
+is shared by every request of the worker, and an ``internetMessageId`` is
+the same in every mailbox that got the message, so a stored record could
+carry another mailbox's link.  Sent mail has no rule matching and is not
+memoized.
+
+The time-dependent checks (VIP replies overdue, sent mail old enough to
+follow up) are still decided on every run.  The memo is emptied when the
+rules version changes and keeps at most ``max_entries`` messages, least
+recently seen dropped first.
+
+Unlike ``state.py`` this needs no ``mailbox`` parameter or database, but
+only lives as long as the worker process.
+"""
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 20000
+
+
+def memo_key(email):
+    """The message id, or None when there is nothing stable to key on."""
+    if not isinstance(email, dict):
+        # Left to the classifier, which counts it as a parse error
+        return None
+    for field in ('id', 'internetMessageId'):
+        key = email.get(field)
+        # Lists and objects cannot key the memo; a bool is no id
+        if key and isinstance(key, (str, int)) and not isinstance(key, bool):
+            return key
+    return None
+
+
+class ClassificationMemo:
+    """Bounded LRU of inbox rule matches."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.rules_version = None
+        self._entries = OrderedDict()
+
+    def use_rules(self, version):
+        # Matches depend on the keywords and VIP rules they were made with
+        if version != self.rules_version:
+            self.clear()
+            self.rules_version = version
+
+    def get(self, key):
+        """The stored outcome, or None if the message is new."""
+        entries = self._entries
+        outcome = entries.get(key)
+        if outcome is not None:
+            try:
+                entries.move_to_end(key)
+            except KeyError:
+                # Evicted by a concurrent request in the meantime
+                pass
+        return outcome
+
+    def put(self, key, outcome):
+        entries = self._entries
+        entries[key] = outcome
+        while len(entries) > self.max_entries:
+            try:
+                entries.popitem(last=False)
+            except KeyError:
+                break
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,155 @@
+"""Per-request stage timings and counters.
+
+A ``Metrics`` object collects wall time per stage and a few counters while a
+request is handled:
+
+* ``cache`` - hashing the body and looking it up in the response cache
+* ``parse`` - time spent pulling emails out of the payload
+* ``normalize`` - sender extraction (part of ``classify_inbox``)
+* ``classify_inbox`` / ``classify_sent`` - per-email classification
+* ``date_checks`` - ``Classifier.finish``
+* ``render``, ``write`` (CLI only) and ``total``
+
+Streaming interleaves parsing and classification, so ``time_emails`` times
+both at the boundaries of the email stream - one ``time.perf_counter`` call
+per boundary, accumulated in locals - which is cheap enough to leave on.
+Emails classified on a worker pool are only counted; their time shows up as
+``classify_*`` of the chunk hand-off, not of the work itself.
+
+``dump_first_emails`` replaces the old habit of logging ``str()`` of the
+whole payload: behind ``EMAIL_SUMMARY_DEBUG_DUMPS`` it logs the first
+email of each folder, cut to ``DUMP_CHARS``.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+DUMP_CHARS = 500
+# Reporting order; other stages follow in the order they were first timed
+STAGE_ORDER = ('cache', 'parse', 'normalize', 'classify_inbox', 'classify_sent', 'date_checks', 'render', 'write', 'total')
+
+
+class Metrics:
+    """Stage timings (seconds) and counters for one request."""
+
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+        # (stage, [seconds]) accumulated by timed() wrappers
+        self._pending = []
+
+    def add_time(self, stage, seconds):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed(self, stage, func):
+        """``func`` wrapped so its calls add up under ``stage``."""
+        perf_counter = time.perf_counter
+        spent = [0.0]
+        self._pending.append((stage, spent))
+
+        def wrapper(*args):
+            start = perf_counter()
+            result = func(*args)
+            spent[0] += perf_counter() - start
+            return result
+        return wrapper
+
+    def time_emails(self, emails):
+        """Yield ``(folder, email)`` pairs, timing both sides of the stream.
+
+        Time spent producing a pair goes to ``parse``, time until the
+        consumer asks for the next one to ``classify_<folder>``.  Both come
+        from the same timestamps, one ``perf_counter`` call per boundary.
+        """
+        perf_counter = time.perf_counter
+        spent = {'parse': 0.0, 'classify_inbox': 0.0, 'classify_sent': 0.0}
+        emails = iter(emails)
+        last = perf_counter()
+        try:
+            while True:
+                try:
+                    item = next(emails)
+                except StopIteration:
+                    spent['parse'] += perf_counter() - last
+                    return
+                now = perf_counter()
+                spent['parse'] += now - last
+                yield item
+                last = perf_counter()
+                spent['classify_' + item[0]] += last - now
+        finally:
+            for stage, seconds in spent.items():
+                if seconds:
+                    self.add_time(stage, seconds)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def count_classifier(self, classifier):
+        counters = self.counters
+        counters['inbox_seen'] = classifier.inbox_seen
+        counters['sent_seen'] = classifier.sent_seen
+        counters['inbox_kept'] = classifier.important_messages
+        counters['inbox_threads'] = len(classifier.important_inbox) + classifier.important_more
+        counters['duplicates'] = classifier.important_duplicates
+        counters['urgent'] = len(classifier.vip_emails_needing_reply) + classifier.urgent_more
+        counters['follow_ups'] = len(classifier.old_sent_emails) + classifier.follow_up_more
+        counters['parse_errors'] = classifier.parse_errors
+        counters['date_errors'] = classifier.date_errors
+        if classifier.memo is not None:
+            counters['memo_hits'] = classifier.memo_hits
+
+    def ordered_timings(self):
+        for stage, spent in self._pending:
+            self.add_time(stage, spent[0])
+            spent[0] = 0.0
+        order = {stage: i for i, stage in enumerate(STAGE_ORDER)}
+        return sorted(self.timings.items(), key=lambda item: order.get(item[0], len(order)))
+
+    def server_timing(self):
+        """The timings as a ``Server-Timing`` header value."""
+        return ', '.join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.ordered_timings())
+
+    def as_dict(self):
+        return {
+            'timings_ms': {stage: round(seconds * 1000, 3) for stage, seconds in self.ordered_timings()},
+            'counters': dict(self.counters),
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), separators=(',', ':'))
+
+
+@contextmanager
+def stage(metrics, name):
+    """``metrics.stage(name)``, or nothing when metrics are off."""
+    if metrics is None:
+        yield
+    else:
+        with metrics.stage(name):
+            yield
+
+
+def dump_first_emails(emails, limit=DUMP_CHARS):
+    """Pass ``(folder, email)`` pairs through, logging the first of each folder."""
+    dumped = set()
+    for folder, email in emails:
+        if folder not in dumped:
+            dumped.add(folder)
+            try:
+                text = json.dumps(email, default=str)
+            except (TypeError, ValueError):
+                text = repr(email)
+            if len(text) > limit:
+                text = text[:limit] + f'... ({len(text)} chars)'
+            logging.info(f"First {folder} email: {text}")
+        yield folder, email
@@ -0,0 +1,116 @@
+"""Optional parallel classification on a process (or thread) pool.
+
+The first ``threshold`` emails are classified inline.  If the payload turns
+out to be bigger than that, the rest are cut into chunks of ``chunk_size``
+and classified on a pool while the stream is still being read; the partial
+results are merged back in submission order, so rows of equal priority keep
+the input order.  Small payloads therefore never pay for the pool, and the pool is
+created once per worker process and reused by later requests.
+
+``benchmarks/bench_parallel.py`` shows where the pool starts to pay off.
+On a single-CPU host (e.g. the consumption plan) it never does, so the pool
+is only used when more than one CPU is available.
+"""
+import logging
+import os
+from collections import deque
+
+from .classify import Classifier
+from .rules import RuleSet, load_rules
+
+DEFAULT_THRESHOLD = 20_000
+DEFAULT_CHUNK_SIZE = 2_000
+MAX_WORKER_RULES = 64
+
+_pools = {}
+_worker_rules = {}
+
+
+def get_pool(executor='process', workers=None):
+    key = (executor, workers)
+    pool = _pools.get(key)
+    if pool is None:
+        # multiprocessing is slow to import and small payloads never need it
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        pool_class = ThreadPoolExecutor if executor == 'thread' else ProcessPoolExecutor
+        pool = _pools[key] = pool_class(max_workers=workers)
+    return pool
+
+
+def shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown(wait=False)
+    _pools.clear()
+
+
+def worker_rules(config, version):
+    # Compile each rules version once per worker process
+    rules = _worker_rules.get(version)
+    if rules is None:
+        # Batches with per-mailbox overrides can bring many versions
+        if len(_worker_rules) >= MAX_WORKER_RULES:
+            _worker_rules.clear()
+        rules = _worker_rules[version] = RuleSet(config)
+    return rules
+
+
+def _classify_chunk(config, version, now, chunk):
+    classifier = Classifier(worker_rules(config, version), now=now)
+    # Duplicates are folded by the merge, in input order, as they would be inline
+    classifier.conversations.duplicates = None
+    for folder, email in chunk:
+        classifier.add(folder, email)
+    return classifier.partial()
+
+
+def classify_parallel(emails, rules=None, threshold=DEFAULT_THRESHOLD, chunk_size=DEFAULT_CHUNK_SIZE,
+                      executor='process', workers=None, metrics=None, memo=None):
+    """Classify ``(folder, email)`` pairs, using a pool past ``threshold`` emails.
+
+    Returns the finished ``Classifier``, exactly as ``Classifier().feed``
+    would.  A threshold of 0 or less, or a single available CPU, keeps
+    everything inline.  ``memo`` is only used inline; pool workers run in
+    other processes.
+    """
+    classifier = Classifier(rules if rules is not None else load_rules(), metrics=metrics, memo=memo)
+    workers = workers or os.cpu_count() or 1
+    if threshold <= 0 or workers <= 1:
+        return classifier.feed(emails)
+    emails = iter(emails)
+
+    for folder, email in emails:
+        classifier.add(folder, email)
+        if classifier.inbox_seen + classifier.sent_seen >= threshold:
+            break
+    else:
+        return classifier.finish()
+
+    pool = get_pool(executor, workers)
+    rules = classifier.rules
+    pending = deque()
+    chunks = 0
+
+    def submit(chunk):
+        pending.append(pool.submit(_classify_chunk, rules.config, rules.version,
+                                   classifier.now, chunk))
+
+    chunk = []
+    for item in emails:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            submit(chunk)
+            chunks += 1
+            chunk = []
+            # Bound the emails in flight; merging in order keeps the input order
+            while len(pending) > 2 * workers:
+                classifier.merge(pending.popleft().result())
+    if chunk:
+        submit(chunk)
+        chunks += 1
+    while pending:
+        classifier.merge(pending.popleft().result())
+
+    logging.info(f"Classified {chunks} chunks of up to {chunk_size} emails on a {executor} pool")
+    if metrics is not None:
+        metrics.count('pool_chunks', chunks)
+    return classifier.finish()
@@ -0,0 +1,293 @@
+"""The request pipeline shared by the functions, the CLI and the local server.
+
+``handle_emails`` and ``handle_batch`` take a raw request body and its query
+parameters and return a ``Response``; ``process_emails`` and
+``process_batch`` only wrap it in an ``azure.functions.HttpResponse``, and
+``server.py`` in a plain ``http.server`` response, so all of them behave
+the same.  ``process_emails_async`` runs ``handle_emails`` through
+``aio.py`` instead.  App settings are read once into a ``Settings`` tuple.
+
+Only what every request needs is imported with this module; the state
+database, batch requests and worker pools are imported on first use, to
+keep cold starts short (``benchmarks/bench_coldstart.py`` checks it).
+"""
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from . import cache, ingest, memo, parallel, render, renderers
+from .dates import utc_now
+from .metrics import Metrics, dump_first_emails, stage
+from .rules import load_rules
+
+Settings = namedtuple('Settings', [
+    'ingest_mode', 'output_mode', 'state_db', 'state_retention_days',
+    'parallel_threshold', 'parallel_executor', 'parallel_workers',
+    'batch_workers', 'batch_report_dir', 'metrics', 'debug_dumps',
+    'response_cache', 'response_cache_ttl', 'response_cache_entries', 'memo_entries', 'async_executor',
+])
+
+Response = namedtuple('Response', 'status_code body headers')
+# Per-request headers, never stored with a cached report
+METRICS_HEADERS = ('Server-Timing', 'X-Email-Summary-Metrics')
+
+_state_stores = {}
+_response_caches = {}
+_memos = {}
+_FALSE = ('', '0', 'false', 'no', 'off')
+
+
+def settings_from_env(environ=None):
+    """Read the ``EMAIL_SUMMARY_*`` app settings (see the README)."""
+    environ = os.environ if environ is None else environ
+    return Settings(
+        # "stream" decodes the inbox/sent arrays one email at a time straight
+        # from the raw body; "json" parses the whole body first.
+        ingest_mode=environ.get('EMAIL_SUMMARY_INGEST_MODE', 'stream'),
+        # "memory" joins the report into one string; "spool" writes it section
+        # by section to a temporary file (spilling to disk when large) and
+        # returns the file's bytes, so the report never exists as one big str.
+        output_mode=environ.get('EMAIL_SUMMARY_OUTPUT_MODE', 'memory'),
+        # With a state database, requests carrying ?mailbox=<id> only classify
+        # mail that was not seen on an earlier run for that mailbox.
+        state_db=environ.get('EMAIL_SUMMARY_STATE_DB'),
+        state_retention_days=float(environ.get('EMAIL_SUMMARY_STATE_RETENTION_DAYS', '14')),
+        # Payloads with more emails than this are classified on a worker pool
+        # when more than one CPU is available; 0 turns the pool off.
+        parallel_threshold=int(environ.get('EMAIL_SUMMARY_PARALLEL_THRESHOLD', str(parallel.DEFAULT_THRESHOLD))),
+        parallel_executor=environ.get('EMAIL_SUMMARY_PARALLEL_EXECUTOR', 'process'),
+        parallel_workers=int(environ.get('EMAIL_SUMMARY_PARALLEL_WORKERS', '0')) or None,
+        batch_workers=int(environ.get('EMAIL_SUMMARY_BATCH_WORKERS', '0')) or None,
+        # With a report directory each batch mailbox's report is written there
+        # and the response carries its path instead of the HTML
+        batch_report_dir=environ.get('EMAIL_SUMMARY_BATCH_REPORT_DIR'),
+        # Stage timings and counters in Server-Timing / X-Email-Summary-Metrics
+        # response headers; cheap enough to leave on
+        metrics=environ.get('EMAIL_SUMMARY_METRICS', 'on').strip().lower() not in _FALSE,
+        # Log the first email of each folder (cut short) for debugging payloads
+        debug_dumps=environ.get('EMAIL_SUMMARY_DEBUG_DUMPS', 'off').strip().lower() not in _FALSE,
+        # "memory" keeps finished responses in the worker, a file path shares
+        # them between workers through SQLite, "off" disables (see cache.py)
+        response_cache=environ.get('EMAIL_SUMMARY_RESPONSE_CACHE', 'memory'),
+        response_cache_ttl=float(environ.get('EMAIL_SUMMARY_RESPONSE_CACHE_TTL', str(cache.DEFAULT_TTL))),
+        response_cache_entries=int(environ.get('EMAIL_SUMMARY_RESPONSE_CACHE_ENTRIES',
+                                               str(cache.DEFAULT_MAX_ENTRIES))),
+        # Messages per folder whose classification is remembered between
+        # requests (see memo.py); 0 turns the memo off
+        memo_entries=int(environ.get('EMAIL_SUMMARY_MEMO_ENTRIES', str(memo.DEFAULT_MAX_ENTRIES))),
+        # Where process_emails_async classifies: "thread" (the event loop's
+        # thread pool) or "process" (a process pool of PARALLEL_WORKERS)
+        async_executor=environ.get('EMAIL_SUMMARY_ASYNC_EXECUTOR', 'thread'),
+    )
+
+
+def get_state_store(settings):
+    store = _state_stores.get(settings.state_db)
+    if store is None:
+        from .state import StateStore
+        store = _state_stores[settings.state_db] = StateStore(
+            settings.state_db, retention_days=settings.state_retention_days)
+    return store
+
+
+def get_response_cache(settings):
+    """The configured response cache, or None when it is off."""
+    spec = (settings.response_cache, settings.response_cache_entries, settings.response_cache_ttl)
+    if spec not in _response_caches:
+        _response_caches[spec] = cache.open_cache(*spec)
+    return _response_caches[spec]
+
+
+def get_memo(settings):
+    """The worker's classification memo, or None when it is off."""
+    if settings.memo_entries <= 0:
+        return None
+    classification_memo = _memos.get(settings.memo_entries)
+    if classification_memo is None:
+        classification_memo = _memos[settings.memo_entries] = memo.ClassificationMemo(settings.memo_entries)
+    return classification_memo
+
+
+def response_cache_key(body, mailbox, settings, rules=None, formats=(renderers.DEFAULT_FORMAT,)):
+    """Everything a report depends on besides the time of day (see cache.py)."""
+    rules = rules if rules is not None else load_rules()
+    return cache.cache_key(body, rules.version, utc_now().strftime('%Y-%m-%d'),
+                           mailbox or '', settings.output_mode, ','.join(formats))
+
+
+def request_formats(params, headers=None):
+    """The output formats a request asked for (see renderers.py).
+
+    Raises ``renderers.NotAcceptable`` for an unknown ``?format=``.
+    """
+    return renderers.negotiate(params.get('format'), (headers or {}).get('Accept'))
+
+
+def format_watermarks(watermarks):
+    return ';'.join(
+        f"{folder}={datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}"
+        for folder, ts in sorted(watermarks.items()))
+
+
+def read_emails(body, ingest_mode='stream'):
+    """``(folder, email)`` pairs from a request body (bytes, str or file)."""
+    if ingest_mode == 'json':
+        if hasattr(body, 'read'):
+            body = body.read()
+        return ingest.iter_document(json.loads(body))
+    return ingest.iter_emails(body)
+
+
+def classify(emails, settings, mailbox=None, metrics=None, rules=None):
+    """Classify ``(folder, email)`` pairs; returns ``(classifier, watermarks)``.
+
+    ``watermarks`` is None unless the run was incremental (a state database
+    is configured and a ``mailbox`` given).  With ``metrics``, parsing and
+    classification are timed into it.  ``rules`` default to ``load_rules()``.
+    """
+    if settings.debug_dumps:
+        emails = dump_first_emails(emails)
+    if metrics is not None:
+        emails = metrics.time_emails(emails)
+    if settings.state_db and mailbox:
+        from .state import classify_incremental
+        return classify_incremental(get_state_store(settings), mailbox, emails, rules=rules, metrics=metrics)
+    classifier = parallel.classify_parallel(
+        emails, rules=rules, threshold=settings.parallel_threshold,
+        executor=settings.parallel_executor, workers=settings.parallel_workers, metrics=metrics,
+        memo=get_memo(settings))
+    return classifier, None
+
+
+def render_output(classifier, output_mode='memory', formats=(renderers.DEFAULT_FORMAT,)):
+    """``(report, content_type)``: the HTML report as a str, or as bytes in
+    spool mode; or the other ``formats`` of the same classification."""
+    if tuple(formats) != ('html',):
+        return renderers.render_formats(classifier, formats)
+    if output_mode == 'spool':
+        with render.spool_report(classifier) as report_file:
+            return report_file.read(), 'text/html'
+    return render.render_report(classifier), 'text/html'
+
+
+def add_metrics_headers(headers, metrics, started, classifier=None):
+    metrics.add_time('total', time.perf_counter() - started)
+    if classifier is not None:
+        metrics.count_classifier(classifier)
+    headers['Server-Timing'] = metrics.server_timing()
+    headers['X-Email-Summary-Metrics'] = metrics.to_json()
+    logging.info(f"Metrics: {headers['X-Email-Summary-Metrics']}")
+
+
+def handle_emails(body, params, settings, request_headers=None, rules=None):
+    """Handle one ``{inbox, sent}`` summary request.
+
+    ``request_headers`` only matter for their ``Accept`` header, which picks
+    the output format when there is no ``?format=``.  ``rules`` are the
+    ``load_rules()`` of the request when already loaded (see aio.py).
+    """
+    try:
+        mailbox = params.get('mailbox')
+        incremental = bool(settings.state_db and mailbox)
+        try:
+            formats = request_formats(params, request_headers)
+        except renderers.NotAcceptable as e:
+            return Response(406, str(e), {})
+        headers = {}
+        metrics = Metrics() if settings.metrics else None
+        started = time.perf_counter()
+
+        # Retries and overlapping runs send the same body again
+        response_cache = get_response_cache(settings)
+        key = None
+        if response_cache is not None and isinstance(body, (bytes, str)):
+            with stage(metrics, 'cache'):
+                key = response_cache_key(body, mailbox, settings, rules, formats)
+                cached = response_cache.get(key)
+            if cached is not None:
+                logging.info("Returning the cached report for an identical request.")
+                report, cached_headers = cached
+                headers.update(cached_headers)
+                headers['X-Email-Summary-Cache'] = 'hit'
+                if metrics is not None:
+                    add_metrics_headers(headers, metrics, started)
+                return Response(200, report, headers)
+            headers['X-Email-Summary-Cache'] = 'miss'
+
+        logging.info(f"Starting to process emails (ingest mode: {settings.ingest_mode}, incremental: {incremental})...")
+
+        # Parse JSON from Power Automate
+        try:
+            emails = read_emails(body, settings.ingest_mode)
+            classifier, watermarks = classify(emails, settings, mailbox, metrics, rules)
+        except ingest.EmptyPayloadError:
+            return Response(400, "Please pass inbox and sent email data in the request body", {})
+        except ValueError as e:
+            logging.error(f"Failed to parse JSON: {e}")
+            return Response(400, f"Invalid JSON format: {e}", {})
+        if watermarks is not None:
+            # Lets the flow ask only for mail newer than what was processed
+            headers['X-Email-Summary-Watermark'] = format_watermarks(watermarks)
+
+        logging.info(f"Inbox emails processed: {classifier.inbox_seen}, sent emails processed: {classifier.sent_seen}")
+        logging.info(f"Finished processing. Found {classifier.important_messages} important emails "
+                     f"in {len(classifier.important_inbox) + classifier.important_more} threads.")
+
+        with stage(metrics, 'render'):
+            report, headers['Content-Type'] = render_output(classifier, settings.output_mode, formats)
+        if key is not None:
+            response_cache.put(key, report, {name: value for name, value in headers.items()
+                                             if name != 'X-Email-Summary-Cache'})
+        if metrics is not None:
+            add_metrics_headers(headers, metrics, started, classifier)
+
+        # Return the report as plain string (not email sending)
+        return Response(200, report, headers)
+
+    except Exception as e:
+        logging.error(f"Error processing emails: {str(e)}")
+        return Response(500, f"Error processing emails: {str(e)}", {})
+
+
+def handle_batch(body, params, settings, request_headers=None):
+    """Handle a ``{"mailboxes": [...]}`` batch request (see ``batch.py``)."""
+    try:
+        from . import batch
+
+        # ?format=ndjson returns one line per mailbox, in the order they finished
+        output_format = params.get('format', 'json')
+
+        results = []
+        try:
+            if settings.ingest_mode == 'json':
+                mailboxes = ingest.iter_mailbox_document(json.loads(body))
+            else:
+                mailboxes = ingest.iter_mailboxes(body)
+            for mailbox_id, result in batch.iter_batch(mailboxes, executor=settings.parallel_executor,
+                                                       workers=settings.batch_workers,
+                                                       report_dir=settings.batch_report_dir):
+                results.append((mailbox_id, result))
+        except ingest.EmptyPayloadError:
+            return Response(400, "Please pass a list of mailboxes in the request body", {})
+        except ValueError as e:
+            logging.error(f"Failed to parse JSON: {e}")
+            return Response(400, f"Invalid JSON format: {e}", {})
+
+        failed = sum(1 for _, result in results if result['status'] != 'ok')
+        logging.info(f"Finished batch of {len(results)} mailboxes, {failed} failed.")
+
+        if output_format == 'ndjson':
+            body = ''.join(json.dumps(dict(mailbox=mailbox_id, **result)) + '\n'
+                           for mailbox_id, result in results)
+            content_type = 'application/x-ndjson'
+        else:
+            body = json.dumps({'mailboxes': dict(results), 'failed': failed})
+            content_type = 'application/json'
+        return Response(200, body, {'Content-Type': content_type})
+
+    except Exception as e:
+        logging.error(f"Error processing batch: {str(e)}")
+        return Response(500, f"Error processing batch: {str(e)}", {})
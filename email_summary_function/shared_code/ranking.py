@@ -0,0 +1,64 @@
+"""Bounded, priority-ranked report sections.
+
+Each section of the report (urgent VIP replies, important inbox mail, sent
+mail to follow up) keeps only its ``limit`` highest-priority rows, in a
+min-heap filled during the classification pass, and counts the rest so the
+report can say "+N more".  Memory and render cost then depend on the limits
+rather than on the size of the mailbox.  The follow-up section is the
+exception: whether a sent email got a reply is only known once the whole
+payload is read, so its candidates are kept (unbounded) until then.
+
+A row's priority combines its keyword weights and VIP weight (``score``)
+with its age::
+
+    priority = score + age_weight * min(age in days, max_age_days)
+
+so among equally matched emails the ones that have waited longest come
+first.  Ties keep the input order.
+"""
+import heapq
+from operator import itemgetter
+
+# Rows shown per section by default; 0 means no limit
+DEFAULT_LIMITS = {'urgent': 50, 'inbox': 100, 'sent': 50}
+
+
+def priority(score, timestamp, now_ts, age_weight, max_age_days):
+    if timestamp is None or not age_weight:
+        return score
+    age_days = max(now_ts - timestamp, 0.0) / 86400
+    return score + age_weight * min(age_days, max_age_days)
+
+
+class TopN:
+    """The ``limit`` items with the highest priority pushed so far."""
+
+    __slots__ = ('limit', 'more', '_heap', '_pushed')
+
+    def __init__(self, limit=0):
+        self.limit = limit
+        # Items pushed out of (or never let into) the heap
+        self.more = 0
+        self._heap = []
+        self._pushed = 0
+
+    def push(self, priority, item):
+        # -_pushed: of two equal priorities the later one is dropped first
+        self._pushed += 1
+        entry = (priority, -self._pushed, item)
+        if not self.limit or len(self._heap) < self.limit:
+            heapq.heappush(self._heap, entry)
+        else:
+            heapq.heappushpop(self._heap, entry)
+            self.more += 1
+
+    def entries(self):
+        """``(priority, item)`` pairs of the kept items, in the order pushed."""
+        return [(entry[0], entry[2]) for entry in sorted(self._heap, key=itemgetter(1), reverse=True)]
+
+    def items(self):
+        """The kept items, highest priority first."""
+        return [entry[2] for entry in sorted(self._heap, reverse=True)]
+
+    def __len__(self):
+        return len(self._heap)
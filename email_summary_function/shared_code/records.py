@@ -0,0 +1,119 @@
+"""The normalized record kept for every email that makes it into the report.
+
+Senders arrive in several shapes (nested ``from.emailAddress``, a flat
+``from`` object, a plain address string, or ``sender`` instead of
+``from``); ``parse_sender`` turns any of them into the same four strings
+once.  Kept emails are stored as ``EmailRecord`` - a ``__slots__`` class,
+so a large result set costs one small object per email instead of a dict -
+and the truncated preview shown in the report is worked out at render time
+instead of being stored next to the full one.
+"""
+
+# Characters of preview shown before "Read More", per folder
+PREVIEW_LENGTHS = {'inbox': 100, 'sent': 80}
+# Bump when the fields or how they are filled change, so cached rows (see state.py) are rebuilt
+RECORD_VERSION = 3
+
+
+def parse_sender(email):
+    """Return ``(name, address, display_name, display_address)`` of the sender.
+
+    ``name`` and ``address`` are lowercased for matching; the display
+    values are what the report shows.
+    """
+    # Handle different email structures - check for 'from' or 'sender' fields
+    from_field = email.get('from', email.get('sender', ''))
+
+    if isinstance(from_field, dict):
+        # Standard Outlook API format with nested structure
+        email_address_field = from_field.get('emailAddress', from_field)
+        if not isinstance(email_address_field, dict):
+            email_address_field = from_field
+        name = str(email_address_field.get('name', '')).lower()
+        address = str(email_address_field.get('address', '')).lower()
+        return (name, address, name.title() if name else 'Unknown Sender',
+                address if address else 'unknown@email.com')
+
+    if isinstance(from_field, str) and from_field:
+        # Power Automate format - from field is just the email address string
+        address = from_field.lower()
+        # Extract name from email if possible (before @ symbol)
+        if '@' in address:
+            name = address.split('@')[0].replace('.', ' ').replace('_', ' ')
+        else:
+            name = address
+        return name, address, name.title() if name else 'Unknown Sender', from_field
+
+    return '', '', 'Unknown Sender', 'unknown@email.com'
+
+
+def recipient_names(email):
+    """Comma-separated recipient names of a sent email, or 'Unknown'."""
+    names = []
+    recipients = email.get('toRecipients', [])
+    if isinstance(recipients, str):
+        # Power Automate: a ';'-separated string of addresses
+        names = [r.strip() for r in recipients.split(';') if r.strip()]
+    elif isinstance(recipients, list):
+        for r in recipients:
+            if isinstance(r, dict):
+                email_addr = r.get('emailAddress', {})
+                if isinstance(email_addr, dict):
+                    name = email_addr.get('name', '')
+                    if name:
+                        names.append(name)
+    return ', '.join(names) if names else 'Unknown'
+
+
+class EmailRecord:
+    """One kept inbox or sent email, as the report needs it.
+
+    ``date`` is the timestamp string as received and ``timestamp`` its
+    epoch seconds (None if it could not be parsed).  Inbox records carry
+    the sender and match details, sent records the recipients and thread
+    keys.
+    """
+
+    __slots__ = ('folder', 'subject', 'date', 'timestamp', 'preview', 'nav_link',
+                 'sender', 'sender_email', 'is_vip', 'reply_after_days', 'matched_keywords', 'score',
+                 'recipients', 'thread_keys')
+
+    def __init__(self, folder, subject, date, timestamp=None, preview='', nav_link='',
+                 sender='', sender_email='', is_vip=False, reply_after_days=None,
+                 matched_keywords=(), score=0.0, recipients='', thread_keys=('', '')):
+        self.folder = folder
+        self.subject = subject
+        self.date = date
+        self.timestamp = timestamp
+        self.preview = preview
+        self.nav_link = nav_link
+        self.sender = sender
+        self.sender_email = sender_email
+        self.is_vip = is_vip
+        self.reply_after_days = reply_after_days
+        self.matched_keywords = matched_keywords
+        self.score = score
+        self.recipients = recipients
+        self.thread_keys = thread_keys
+
+    def __repr__(self):
+        return f"EmailRecord({self.folder!r}, {self.subject!r}, {self.date!r})"
+
+    @property
+    def has_long_preview(self):
+        return len(self.preview) > PREVIEW_LENGTHS[self.folder]
+
+    @property
+    def preview_short(self):
+        limit = PREVIEW_LENGTHS[self.folder]
+        preview = self.preview
+        return preview[:limit] + '...' if len(preview) > limit else preview
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data['thread_keys'] = tuple(data.get('thread_keys') or ('', ''))
+        return cls(**data)
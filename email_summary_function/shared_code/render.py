@@ -0,0 +1,974 @@
+"""HTML report rendering.
+
+The stylesheet, script and page header never change between requests, so
+they are assembled once per worker into ``REPORT_HEAD``.  Each request only
+formats the rows.  ``iter_report`` yields the report section by section (big
+tables in chunks of rows), which can be streamed, spooled to a temporary
+file with ``spool_report`` or joined once with ``render_report`` - never
+grown with ``+=``.  Everything that comes from an email is HTML-escaped.
+
+The template itself is kept ASCII (emoji are written as character
+references): a single non-Latin-1 character makes CPython store the whole
+joined report as UCS-4, four bytes per character.
+
+``iter_mail_report`` is a compact variant for reports that are forwarded as
+an email body: a few lines of CSS instead of the dark-mode, print and
+responsive stylesheet, no script (mail clients strip it), and each preview
+sent once, its tail folded into a ``<details>`` element, instead of a short
+and a full copy with a "Read More" button.
+
+Both pages end with a digest section (``digest.Digest``): important mail
+per sender domain, keyword, hour and day, and reply latencies, as small
+count tables.  ``iter_mail_report(rows=False)`` is a page of only that and
+the summary counts, for mailboxes too big to list.
+"""
+import html
+from datetime import datetime
+from functools import lru_cache
+
+from .records import PREVIEW_LENGTHS
+
+ROWS_PER_CHUNK = 500
+SPOOL_MAX_SIZE = 1024 * 1024
+# Senders listed on a thread row before "+N"
+MAX_PARTICIPANTS = 3
+# Rows of the digest's domain table, and days of its day table
+DIGEST_DOMAINS = 10
+DIGEST_DAYS = 14
+
+STYLE = """
+    * {
+        margin: 0;
+        padding: 0;
+        box-sizing: border-box;
+    }
+
+    body {
+        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, system-ui, sans-serif;
+        line-height: 1.6;
+        color: #1a1a1a;
+        background: #ffffff;
+        min-height: 100vh;
+        padding: 20px;
+        transition: all 0.3s ease;
+    }
+
+    /* Dark mode styles */
+    @media (prefers-color-scheme: dark) {
+        body {
+            color: #e5e5e5;
+            background: #0d1117;
+        }
+
+        .container {
+            background: #161b22 !important;
+            border: 1px solid #30363d;
+        }
+
+        .summary {
+            background: #21262d !important;
+            border-left-color: #58a6ff !important;
+        }
+
+        .summary-item {
+            background: rgba(56, 139, 253, 0.1) !important;
+            border: 1px solid #30363d;
+        }
+
+        .summary-number {
+            color: #f0f6fc !important;
+        }
+
+        .summary-label, .more-rows {
+            color: #8b949e !important;
+        }
+
+        h2 {
+            color: #f0f6fc !important;
+            border-bottom-color: #58a6ff !important;
+        }
+
+        th {
+            background: #21262d !important;
+            color: #f0f6fc !important;
+            border-bottom: 1px solid #30363d;
+        }
+
+        td {
+            border-bottom-color: #30363d !important;
+        }
+
+        table {
+            background: #0d1117 !important;
+            border: 1px solid #30363d;
+        }
+
+        .urgent {
+            background: rgba(248, 81, 73, 0.1) !important;
+            border-left-color: #f85149 !important;
+        }
+
+        .sahithi-row {
+            background: rgba(255, 191, 0, 0.1) !important;
+            border-left-color: #ffbf00 !important;
+        }
+
+        .subject-cell {
+            color: #f0f6fc !important;
+        }
+
+        .sender-cell {
+            color: #e6edf3 !important;
+        }
+
+        .email-cell, .preview-cell {
+            color: #8b949e !important;
+        }
+
+        .date-cell {
+            color: #7d8590 !important;
+        }
+
+        .thread-count {
+            background: #30363d !important;
+            color: #f0f6fc !important;
+        }
+
+        .section h3 {
+            color: #f0f6fc !important;
+        }
+
+        .no-emails {
+            background: #21262d !important;
+            color: #8b949e !important;
+            border: 1px solid #30363d;
+        }
+    }
+
+    .container {
+        max-width: 1400px;
+        margin: 0 auto;
+        background: #ffffff;
+        border-radius: 12px;
+        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
+        overflow: hidden;
+        border: 1px solid #f3f4f6;
+    }
+
+    .header {
+        background: #1a1a1a;
+        color: #ffffff;
+        padding: 32px;
+        text-align: center;
+        border-bottom: 1px solid #374151;
+    }
+
+    .header h1 {
+        font-size: 2.25rem;
+        margin-bottom: 8px;
+        font-weight: 700;
+        letter-spacing: -0.025em;
+    }
+
+    .header .subtitle {
+        font-size: 1rem;
+        opacity: 0.85;
+        font-weight: 400;
+    }
+
+    .content {
+        padding: 32px;
+    }
+
+    .summary {
+        background: #f8fafc;
+        padding: 24px;
+        border-radius: 8px;
+        margin-bottom: 32px;
+        border-left: 4px solid #3b82f6;
+        border: 1px solid #e2e8f0;
+    }
+
+    .summary h3 {
+        color: #1e293b;
+        margin-bottom: 16px;
+        font-weight: 600;
+        font-size: 1.125rem;
+    }
+
+    .summary-grid {
+        display: grid;
+        grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+        gap: 16px;
+        margin-top: 16px;
+    }
+
+    .summary-item {
+        text-align: center;
+        padding: 16px;
+        background: rgba(59, 130, 246, 0.05);
+        border-radius: 6px;
+        border: 1px solid #e2e8f0;
+    }
+
+    .summary-number {
+        font-size: 1.875rem;
+        font-weight: 700;
+        color: #1e293b;
+        display: block;
+        line-height: 1;
+    }
+
+    .summary-label {
+        font-size: 0.875rem;
+        color: #64748b;
+        margin-top: 4px;
+        font-weight: 500;
+    }
+
+    .more-rows {
+        font-size: 0.875rem;
+        color: #64748b;
+        margin-top: -8px;
+    }
+
+    h2 {
+        color: #1e293b;
+        font-size: 1.5rem;
+        margin: 32px 0 16px 0;
+        padding-bottom: 8px;
+        border-bottom: 2px solid #3b82f6;
+        font-weight: 600;
+        letter-spacing: -0.025em;
+    }
+
+    .section {
+        margin-bottom: 40px;
+    }
+
+    table {
+        width: 100%;
+        border-collapse: collapse;
+        margin: 16px 0;
+        background: #ffffff;
+        border-radius: 8px;
+        overflow: hidden;
+        border: 1px solid #e2e8f0;
+    }
+
+    th {
+        background: #1e293b;
+        color: #ffffff;
+        font-weight: 600;
+        padding: 16px;
+        text-align: left;
+        font-size: 0.875rem;
+        letter-spacing: 0.025em;
+        text-transform: uppercase;
+    }
+
+    td {
+        padding: 16px;
+        border-bottom: 1px solid #f1f5f9;
+        vertical-align: top;
+    }
+
+    tr:hover {
+        background: #f8fafc;
+        transition: background-color 0.15s ease;
+    }
+
+    .urgent {
+        background: #fef2f2;
+        border-left: 4px solid #ef4444;
+        padding: 20px;
+        border-radius: 8px;
+        margin: 20px 0;
+        border: 1px solid #fecaca;
+    }
+
+    .sahithi-row {
+        background: #fffbeb;
+        border-left: 4px solid #f59e0b;
+    }
+
+    .email-link {
+        display: inline-block;
+        background: #1e293b;
+        color: #ffffff;
+        padding: 8px 16px;
+        text-decoration: none;
+        border-radius: 6px;
+        font-size: 0.875rem;
+        font-weight: 500;
+        transition: all 0.2s ease;
+        border: 1px solid transparent;
+    }
+
+    .email-link:hover {
+        background: #334155;
+        transform: translateY(-1px);
+        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
+        text-decoration: none;
+        color: #ffffff;
+    }
+
+    .urgent-link {
+        background: #dc2626;
+        color: #ffffff;
+    }
+
+    .urgent-link:hover {
+        background: #b91c1c;
+    }
+
+    .subject-cell {
+        font-weight: 600;
+        color: #1e293b;
+        max-width: 300px;
+    }
+
+    .sender-cell {
+        font-weight: 500;
+        color: #374151;
+    }
+
+    .thread-count {
+        display: inline-block;
+        margin-left: 6px;
+        padding: 0 6px;
+        border-radius: 9px;
+        background: #e2e8f0;
+        color: #374151;
+        font-size: 0.75rem;
+        font-weight: 600;
+    }
+
+    .section h3 {
+        color: #1e293b;
+        font-size: 1rem;
+        font-weight: 600;
+        margin: 24px 0 8px 0;
+    }
+
+    .digest th, .digest td {
+        padding: 6px 8px;
+        font-size: 0.8125rem;
+    }
+
+    .email-cell {
+        font-size: 0.875rem;
+        color: #6b7280;
+        font-family: ui-monospace, SFMono-Regular, 'SF Mono', monospace;
+    }
+
+    .date-cell {
+        font-size: 0.875rem;
+        color: #9ca3af;
+        white-space: nowrap;
+    }
+
+    .preview-cell {
+        font-size: 0.875rem;
+        color: #6b7280;
+        line-height: 1.5;
+        max-width: 300px;
+        position: relative;
+    }
+
+    .preview-text {
+        display: block;
+    }
+
+    .preview-short {
+        display: block;
+    }
+
+    .preview-full {
+        display: none;
+    }
+
+    .read-more-btn {
+        color: #3b82f6;
+        cursor: pointer;
+        font-weight: 500;
+        text-decoration: underline;
+        font-size: 0.75rem;
+        margin-top: 4px;
+        display: inline-block;
+    }
+
+    .read-more-btn:hover {
+        color: #2563eb;
+    }
+
+    .no-emails {
+        text-align: center;
+        padding: 40px;
+        color: #6b7280;
+        font-style: italic;
+        background: #f9fafb;
+        border-radius: 8px;
+        margin: 20px 0;
+        border: 1px solid #e5e7eb;
+    }
+
+    @media (max-width: 768px) {
+        body {
+            padding: 10px;
+        }
+
+        .container {
+            margin: 0;
+            border-radius: 8px;
+        }
+
+        .header {
+            padding: 24px 16px;
+        }
+
+        .header h1 {
+            font-size: 1.875rem;
+        }
+
+        .content {
+            padding: 20px 16px;
+        }
+
+        .summary {
+            padding: 16px;
+        }
+
+        .summary-grid {
+            grid-template-columns: 1fr;
+            gap: 12px;
+        }
+
+        table {
+            font-size: 0.875rem;
+        }
+
+        th, td {
+            padding: 12px 8px;
+        }
+
+        .preview-cell {
+            max-width: 200px;
+        }
+
+        h2 {
+            font-size: 1.25rem;
+            margin: 24px 0 12px 0;
+        }
+    }
+
+    /* Print styles */
+    @media print {
+        body {
+            background: white;
+            color: black;
+        }
+
+        .container {
+            box-shadow: none;
+            border: 1px solid #ccc;
+        }
+
+        .email-link {
+            background: #333 !important;
+            -webkit-print-color-adjust: exact;
+        }
+    }
+"""
+
+SCRIPT = """
+    function togglePreview(button, index) {
+        const shortDiv = document.getElementById('short-' + index);
+        const fullDiv = document.getElementById('full-' + index);
+
+        if (fullDiv.style.display === 'none' || !fullDiv.style.display) {
+            shortDiv.style.display = 'none';
+            fullDiv.style.display = 'block';
+            button.textContent = 'Read Less';
+        } else {
+            shortDiv.style.display = 'block';
+            fullDiv.style.display = 'none';
+            button.textContent = 'Read More';
+        }
+    }
+"""
+
+REPORT_HEAD = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <meta name="color-scheme" content="light dark">
+    <title>Daily Email Summary Report</title>
+    <style>{STYLE}    </style>
+    <script>{SCRIPT}    </script>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>&#128231; Daily Email Summary Report</h1>
+"""
+
+MAIL_STYLE = (
+    "body{font-family:'Segoe UI',Arial,sans-serif;font-size:14px;color:#1a1a1a;background:#fff}"
+    "h1{font-size:20px;margin:0}"
+    "h2{font-size:16px;margin:24px 0 8px;padding-bottom:4px;border-bottom:2px solid #3b82f6}"
+    "table{border-collapse:collapse;width:100%}"
+    "th{background:#1e293b;color:#fff;text-align:left;padding:6px 8px;font-size:12px}"
+    "td{padding:6px 8px;border-bottom:1px solid #e2e8f0;vertical-align:top}"
+    "a{color:#1d4ed8}"
+    ".vip td{background:#fffbeb}"
+    ".urgent{border-left:4px solid #ef4444}"
+    ".muted{color:#64748b;font-size:12px}"
+    ".count{background:#e2e8f0;border-radius:8px;padding:0 5px;font-size:11px}"
+    "h3{font-size:14px;margin:16px 0 4px}"
+    "summary{cursor:pointer}"
+)
+
+MAIL_HEAD = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<title>Daily Email Summary Report</title>
+<style>{MAIL_STYLE}</style>
+</head>
+<body>
+<h1>&#128231; Daily Email Summary Report</h1>
+"""
+
+MAIL_INBOX_TABLE_HEAD = '\n<table{css_class}><tr><th>Subject</th><th>{sender_label}</th><th>Received</th><th>Preview</th></tr>'
+
+MAIL_SENT_TABLE_HEAD = '\n<table><tr><th>Subject</th><th>Recipients</th><th>Sent Date</th><th>Preview</th></tr>'
+
+REPORT_TAIL = """
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+INBOX_TABLE_HEAD = """
+            <table>
+                <tr>
+                    <th>Subject</th>
+                    <th>{sender_label}</th>
+                    <th>Email</th>
+                    <th>Received</th>
+                    <th>Preview</th>
+                    <th>Open Email</th>
+                </tr>"""
+
+SENT_TABLE_HEAD = """
+            <table>
+                <tr>
+                    <th>Subject</th>
+                    <th>Recipients</th>
+                    <th>Sent Date</th>
+                    <th>Preview</th>
+                </tr>"""
+
+
+def escape(value):
+    return '' if value is None else html.escape(str(value))
+
+
+# Sender, address and date columns repeat a lot across rows
+escape_repeated = lru_cache(maxsize=4096)(escape)
+
+
+def _days(value):
+    return f"{value:g} day{'' if value == 1 else 's'}"
+
+
+def more_rows(count):
+    # Rows ranked below a section's limit are only counted (see ranking.py)
+    if not count:
+        return ''
+    return f'\n            <p class="more-rows">+{count} more not shown</p>'
+
+
+def preview_cell(email_data, index):
+    # Preview cell with read more functionality
+    # The short preview is only cut here, it is not stored on the record
+    preview_short = escape(email_data.preview_short)
+    if not email_data.has_long_preview:
+        return f'<td class="preview-cell">{preview_short}</td>'
+
+    return (f'<td class="preview-cell">'
+            f'<div class="preview-short" id="short-{index}">{preview_short}</div>'
+            f'<div class="preview-full" id="full-{index}" style="display: none;">'
+            f'{escape(email_data.preview)}</div>'
+            f'<span class="read-more-btn" onclick="togglePreview(this, \'{index}\')">Read More</span>'
+            f'</td>')
+
+
+def open_link(email_data, css_class='email-link'):
+    nav_link = email_data.nav_link
+    if not nav_link:
+        return 'N/A'
+    return f'<a href="{escape(nav_link)}" target="_blank" class="{css_class}">Open Email</a>'
+
+
+def subject_cell(email_data, strong=False, suffix='', matched=None):
+    subject = escape(email_data.subject)
+    if strong:
+        subject = f'<strong>{subject}</strong>'
+    subject += suffix
+    if matched is None:
+        matched = email_data.matched_keywords
+    if matched:
+        return f'<td class="subject-cell" title="Matched: {escape_repeated(", ".join(matched))}">{subject}</td>'
+    return f'<td class="subject-cell">{subject}</td>'
+
+
+def inbox_row(email_data, index, row_class='', urgent=False):
+    sender = escape_repeated(email_data.sender)
+    if urgent:
+        sender = f'<strong>{sender}</strong>'
+    link_class = 'email-link urgent-link' if urgent else 'email-link'
+    return f"""
+                <tr class="{row_class}">
+                    {subject_cell(email_data, strong=urgent)}
+                    <td class="sender-cell">{sender}</td>
+                    <td class="email-cell">{escape_repeated(email_data.sender_email)}</td>
+                    <td class="date-cell">{escape_repeated(email_data.date)}</td>
+                    {preview_cell(email_data, index)}
+                    <td>{open_link(email_data, link_class)}</td>
+                </tr>"""
+
+
+def participants(conversation):
+    # The newest message's sender first, matching the Email column
+    latest = conversation.latest
+    names = [latest.sender] + [name for address, name in conversation.participants.items()
+                               if address != latest.sender_email]
+    shown = ', '.join(escape_repeated(name) for name in names[:MAX_PARTICIPANTS])
+    if len(names) > MAX_PARTICIPANTS:
+        shown += f' +{len(names) - MAX_PARTICIPANTS}'
+    return shown
+
+
+def conversation_row(conversation, index):
+    # One row per thread: its newest message, with the message count and senders
+    email_data = conversation.latest
+    row_class = 'sahithi-row' if conversation.is_vip else ''
+    if conversation.count == 1:
+        return inbox_row(email_data, index, row_class)
+    if conversation.duplicates:
+        title = f"{conversation.count} messages, {conversation.duplicates} of them repeats of the first"
+    else:
+        title = 'Messages in this thread'
+    count = f' <span class="thread-count" title="{title}">{conversation.count}</span>'
+    return f"""
+                <tr class="{row_class}">
+                    {subject_cell(email_data, suffix=count, matched=conversation.matched_keywords)}
+                    <td class="sender-cell">{participants(conversation)}</td>
+                    <td class="email-cell">{escape_repeated(email_data.sender_email)}</td>
+                    <td class="date-cell">{escape_repeated(email_data.date)}</td>
+                    {preview_cell(email_data, index)}
+                    <td>{open_link(email_data)}</td>
+                </tr>"""
+
+
+def sent_row(email_data, index):
+    return f"""
+                <tr>
+                    {subject_cell(email_data)}
+                    <td class="sender-cell">{escape_repeated(email_data.recipients)}</td>
+                    <td class="date-cell">{escape_repeated(email_data.date)}</td>
+                    {preview_cell(email_data, index)}
+                </tr>"""
+
+
+def render_summary(summary, generated_at):
+    return f"""            <div class="subtitle">Generated on {generated_at.strftime('%B %d, %Y at %I:%M %p')}</div>
+        </div>
+
+        <div class="content">
+            <div class="summary">
+                <h3 style="margin-bottom: 15px; color: #2c3e50;">&#128202; Summary Overview</h3>
+                <div class="summary-grid">
+                    <div class="summary-item">
+                        <span class="summary-number">{summary.important_messages}</span>
+                        <div class="summary-label">Important Inbox</div>
+                    </div>
+                    <div class="summary-item">
+                        <span class="summary-number">{len(summary.vip_emails_needing_reply) + summary.urgent_more}</span>
+                        <div class="summary-label">Urgent Replies Needed</div>
+                    </div>
+                    <div class="summary-item">
+                        <span class="summary-number">{len(summary.old_sent_emails) + summary.follow_up_more}</span>
+                        <div class="summary-label">Follow-ups Required</div>
+                    </div>
+                </div>
+            </div>
+"""
+
+
+def _iter_rows(rows):
+    # Join rows into chunks of ROWS_PER_CHUNK so a huge table is never one string
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= ROWS_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def iter_urgent(summary):
+    rules = summary.rules
+    vip_label = escape(rules.vip_label)
+    yield f"""
+            <div class="section">
+                <h2>&#128680; URGENT: {vip_label}'s Emails Needing Reply (>{_days(rules.reply_after_days)} old)</h2>"""
+    if summary.vip_emails_needing_reply:
+        yield '\n            <div class="urgent">' + INBOX_TABLE_HEAD.format(sender_label='From')
+        yield from _iter_rows(inbox_row(email_data, f"urgent-{i}", row_class='sahithi-row', urgent=True)
+                              for i, email_data in enumerate(summary.vip_emails_needing_reply))
+        yield '\n            </table>' + more_rows(summary.urgent_more) + '\n            </div>\n            </div>\n'
+    else:
+        yield f"\n            <p>&#9989; No urgent emails from {vip_label} needing replies.</p>\n            </div>\n"
+
+
+def iter_inbox(summary):
+    yield '\n            <div class="section">\n                <h2>&#128269; All Important Inbox Emails</h2>'
+    if summary.important_inbox:
+        yield INBOX_TABLE_HEAD.format(sender_label='Sender')
+        yield from _iter_rows(conversation_row(conversation, f"inbox-{i}")
+                              for i, conversation in enumerate(summary.important_inbox))
+        yield '\n            </table>' + more_rows(summary.important_more) + '\n            </div>\n'
+    else:
+        yield '\n            <p>No important emails found in inbox.</p>\n            </div>\n'
+
+
+def iter_sent(summary):
+    days = _days(summary.rules.follow_up_after_days)
+    yield ('\n            <div class="section">\n'
+           f'                <h2>&#9200; Old Sent Emails Without a Reply (Older than {days} - May need follow-up)</h2>')
+    if summary.old_sent_emails:
+        yield SENT_TABLE_HEAD
+        yield from _iter_rows(sent_row(email_data, f"sent-{i}")
+                              for i, email_data in enumerate(summary.old_sent_emails))
+        yield '\n            </table>' + more_rows(summary.follow_up_more) + '\n            </div>\n'
+    else:
+        yield '\n            <p>No old sent emails found that need follow-up.</p>\n            </div>\n'
+
+
+def _duration(hours):
+    if hours is None:
+        return '-'
+    return f"{hours / 24:.1f} days" if hours >= 48 else f"{hours:.1f} h"
+
+
+def _count_table(first_label, pairs, more=0):
+    rows = ''.join(f'<tr><td>{escape_repeated(name)}</td><td>{count}</td></tr>' for name, count in pairs)
+    more = f'<tr><td>+{more} more</td><td></td></tr>' if more else ''
+    return f'<table class="digest"><tr><th>{first_label}</th><th>Messages</th></tr>{rows}{more}</table>'
+
+
+def _bucket_table(first_label, labels, counts):
+    return (f'<table class="digest"><tr><th>{first_label}</th>{"".join(f"<th>{label}</th>" for label in labels)}</tr>'
+            f'<tr><td>Messages</td>{"".join(f"<td>{count}</td>" for count in counts)}</tr></table>')
+
+
+def digest_tables(digest):
+    """The digest section's tables, shared by the full and the mail-safe page."""
+    if not (digest.messages or digest.sent_threads):
+        return '\n<p>No important emails or sent threads to count.</p>'
+    domains = digest.top_domains()
+    keywords = digest.top_keywords()
+    if digest.vip:
+        keywords.insert(0, ('(VIP sender)', digest.vip))
+    days = digest.daily()[-DIGEST_DAYS:]
+    percentiles = digest.latency_percentiles()
+    parts = [
+        '\n<h3>Important mail by sender domain</h3>',
+        _count_table('Domain', domains[:DIGEST_DOMAINS], len(domains) - len(domains[:DIGEST_DOMAINS])),
+        '\n<h3>Important mail by keyword</h3>',
+        _count_table('Keyword', keywords),
+        '\n<h3>Important mail by hour (UTC)</h3>',
+        _bucket_table('Hour', [f"{hour:02d}" for hour in range(24)], digest.hours),
+    ]
+    if days:
+        parts += ['\n<h3>Important mail by day (UTC)</h3>',
+                  _bucket_table('Day', [label[5:] for label, _ in days], [count for _, count in days])]
+    parts += [
+        '\n<h3>Replies to sent threads</h3>',
+        '<table class="digest"><tr><th>Sent threads</th><th>Answered</th>'
+        + ''.join(f'<th>{pct}th percentile</th>' for pct in percentiles) + '</tr>'
+        f'<tr><td>{digest.sent_threads}</td><td>{len(digest.latencies)}</td>'
+        + ''.join(f'<td>{_duration(hours)}</td>' for hours in percentiles.values()) + '</tr></table>',
+    ]
+    return ''.join(parts)
+
+
+def iter_digest(summary):
+    # Summaries built without a classifier (e.g. in benchmarks) have no digest
+    digest = getattr(summary, 'digest', None)
+    if digest is None:
+        return
+    yield '\n            <div class="section">\n                <h2>&#128200; Digest</h2>'
+    yield digest_tables(digest)
+    yield '\n            </div>\n'
+
+
+def iter_report(summary, generated_at=None):
+    """Yield the HTML report piece by piece.
+
+    The order is header, summary, urgent table, inbox table, sent table,
+    digest and tail; big tables are split every ``ROWS_PER_CHUNK`` rows.  The summary
+    counts come from the finished classification pass, so they are exact
+    even though they are sent first.
+
+    ``summary`` is a ``classify.Classifier`` (or anything with the same
+    section lists and ``rules`` attribute): ``threads.Conversation`` rows
+    for the inbox, ``records.EmailRecord`` rows for the others.
+    """
+    if generated_at is None:
+        # The request's reference clock, so the header matches the age checks
+        generated_at = getattr(summary, 'now', None) or datetime.now()
+    yield REPORT_HEAD
+    yield render_summary(summary, generated_at)
+    yield from iter_urgent(summary)
+    yield from iter_inbox(summary)
+    yield from iter_sent(summary)
+    yield from iter_digest(summary)
+    yield REPORT_TAIL
+
+
+def mail_preview(email_data):
+    # One copy of the preview: what the full report shows cut short, then the rest when opened
+    preview = email_data.preview
+    limit = PREVIEW_LENGTHS[email_data.folder]
+    if len(preview) <= limit:
+        return escape(preview)
+    # Cut at a word boundary, so the opened preview reads on
+    cut = preview.rfind(' ', 0, limit + 1)
+    if cut < limit // 2:
+        cut = limit
+    return f'<details><summary>{escape(preview[:cut])}&hellip;</summary>{escape(preview[cut:])}</details>'
+
+
+def mail_subject(email_data, suffix=''):
+    # The subject links to the message, in place of the "Open Email" column
+    subject = escape(email_data.subject)
+    if email_data.nav_link:
+        subject = f'<a href="{escape(email_data.nav_link)}">{subject}</a>'
+    return subject + suffix
+
+
+def mail_inbox_row(email_data, vip=False, sender=None, suffix=''):
+    if sender is None:
+        sender = escape_repeated(email_data.sender)
+    row_class = ' class="vip"' if vip else ''
+    return (f'\n<tr{row_class}><td>{mail_subject(email_data, suffix)}</td>'
+            f'<td>{sender}<br><span class="muted">{escape_repeated(email_data.sender_email)}</span></td>'
+            f'<td class="muted">{escape_repeated(email_data.date)}</td><td>{mail_preview(email_data)}</td></tr>')
+
+
+def mail_conversation_row(conversation):
+    if conversation.count == 1:
+        return mail_inbox_row(conversation.latest, conversation.is_vip)
+    return mail_inbox_row(conversation.latest, conversation.is_vip, sender=participants(conversation),
+                          suffix=f' <span class="count">{conversation.count}</span>')
+
+
+def mail_sent_row(email_data):
+    return (f'\n<tr><td>{mail_subject(email_data)}</td><td>{escape_repeated(email_data.recipients)}</td>'
+            f'<td class="muted">{escape_repeated(email_data.date)}</td><td>{mail_preview(email_data)}</td></tr>')
+
+
+def _mail_more_rows(count):
+    return f'\n<p class="muted">+{count} more not shown</p>' if count else ''
+
+
+def iter_mail_report(summary, generated_at=None, rows=True):
+    """Yield the compact, mail-safe report piece by piece (see the module docstring).
+
+    Same sections, counts and rows as ``iter_report``; without ``rows``,
+    only the summary counts and the digest.
+    """
+    if generated_at is None:
+        generated_at = getattr(summary, 'now', None) or datetime.now()
+    yield MAIL_HEAD
+    yield (f'<p class="muted">Generated on {generated_at.strftime("%B %d, %Y at %I:%M %p")}</p>\n'
+           f'<p><b>{summary.important_messages}</b> important inbox &middot; '
+           f'<b>{len(summary.vip_emails_needing_reply) + summary.urgent_more}</b> urgent replies needed &middot; '
+           f'<b>{len(summary.old_sent_emails) + summary.follow_up_more}</b> follow-ups required</p>\n')
+    if rows:
+        yield from _iter_mail_sections(summary)
+    digest = getattr(summary, 'digest', None)
+    if digest is not None:
+        yield '<h2>&#128200; Digest</h2>' + digest_tables(digest) + '\n'
+    yield '</body>\n</html>\n'
+
+
+def _iter_mail_sections(summary):
+    rules = summary.rules
+    vip_label = escape(rules.vip_label)
+    yield f"<h2>&#128680; URGENT: {vip_label}'s Emails Needing Reply (>{_days(rules.reply_after_days)} old)</h2>"
+    if summary.vip_emails_needing_reply:
+        yield MAIL_INBOX_TABLE_HEAD.format(css_class=' class="urgent"', sender_label='From')
+        yield from _iter_rows(mail_inbox_row(email_data, vip=True) for email_data in summary.vip_emails_needing_reply)
+        yield '\n</table>' + _mail_more_rows(summary.urgent_more) + '\n'
+    else:
+        yield f"\n<p>&#9989; No urgent emails from {vip_label} needing replies.</p>\n"
+
+    yield '<h2>&#128269; All Important Inbox Emails</h2>'
+    if summary.important_inbox:
+        yield MAIL_INBOX_TABLE_HEAD.format(css_class='', sender_label='Sender')
+        yield from _iter_rows(mail_conversation_row(conversation) for conversation in summary.important_inbox)
+        yield '\n</table>' + _mail_more_rows(summary.important_more) + '\n'
+    else:
+        yield '\n<p>No important emails found in inbox.</p>\n'
+
+    days = _days(rules.follow_up_after_days)
+    yield f'<h2>&#9200; Old Sent Emails Without a Reply (Older than {days} - May need follow-up)</h2>'
+    if summary.old_sent_emails:
+        yield MAIL_SENT_TABLE_HEAD
+        yield from _iter_rows(mail_sent_row(email_data) for email_data in summary.old_sent_emails)
+        yield '\n</table>' + _mail_more_rows(summary.follow_up_more) + '\n'
+    else:
+        yield '\n<p>No old sent emails found that need follow-up.</p>\n'
+
+
+def render_mail_report(summary, generated_at=None, rows=True):
+    """Render the compact, mail-safe report as one string."""
+    return ''.join(iter_mail_report(summary, generated_at, rows))
+
+
+def iter_report_bytes(summary, generated_at=None):
+    """``iter_report`` encoded as UTF-8, for hosts that stream the response."""
+    for piece in iter_report(summary, generated_at):
+        yield piece.encode('utf-8')
+
+
+def render_report(summary, generated_at=None):
+    """Render the full HTML report for a classified summary as one string."""
+    return ''.join(iter_report(summary, generated_at))
+
+
+def spool_report(summary, generated_at=None, max_size=SPOOL_MAX_SIZE):
+    """Write the report to a temporary file and return it rewound.
+
+    Reports up to ``max_size`` bytes stay in memory; bigger ones spill to
+    disk, so only one chunk of rows is ever held as text.  The caller owns
+    (and should close) the returned file.
+    """
+    import tempfile  # only spool mode needs it; kept off the cold-start path
+    spool = tempfile.SpooledTemporaryFile(max_size=max_size)
+    try:
+        for chunk in iter_report_bytes(summary, generated_at):
+            spool.write(chunk)
+        spool.seek(0)
+    except Exception:
+        spool.close()
+        raise
+    return spool
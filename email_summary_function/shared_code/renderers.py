@@ -0,0 +1,320 @@
+"""Output formats of a classified summary.
+
+One classification pass can be rendered into any of the registered formats:
+
+* ``html`` - the full report page (``render.py``)
+* ``mail`` - the same page, compact and without script, for forwarding as
+  an email body (``render.iter_mail_report``)
+* ``digest`` - the compact page with only the counts and the digest
+  statistics (``digest.py``), no rows
+* ``json`` - the sections as compact JSON, for dashboards and scripts
+* ``text`` - plain text, for mobile notifications and chat messages
+* ``card`` - an Adaptive Card, for posting to Teams
+
+A request picks its format with ``?format=`` or, failing that, its
+``Accept`` header; the page is the default.  ``?format=json,text`` asks for
+several at once: they are rendered from the same pass and returned as one
+JSON object keyed by format.  Only ``html`` goes near the page template and
+its stylesheet.  ``text/html`` in an ``Accept`` header means ``html``;
+``mail`` and ``digest`` are only chosen with ``?format=``.
+
+New formats are added with the ``register`` decorator; the function gets
+the finished ``classify.Classifier`` and returns a str, or a JSON-able
+document for JSON media types.
+"""
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from . import render
+
+Renderer = namedtuple('Renderer', 'name media_type func is_json')
+
+DEFAULT_FORMAT = 'html'
+MULTI_MEDIA_TYPE = 'application/json'
+# Rows per section in an Adaptive Card; Teams rejects cards over ~28 KB
+CARD_ROWS = 10
+# Domains and keywords listed in the text digest
+TEXT_DIGEST_ITEMS = 5
+CARD_VERSION = '1.4'
+
+RENDERERS = {}
+
+
+class NotAcceptable(ValueError):
+    """A ``?format=`` named a format that is not registered."""
+
+
+def register(name, media_type):
+    """Register ``func(classifier)`` as the renderer of format ``name``."""
+    def decorator(func):
+        RENDERERS[name] = Renderer(name, media_type, func, media_type.endswith('json'))
+        return func
+    return decorator
+
+
+def _parse_accept(accept):
+    # (q, position, media type), best first
+    ranges = []
+    for position, part in enumerate(accept.split(',')):
+        media_type, _, params = part.partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type.strip() and q > 0:
+            ranges.append((-q, position, media_type.strip().lower()))
+    return sorted(ranges)
+
+
+def _accepted(media_range):
+    if media_range == '*/*':
+        return DEFAULT_FORMAT
+    for renderer in RENDERERS.values():
+        if media_range == renderer.media_type:
+            return renderer.name
+    if media_range.endswith('/*'):
+        # The default if it fits, else the first registered format that does
+        prefix = media_range[:-1]
+        names = [DEFAULT_FORMAT] + [name for name in RENDERERS if name != DEFAULT_FORMAT]
+        for name in names:
+            if RENDERERS[name].media_type.startswith(prefix):
+                return name
+    return None
+
+
+def negotiate(format_param=None, accept=None):
+    """The tuple of format names a request asked for.
+
+    ``format_param`` is the ``?format=`` value (comma-separated for several
+    formats) and wins over ``accept``, the ``Accept`` header.  Raises
+    ``NotAcceptable`` for an unknown ``?format=``; an ``Accept`` header that
+    names no registered format gets ``DEFAULT_FORMAT``, as it did before
+    formats could be negotiated.
+    """
+    if format_param:
+        names = tuple(dict.fromkeys(name.strip().lower() for name in format_param.split(',') if name.strip()))
+        unknown = [name for name in names if name not in RENDERERS]
+        if unknown or not names:
+            raise NotAcceptable(f"Unknown format {', '.join(unknown) or format_param!r}; "
+                                f"available: {', '.join(RENDERERS)}")
+        return names
+    for _, _, media_range in _parse_accept(accept or ''):
+        name = _accepted(media_range)
+        if name is not None:
+            return (name,)
+    return (DEFAULT_FORMAT,)
+
+
+def render_formats(classifier, formats):
+    """``(body, media_type)`` of the ``formats`` of a finished classifier."""
+    if len(formats) == 1:
+        renderer = RENDERERS[formats[0]]
+        output = renderer.func(classifier)
+        if renderer.is_json:
+            output = _dumps(output)
+        return output, renderer.media_type
+    # Several formats: one JSON object, documents embedded as they are
+    return _dumps({name: RENDERERS[name].func(classifier) for name in formats}), MULTI_MEDIA_TYPE
+
+
+def _dumps(document):
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':'))
+
+
+def _generated_at(summary):
+    return getattr(summary, 'now', None) or datetime.now()
+
+
+def _inbox_row(conversation):
+    email_data = conversation.latest
+    return {
+        'subject': email_data.subject,
+        'sender': email_data.sender,
+        'address': email_data.sender_email,
+        'received': email_data.date,
+        'preview': email_data.preview,
+        'link': email_data.nav_link,
+        'vip': conversation.is_vip,
+        'keywords': list(conversation.matched_keywords),
+        'messages': conversation.count,
+        'duplicates': conversation.duplicates,
+        'participants': list(conversation.participants.values()),
+    }
+
+
+def _urgent_row(email_data):
+    return {
+        'subject': email_data.subject,
+        'sender': email_data.sender,
+        'address': email_data.sender_email,
+        'received': email_data.date,
+        'preview': email_data.preview,
+        'link': email_data.nav_link,
+    }
+
+
+def _sent_row(email_data):
+    return {
+        'subject': email_data.subject,
+        'recipients': email_data.recipients,
+        'sent': email_data.date,
+        'preview': email_data.preview,
+    }
+
+
+@register('html', 'text/html')
+def html_report(summary):
+    return render.render_report(summary)
+
+
+@register('mail', 'text/html')
+def mail_report(summary):
+    return render.render_mail_report(summary)
+
+
+@register('digest', 'text/html')
+def digest_report(summary):
+    return render.render_mail_report(summary, rows=False)
+
+
+@register('json', 'application/json')
+def json_summary(summary):
+    """The report's sections and counts as one document."""
+    return {
+        'generated': _generated_at(summary).isoformat(),
+        'rules_version': summary.rules.version,
+        'counts': {
+            'inbox': summary.inbox_seen,
+            'sent': summary.sent_seen,
+            'important': summary.important_messages,
+            'threads': len(summary.important_inbox) + summary.important_more,
+            'urgent': len(summary.vip_emails_needing_reply) + summary.urgent_more,
+            'follow_ups': len(summary.old_sent_emails) + summary.follow_up_more,
+        },
+        'urgent': [_urgent_row(email_data) for email_data in summary.vip_emails_needing_reply],
+        'inbox': [_inbox_row(conversation) for conversation in summary.important_inbox],
+        'follow_ups': [_sent_row(email_data) for email_data in summary.old_sent_emails],
+        'more': {'urgent': summary.urgent_more, 'inbox': summary.important_more,
+                 'follow_ups': summary.follow_up_more},
+        'stats': summary.digest.to_dict(),
+    }
+
+
+def _pairs(pairs):
+    return ', '.join(f"{name} {count}" for name, count in pairs) or 'none'
+
+
+def _hours(hours):
+    return '-' if hours is None else f"{hours:g} h"
+
+
+def _more_line(count):
+    return [f"  +{count} more"] if count else []
+
+
+@register('text', 'text/plain')
+def text_summary(summary):
+    """A few lines per section, with the links spelled out."""
+    rules = summary.rules
+    lines = [
+        f"Daily Email Summary - {_generated_at(summary).strftime('%B %d, %Y at %I:%M %p')}",
+        f"Important inbox: {summary.important_messages} | "
+        f"Urgent replies: {len(summary.vip_emails_needing_reply) + summary.urgent_more} | "
+        f"Follow-ups: {len(summary.old_sent_emails) + summary.follow_up_more}",
+        '',
+        f"URGENT: {rules.vip_label}'s emails needing reply",
+    ]
+    for email_data in summary.vip_emails_needing_reply:
+        lines.append(f"- {email_data.subject} ({email_data.sender}, {email_data.date})")
+        if email_data.nav_link:
+            lines.append(f"  {email_data.nav_link}")
+    lines += _more_line(summary.urgent_more) or ([] if summary.vip_emails_needing_reply else ['  none'])
+
+    lines += ['', 'IMPORTANT INBOX']
+    for conversation in summary.important_inbox:
+        email_data = conversation.latest
+        count = f"[{conversation.count}] " if conversation.count > 1 else ''
+        lines.append(f"- {count}{email_data.subject} ({email_data.sender}, {email_data.date})")
+        if email_data.nav_link:
+            lines.append(f"  {email_data.nav_link}")
+    lines += _more_line(summary.important_more) or ([] if summary.important_inbox else ['  none'])
+
+    lines += ['', 'SENT, NO REPLY YET']
+    for email_data in summary.old_sent_emails:
+        lines.append(f"- {email_data.subject} (to {email_data.recipients}, {email_data.date})")
+    lines += _more_line(summary.follow_up_more) or ([] if summary.old_sent_emails else ['  none'])
+
+    digest = summary.digest
+    percentiles = digest.latency_percentiles()
+    lines += [
+        '',
+        'DIGEST',
+        f"Top sender domains: {_pairs(digest.top_domains(TEXT_DIGEST_ITEMS))}",
+        f"Keywords: {_pairs(digest.top_keywords()[:TEXT_DIGEST_ITEMS])}",
+        f"Replies: {len(digest.latencies)} of {digest.sent_threads} sent threads answered, "
+        f"median {_hours(percentiles[50])}, 90th percentile {_hours(percentiles[90])}",
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def _card_section(title, rows, more, line):
+    items = [{'type': 'TextBlock', 'text': title, 'weight': 'Bolder', 'size': 'Medium', 'separator': True}]
+    for email_data, detail in rows[:CARD_ROWS]:
+        row = {
+            'type': 'Container',
+            'items': [
+                {'type': 'TextBlock', 'text': email_data.subject or '(no subject)', 'wrap': True},
+                {'type': 'TextBlock', 'text': detail, 'isSubtle': True, 'spacing': 'None', 'size': 'Small'},
+            ],
+        }
+        if email_data.nav_link:
+            row['selectAction'] = {'type': 'Action.OpenUrl', 'url': email_data.nav_link}
+        items.append(row)
+    hidden = more + max(len(rows) - CARD_ROWS, 0)
+    if hidden:
+        items.append({'type': 'TextBlock', 'text': f"+{hidden} more", 'isSubtle': True})
+    elif not rows:
+        items.append({'type': 'TextBlock', 'text': line, 'isSubtle': True})
+    return items
+
+
+@register('card', 'application/vnd.microsoft.card.adaptive+json')
+def adaptive_card(summary):
+    """An Adaptive Card with the top ``CARD_ROWS`` rows of each section."""
+    rules = summary.rules
+    body = [
+        {'type': 'TextBlock', 'text': 'Daily Email Summary', 'weight': 'Bolder', 'size': 'Large'},
+        {'type': 'TextBlock', 'text': _generated_at(summary).strftime('%B %d, %Y at %I:%M %p'),
+         'isSubtle': True, 'spacing': 'None'},
+        {'type': 'FactSet', 'facts': [
+            {'title': 'Important inbox', 'value': str(summary.important_messages)},
+            {'title': 'Urgent replies', 'value': str(len(summary.vip_emails_needing_reply) + summary.urgent_more)},
+            {'title': 'Follow-ups', 'value': str(len(summary.old_sent_emails) + summary.follow_up_more)},
+            {'title': 'Median reply', 'value': _hours(summary.digest.latency_percentiles()[50])},
+        ]},
+    ]
+    body += _card_section(
+        f"Urgent: {rules.vip_label}'s emails needing reply",
+        [(email_data, f"{email_data.sender} - {email_data.date}") for email_data in summary.vip_emails_needing_reply],
+        summary.urgent_more, 'No urgent emails.')
+    body += _card_section(
+        'Important inbox',
+        [(conversation.latest, f"{conversation.latest.sender} - {conversation.latest.date}"
+          + (f" - {conversation.count} messages" if conversation.count > 1 else ''))
+         for conversation in summary.important_inbox],
+        summary.important_more, 'No important emails.')
+    body += _card_section(
+        'Sent, no reply yet',
+        [(email_data, f"To {email_data.recipients} - {email_data.date}") for email_data in summary.old_sent_emails],
+        summary.follow_up_more, 'No follow-ups needed.')
+    return {
+        'type': 'AdaptiveCard',
+        '$schema': 'http://adaptivecards.io/schemas/adaptive-card.json',
+        'version': CARD_VERSION,
+        'body': body,
+    }
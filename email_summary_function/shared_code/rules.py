@@ -0,0 +1,219 @@
+"""Importance / VIP-sender rules.
+
+Rules come from, in order of precedence:
+
+* ``EMAIL_SUMMARY_RULES`` - the rules document inline as a JSON app setting
+* ``EMAIL_SUMMARY_RULES_FILE`` - path to a ``.json`` or ``.yaml`` file
+* ``DEFAULT_RULES`` below, which reproduces the original hard-coded rules
+
+A rules document looks like::
+
+    {
+        "keywords": ["akshay", {"keyword": "urgent", "weight": 3}],
+        "vip_senders": [{"match": "sahithi", "reply_after_days": 1, "weight": 5}],
+        "vip_domains": [{"domain": "example.com", "reply_after_days": 2}],
+        "vip_label": "Sahithi",
+        "reply_after_days": 1,
+        "follow_up_after_days": 2,
+        "age_weight": 0.1,
+        "max_age_days": 7,
+        "limits": {"urgent": 50, "inbox": 100, "sent": 50},
+        "dedup": "near"
+    }
+
+``age_weight`` and ``max_age_days`` feed the row priority and ``limits``
+bound the rows shown per report section (see ``ranking.py``).  ``dedup``
+folds repeated inbox messages into one row: ``near`` (near-duplicates
+too), ``exact`` or ``off`` (see ``dedup.py``).
+
+Documents are compiled into a ``RuleSet`` once and cached by file mtime/size
+(or by the setting's text), so warm requests never re-parse the config.
+Keyword matchers are shared between rule sets with the same keywords, so
+per-mailbox overrides (see ``batch.py``) that only change thresholds or
+labels reuse the compiled matchers.
+"""
+import hashlib
+import json
+import logging
+import os
+
+from .dedup import MODES as DEDUP_MODES
+from .keywords import KeywordMatcher
+from .ranking import DEFAULT_LIMITS, priority
+
+IMPORTANT_KEYWORDS = ['akshay', '@sahithin', 'action required', 'important', 'urgent',
+                      'deadline', 'asap', 'priority', 'critical', 'time sensitive']
+
+DEFAULT_RULES = {
+    'keywords': IMPORTANT_KEYWORDS,
+    'vip_senders': [{'match': 'sahithi'}],
+    'vip_domains': [],
+    'vip_label': 'Sahithi',
+    'reply_after_days': 1,
+    'follow_up_after_days': 2,
+    'age_weight': 0.1,
+    'max_age_days': 7,
+    'limits': DEFAULT_LIMITS,
+    'dedup': 'near',
+}
+
+RULES_SETTING = 'EMAIL_SUMMARY_RULES'
+RULES_FILE_SETTING = 'EMAIL_SUMMARY_RULES_FILE'
+MAX_SHARED_MATCHERS = 256
+
+_cache = {}
+_default_rules = None
+_matchers = {}
+
+
+def _weighted(entries, key):
+    # Accept both plain strings and {"<key>": ..., "weight": ...} objects
+    for entry in entries or []:
+        if isinstance(entry, str):
+            yield {key: entry}
+        elif isinstance(entry, dict) and entry.get(key):
+            yield entry
+        else:
+            raise ValueError(f"Invalid rule entry {entry!r}: expected a string or an object with '{key}'")
+
+
+def shared_matcher(keywords):
+    """A ``KeywordMatcher`` for ``keywords``, compiled once per distinct list."""
+    key = tuple(keywords)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        if len(_matchers) >= MAX_SHARED_MATCHERS:
+            _matchers.clear()
+        matcher = _matchers[key] = KeywordMatcher(key)
+    return matcher
+
+
+class RuleSet:
+    """A compiled rules document."""
+
+    def __init__(self, config):
+        config = dict(DEFAULT_RULES, **(config or {}))
+        self.config = config
+        self.version = hashlib.sha1(
+            json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+
+        self.reply_after_days = float(config['reply_after_days'])
+        self.follow_up_after_days = float(config['follow_up_after_days'])
+        self.vip_label = str(config['vip_label'])
+        self.age_weight = float(config['age_weight'])
+        self.max_age_days = float(config['max_age_days'])
+        limits = config['limits']
+        if not isinstance(limits, dict) or set(limits) - set(DEFAULT_LIMITS):
+            raise ValueError(f"Invalid limits {limits!r}: expected an object with {', '.join(DEFAULT_LIMITS)}")
+        self.limits = {section: int(limits.get(section, default)) for section, default in DEFAULT_LIMITS.items()}
+        self.dedup = str(config['dedup']).lower()
+        if self.dedup not in DEDUP_MODES:
+            raise ValueError(f"Invalid dedup {config['dedup']!r}: expected one of {', '.join(DEDUP_MODES)}")
+
+        keywords = list(_weighted(config['keywords'], 'keyword'))
+        self.keyword_weights = {}
+        for entry in keywords:
+            self.keyword_weights[entry['keyword'].lower().strip()] = float(entry.get('weight', 1))
+        self.keywords = shared_matcher(self.keyword_weights)
+
+        self.vip_senders = {}
+        for entry in _weighted(config['vip_senders'], 'match'):
+            self.vip_senders[entry['match'].lower().strip()] = self._vip_rule(entry)
+        self.vip_matcher = shared_matcher(self.vip_senders)
+
+        self.vip_domains = {}
+        for entry in _weighted(config['vip_domains'], 'domain'):
+            self.vip_domains[entry['domain'].lower().strip().lstrip('@')] = self._vip_rule(entry)
+
+    def _vip_rule(self, entry):
+        return {
+            'weight': float(entry.get('weight', 1)),
+            'reply_after_days': float(entry.get('reply_after_days', self.reply_after_days)),
+        }
+
+    def match_keywords(self, subject, body):
+        """Return the keywords found in the lowercased subject and body."""
+        return self.keywords.find(subject, body)
+
+    def keyword_score(self, matched_keywords):
+        return sum(self.keyword_weights[keyword] for keyword in matched_keywords)
+
+    def priority(self, score, timestamp, now_ts):
+        """Rank of a row in its report section (see ``ranking.py``)."""
+        return priority(score, timestamp, now_ts, self.age_weight, self.max_age_days)
+
+    def match_vip(self, sender, sender_email):
+        """Return the VIP rules that apply to a lowercased sender name/address."""
+        matched = [self.vip_senders[key] for key in self.vip_matcher.find(sender, sender_email)]
+        if self.vip_domains and '@' in sender_email:
+            # Walk up the domain so "mail.example.com" also matches "example.com"
+            domain = sender_email.rsplit('@', 1)[1]
+            while domain:
+                rule = self.vip_domains.get(domain)
+                if rule is not None:
+                    matched.append(rule)
+                    break
+                domain = domain.partition('.')[2]
+        return matched
+
+
+def _read_file(path):
+    with open(path, encoding='utf-8') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError(f"PyYAML is required to read {path}") from None
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _compile(key, stamp, read):
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    try:
+        rules = RuleSet(read())
+        logging.info(f"Loaded rules version {rules.version} from {key}")
+    except Exception as e:
+        # Remember the stamp anyway so a broken config is not re-read on every request
+        if cached is not None:
+            logging.error(f"Failed to reload rules from {key}, keeping version {cached[1].version}: {e}")
+            rules = cached[1]
+        else:
+            logging.error(f"Failed to load rules from {key}, using default rules: {e}")
+            rules = default_rules()
+    _cache[key] = (stamp, rules)
+    return rules
+
+
+def default_rules():
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = RuleSet(DEFAULT_RULES)
+    return _default_rules
+
+
+def load_rules(environ=None):
+    """Return the current RuleSet, recompiling only if its source changed."""
+    environ = os.environ if environ is None else environ
+
+    inline = environ.get(RULES_SETTING)
+    if inline:
+        stamp = hashlib.sha1(inline.encode('utf-8')).hexdigest()
+        return _compile(RULES_SETTING, stamp, lambda: json.loads(inline))
+
+    path = environ.get(RULES_FILE_SETTING)
+    if path:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            cached = _cache.get(path)
+            if cached is not None:
+                logging.error(f"Rules file {path} is unavailable, keeping version {cached[1].version}: {e}")
+                return cached[1]
+            logging.error(f"Rules file {path} is unavailable, using default rules: {e}")
+            return default_rules()
+        return _compile(path, (st.st_mtime_ns, st.st_size), lambda: _read_file(path))
+
+    return default_rules()
@@ -0,0 +1,70 @@
+"""A local stand-in for the function endpoints, on the standard library only.
+
+Serves ``POST /api/process_emails`` and ``POST /api/process_batch`` through
+``pipeline.py``, exactly like the functions, but without the Functions host,
+so load tests and profilers see only the pipeline.  It listens on the
+host's default port (7071), so ``test_function.py`` works against it
+unchanged::
+
+    python -m shared_code serve
+
+Not meant for production: there is no authentication.
+"""
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from . import pipeline
+
+ROUTES = {
+    '/api/process_emails': pipeline.handle_emails,
+    '/api/process_batch': pipeline.handle_batch,
+}
+
+
+class FunctionHandler(BaseHTTPRequestHandler):
+    settings = None
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        handler = ROUTES.get(url.path.rstrip('/'))
+        if handler is None:
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        response = handler(body, dict(parse_qsl(url.query)), self.settings, self.headers)
+        self._respond(response)
+
+    def _respond(self, response):
+        body = response.body
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        headers = dict(response.headers)
+        content_type = headers.pop('Content-Type', 'text/plain')
+        self.send_response(response.status_code)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.info(f"{self.address_string()} {format % args}")
+
+
+def make_server(host='127.0.0.1', port=7071, settings=None):
+    handler = type('Handler', (FunctionHandler,), {'settings': settings or pipeline.settings_from_env()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(host='127.0.0.1', port=7071, settings=None):
+    server = make_server(host, port, settings)
+    print(f"Serving {', '.join(ROUTES)} on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
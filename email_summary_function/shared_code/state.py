@@ -0,0 +1,232 @@
+"""Per-mailbox incremental state.
+
+Each run of the flow sends the whole inbox/sent window again.  With a state
+store, messages that were already classified on an earlier run are skipped
+and their cached rows are merged back in before the report is rendered, so
+the classification cost follows the amount of new mail.
+
+Per mailbox the SQLite database keeps:
+
+* a watermark per folder - the latest ``receivedDateTime``/``sentDateTime``
+  processed (also returned to the caller so a flow can ask for newer mail
+  only)
+* the key (``id``/``internetMessageId``), time and input sequence number
+  of every processed message, with its report row if it was kept
+* the thread index used for reply detection
+
+State older than the retention window is pruned, and a mailbox's state is
+discarded when the rules version changes, since its cached rows were
+classified with the old rules.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from .classify import Classifier
+from .dates import try_parse_timestamp
+from .records import RECORD_VERSION, EmailRecord
+
+DEFAULT_RETENTION_DAYS = 14
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mailboxes (
+    mailbox TEXT PRIMARY KEY,
+    rules_version TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    mailbox TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    ts REAL NOT NULL,
+    PRIMARY KEY (mailbox, folder)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    mailbox TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    key TEXT NOT NULL,
+    ts REAL,
+    row TEXT,
+    seq INTEGER,
+    PRIMARY KEY (mailbox, folder, key)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    mailbox TEXT NOT NULL,
+    key TEXT NOT NULL,
+    latest REAL NOT NULL,
+    PRIMARY KEY (mailbox, key)
+);
+"""
+
+_DATE_FIELDS = {'inbox': 'receivedDateTime', 'sent': 'sentDateTime'}
+
+
+def message_key(email):
+    """Stable key for a message: its id, or a hash of subject and date."""
+    key = email.get('id') or email.get('internetMessageId')
+    if key:
+        return str(key)
+    fallback = json.dumps([email.get('subject'), email.get('receivedDateTime'),
+                           email.get('sentDateTime')], default=str)
+    return 'h:' + hashlib.sha1(fallback.encode('utf-8')).hexdigest()
+
+
+def message_time(folder, email):
+    return try_parse_timestamp(email.get(_DATE_FIELDS[folder]))
+
+
+class MailboxState:
+    """What was processed for one mailbox on earlier runs."""
+
+    def __init__(self, mailbox, rules_version):
+        self.mailbox = mailbox
+        self.rules_version = rules_version
+        self.watermarks = {}
+        self.seen = {'inbox': set(), 'sent': set()}
+        # Cached report rows by message key, in the order they first came in
+        self.rows = {'inbox': {}, 'sent': {}}
+        self.threads = {}
+        self.new_messages = []
+
+    def is_new(self, folder, key, ts):
+        # Anything past the watermark is new; at or before it, the seen ids
+        # catch messages that arrived late or have no usable date
+        watermark = self.watermarks.get(folder)
+        if ts is not None and watermark is not None and ts > watermark:
+            return True
+        return key not in self.seen[folder]
+
+    def record(self, folder, key, ts, row):
+        self.seen[folder].add(key)
+        self.rows[folder].pop(key, None)
+        self.new_messages.append((folder, key, ts, row))
+
+
+class StateStore:
+    """SQLite-backed store of ``MailboxState``."""
+
+    def __init__(self, path, retention_days=DEFAULT_RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        # One connection shared by the worker's threads, used by one at a time
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+            columns = [column[1] for column in self._conn.execute('PRAGMA table_info(messages)')]
+            if 'seq' not in columns:
+                # Databases from before the sequence column; their rows sort first
+                self._conn.execute('ALTER TABLE messages ADD COLUMN seq INTEGER')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def load(self, mailbox, rules_version):
+        state = MailboxState(mailbox, rules_version)
+        with self._lock:
+            conn = self._conn
+            row = conn.execute('SELECT rules_version FROM mailboxes WHERE mailbox = ?', (mailbox,)).fetchone()
+            if row is None:
+                return state
+            if row[0] != rules_version:
+                logging.info(f"Rules changed for mailbox {mailbox} ({row[0]} -> {rules_version}), "
+                             f"discarding cached state")
+                self._reset(mailbox)
+                return state
+
+            state.watermarks = dict(conn.execute(
+                'SELECT folder, ts FROM watermarks WHERE mailbox = ?', (mailbox,)))
+            for folder, key, cached_row in conn.execute(
+                    'SELECT folder, key, row FROM messages WHERE mailbox = ? ORDER BY seq, rowid', (mailbox,)):
+                state.seen[folder].add(key)
+                if cached_row is not None:
+                    state.rows[folder][key] = EmailRecord.from_dict(json.loads(cached_row))
+            state.threads = dict(conn.execute('SELECT key, latest FROM threads WHERE mailbox = ?', (mailbox,)))
+        return state
+
+    def save(self, state, classifier):
+        mailbox = state.mailbox
+        watermarks = dict(state.watermarks)
+        for folder, key, ts, row in state.new_messages:
+            if ts is not None and ts > watermarks.get(folder, float('-inf')):
+                watermarks[folder] = ts
+        oldest = time.time() - self.retention_days * 86400
+
+        with self._lock, self._conn as conn:
+            # New messages are numbered on from the last run, in input order
+            seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM messages WHERE mailbox = ?',
+                               (mailbox,)).fetchone()[0]
+            conn.execute('INSERT OR REPLACE INTO mailboxes (mailbox, rules_version) VALUES (?, ?)',
+                         (mailbox, state.rules_version))
+            conn.executemany(
+                'INSERT OR REPLACE INTO watermarks (mailbox, folder, ts) VALUES (?, ?, ?)',
+                [(mailbox, folder, ts) for folder, ts in watermarks.items()])
+            conn.executemany(
+                'INSERT OR REPLACE INTO messages (mailbox, folder, key, ts, row, seq) VALUES (?, ?, ?, ?, ?, ?)',
+                [(mailbox, folder, key, ts, None if row is None else json.dumps(row.to_dict()), seq)
+                 for seq, (folder, key, ts, row) in enumerate(state.new_messages, seq + 1)])
+            conn.executemany(
+                'INSERT OR REPLACE INTO threads (mailbox, key, latest) VALUES (?, ?, ?)',
+                [(mailbox, key, latest) for key, latest in classifier.threads.items()
+                 if state.threads.get(key) != latest])
+            conn.execute('DELETE FROM messages WHERE mailbox = ? AND ts < ?', (mailbox, oldest))
+            conn.execute('DELETE FROM threads WHERE mailbox = ? AND latest < ?', (mailbox, oldest))
+        state.watermarks = watermarks
+        state.threads = dict(classifier.threads.items())
+        state.new_messages = []
+
+    def reset(self, mailbox):
+        with self._lock:
+            self._reset(mailbox)
+
+    def _reset(self, mailbox):
+        with self._conn as conn:
+            for table in ('mailboxes', 'watermarks', 'messages', 'threads'):
+                conn.execute(f'DELETE FROM {table} WHERE mailbox = ?', (mailbox,))
+
+
+def classify_incremental(store, mailbox, emails, rules=None, metrics=None):
+    """Classify only the emails not processed on earlier runs for ``mailbox``.
+
+    Returns the finished ``Classifier``, with new and cached rows ranked
+    together, and the mailbox watermarks after this run.  Cached rows are
+    offered where their message is in the payload, so the report is the one
+    a full run would render; cached rows of messages no longer sent follow
+    in the order they first came in.
+    """
+    classifier = Classifier(rules, metrics=metrics)
+    # Cached rows are only valid for the rules and record layout they were built with
+    state = store.load(mailbox, f"{classifier.rules.version}/{RECORD_VERSION}")
+    skipped = 0
+    offer = {'inbox': classifier.offer_inbox, 'sent': classifier.offer_sent}
+
+    for key, latest in state.threads.items():
+        classifier.threads.add_inbound((key,), latest)
+    for folder, email in emails:
+        if not isinstance(email, dict):
+            classifier.add(folder, email)  # logs and drops it
+            continue
+        key = message_key(email)
+        ts = message_time(folder, email)
+        if state.is_new(folder, key, ts):
+            state.record(folder, key, ts, classifier.add(folder, email))
+            continue
+        skipped += 1
+        classifier.skip(folder, email)
+        # Cached rows are ranked against this run's clock like new ones
+        row = state.rows[folder].pop(key, None)
+        if row is not None:
+            offer[folder](row)
+
+    for folder in ('inbox', 'sent'):
+        for row in state.rows[folder].values():
+            offer[folder](row)
+    classifier.finish()
+
+    logging.info(f"Incremental run for {mailbox}: {len(state.new_messages)} new, {skipped} cached")
+    if metrics is not None:
+        metrics.count('cached', skipped)
+    store.save(state, classifier)
+    return classifier, state.watermarks
@@ -0,0 +1,257 @@
+"""Thread index used to tell whether a sent email got a reply.
+
+One pass over the inbox records, per thread, the time of the latest inbound
+message.  Threads are keyed by ``conversationId`` and by the normalized
+subject (``RE:``/``FW:`` prefixes stripped), so a sent email can be checked
+with a single dict lookup.  Memory grows with the number of threads, not
+the number of messages.
+
+The same keys group the kept inbox messages into ``Conversation`` rows
+(see ``ConversationIndex``), so a busy reply-all thread is one row of the
+report instead of dozens; with a ``dedup.DuplicateIndex``, so are repeated
+alerts that each come in a conversation of their own.
+"""
+import re
+
+_REPLY_PREFIX = re.compile(r'^(?:\s*(?:re|fw|fwd|aw|wg|sv|vs|tr|antw)\s*(?:\[\d+\])?\s*:)+', re.IGNORECASE)
+
+
+def normalize_subject(subject):
+    """Lowercase a subject and strip reply/forward prefixes and extra spaces."""
+    if not subject:
+        return ''
+    return ' '.join(_REPLY_PREFIX.sub('', str(subject)).lower().split())
+
+
+def thread_keys(email):
+    """Return the ``(conversation_key, subject_key)`` of an email (either may be '')."""
+    conversation_id = email.get('conversationId')
+    subject = normalize_subject(email.get('subject'))
+    return (f"c:{conversation_id}" if conversation_id else '',
+            f"s:{subject}" if subject else '')
+
+
+class ThreadIndex:
+    """Latest inbound message time per thread."""
+
+    def __init__(self):
+        self._latest = {}
+
+    def __len__(self):
+        return len(self._latest)
+
+    def items(self):
+        return self._latest.items()
+
+    def add_inbound(self, keys, timestamp):
+        latest = self._latest
+        for key in keys:
+            if key and timestamp > latest.get(key, float('-inf')):
+                latest[key] = timestamp
+
+    def latest_inbound(self, keys):
+        """Latest inbound time for the thread, preferring the conversation key."""
+        conversation_key, subject_key = keys
+        if conversation_key and conversation_key in self._latest:
+            return self._latest[conversation_key]
+        if subject_key:
+            return self._latest.get(subject_key)
+        return None
+
+    def has_reply_after(self, keys, timestamp):
+        latest = self.latest_inbound(keys)
+        return latest is not None and latest > timestamp
+
+    def has_final_reply(self, keys, timestamp):
+        """``has_reply_after``, but only if more inbound mail cannot undo it.
+
+        A subject-key reply stops counting once the conversation key shows
+        up with an older time, so it is only final for emails without one.
+        """
+        conversation_key, subject_key = keys
+        if conversation_key:
+            latest = self._latest.get(conversation_key)
+        else:
+            latest = self._latest.get(subject_key) if subject_key else None
+        return latest is not None and latest > timestamp
+
+
+def conversation_key(keys):
+    """The key messages are grouped under: the conversation id, else the subject key."""
+    conversation_key, subject_key = keys
+    return conversation_key or subject_key
+
+
+def _is_newer(email_data, than):
+    # Undated messages count as older than any dated one
+    return email_data.timestamp is not None and (than.timestamp is None or email_data.timestamp > than.timestamp)
+
+
+class Conversation:
+    """The kept inbox messages of one thread, folded into one report row.
+
+    ``latest`` is the ``EmailRecord`` of the newest message, the one the row
+    shows and links to; ``participants`` maps sender addresses to display
+    names in the order they were first seen.  ``priority`` is the highest
+    priority of the thread's messages.  ``duplicates`` counts the messages
+    of ``count`` that were folded in as copies of the first one, and
+    ``fingerprint`` is the first message's ``dedup.Fingerprint`` (None
+    without deduplication).
+    """
+
+    __slots__ = ('latest', 'count', 'duplicates', 'participants', 'is_vip', 'matched_keywords', 'priority',
+                 'fingerprint')
+
+    def __init__(self, email_data, priority, fingerprint=None):
+        self.latest = email_data
+        self.count = 1
+        self.duplicates = 0
+        self.participants = {email_data.sender_email: email_data.sender}
+        self.is_vip = email_data.is_vip
+        self.matched_keywords = list(email_data.matched_keywords)
+        self.priority = priority
+        self.fingerprint = fingerprint
+
+    def __repr__(self):
+        return f"Conversation({self.latest.subject!r}, count={self.count}, duplicates={self.duplicates})"
+
+    @property
+    def is_important(self):
+        """Whether any message matched an importance keyword (not just a VIP rule)."""
+        return bool(self.matched_keywords)
+
+    def add(self, email_data, priority, duplicate=False):
+        self.count += 1
+        self.duplicates += duplicate
+        self.participants.setdefault(email_data.sender_email, email_data.sender)
+        self.is_vip = self.is_vip or email_data.is_vip
+        self._add_keywords(email_data.matched_keywords)
+        self.priority = max(self.priority, priority)
+        if _is_newer(email_data, self.latest):
+            self.latest = email_data
+
+    def merge(self, other, duplicate=False):
+        """Fold in a ``Conversation`` of the same thread collected elsewhere.
+
+        With ``duplicate``, ``other`` is another thread whose first message
+        duplicates this one's.
+        """
+        self.count += other.count
+        self.duplicates += other.duplicates + duplicate
+        for address, name in other.participants.items():
+            self.participants.setdefault(address, name)
+        self.is_vip = self.is_vip or other.is_vip
+        self._add_keywords(other.matched_keywords)
+        self.priority = max(self.priority, other.priority)
+        if _is_newer(other.latest, self.latest):
+            self.latest = other.latest
+
+    def _add_keywords(self, keywords):
+        matched = self.matched_keywords
+        for keyword in keywords:
+            if keyword not in matched:
+                matched.append(keyword)
+
+
+class ConversationIndex:
+    """Kept inbox messages grouped into ``Conversation`` rows by thread.
+
+    Conversations keep the order their first message came in, so rows of
+    equal priority keep the input order.  Memory grows with the number of
+    threads that have kept mail; each holds only its newest record.
+
+    With ``duplicates`` (a ``dedup.DuplicateIndex``), a message that would
+    start a new conversation is first looked up there; if it duplicates an
+    earlier conversation it is folded into that one, and so is the rest of
+    its thread.  With only ``fingerprint`` set, new conversations are just
+    stamped with their first message's fingerprint and folded by ``merge``
+    (this is how pool workers run, see ``parallel.py``).
+    """
+
+    def __init__(self, duplicates=None):
+        self._threads = {}
+        self.duplicates = duplicates
+        self.fingerprint = duplicates.fingerprint if duplicates is not None else None
+        # Thread keys folded into another conversation as duplicates
+        self._aliases = {}
+        # Kept messages folded in, over all threads
+        self.messages = 0
+
+    def __len__(self):
+        return len(self._threads)
+
+    def __iter__(self):
+        return iter(self._threads.values())
+
+    def items(self):
+        return self._threads.items()
+
+    def _resolve(self, key):
+        aliases = self._aliases
+        while key in aliases:
+            key = aliases[key]
+        return key
+
+    def _duplicated(self, key, fp):
+        # The conversation ``fp`` duplicates, filing ``key`` under it; or None
+        canonical = self.duplicates.file(fp, key)
+        if canonical is None:
+            return None
+        if isinstance(key, str):
+            self._aliases[key] = canonical
+        return self._threads[canonical]
+
+    def add(self, email_data, priority):
+        self.messages += 1
+        # A message with neither key is a thread of its own
+        key = conversation_key(email_data.thread_keys) or email_data
+        if self._aliases:
+            key = self._resolve(key)
+        thread = self._threads.get(key)
+        if thread is not None:
+            thread.add(email_data, priority)
+            return
+        fp = None
+        if self.fingerprint is not None:
+            fp = self.fingerprint(email_data)
+            if self.duplicates is None:
+                fp.complete()
+            else:
+                original = self._duplicated(key, fp)
+                if original is not None:
+                    original.add(email_data, priority, duplicate=True)
+                    return
+        self._threads[key] = Conversation(email_data, priority, fp)
+
+    def partial(self):
+        """The conversations and duplicate aliases, for ``merge``."""
+        return list(self._threads.items()), list(self._aliases.items())
+
+    def merge(self, partial):
+        """Fold in the ``partial()`` of another index, e.g. from a worker.
+
+        Its conversations are deduplicated against this index's, in order,
+        by their first message; for an index that only fingerprinted (a
+        pool worker's) that gives the same rows as adding every message
+        here.
+        """
+        items, aliases = partial
+        threads = self._threads
+        for key, other in items:
+            self.messages += other.count
+            if self._aliases:
+                key = self._resolve(key)
+            thread = threads.get(key)
+            if thread is not None:
+                thread.merge(other)
+                continue
+            if self.duplicates is not None and other.fingerprint is not None:
+                original = self._duplicated(key, other.fingerprint)
+                if original is not None:
+                    original.merge(other, duplicate=True)
+                    continue
+            threads[key] = other
+        for key, canonical in aliases:
+            # A thread this index already has keeps its own row
+            if key not in threads:
+                self._aliases.setdefault(key, canonical)
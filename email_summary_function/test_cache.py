@@ -0,0 +1,56 @@
+"""A cached report must be the report the request would have rendered.
+
+    python test_cache.py      (or: python -m pytest test_cache.py)
+"""
+import json
+import os
+import tempfile
+
+from shared_code import cache, pipeline
+
+BODY = json.dumps({'inbox': [{'subject': 'Urgent: budget', 'receivedDateTime': '2020-01-01T00:00:00Z',
+                              'from': 'cfo@example.com'}],
+                   'sent': [{'subject': 'Contract', 'sentDateTime': '2020-01-01T00:00:00Z'}]})
+
+
+def check_hit_equals_miss(settings):
+    pipeline.get_response_cache(settings).clear()
+    miss = pipeline.handle_emails(BODY, {'format': 'json'}, settings)
+    hit = pipeline.handle_emails(f"\n {BODY} \n", {'format': 'json'}, settings)
+    assert (miss.headers['X-Email-Summary-Cache'], hit.headers['X-Email-Summary-Cache']) == ('miss', 'hit')
+    assert hit.body == miss.body and hit.headers['Content-Type'] == miss.headers['Content-Type']
+    # Anything else the report depends on is part of the key
+    for params in ({'format': 'text'}, {'format': 'json', 'mailbox': 'someone'}):
+        assert pipeline.handle_emails(BODY, params, settings).headers['X-Email-Summary-Cache'] == 'miss', params
+    other = BODY.replace('Contract', 'Renewal')
+    assert pipeline.handle_emails(other, {'format': 'json'}, settings).headers['X-Email-Summary-Cache'] == 'miss'
+
+
+def test_memory_cache():
+    check_hit_equals_miss(pipeline.settings_from_env({'EMAIL_SUMMARY_RESPONSE_CACHE': 'memory'}))
+
+
+def test_sqlite_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = pipeline.settings_from_env({'EMAIL_SUMMARY_RESPONSE_CACHE': os.path.join(tmp, 'responses.db')})
+        try:
+            check_hit_equals_miss(settings)
+        finally:
+            pipeline.get_response_cache(settings).close()
+
+
+def test_entries_and_ttl():
+    memory = cache.MemoryCache(max_entries=2, ttl=60)
+    for key in ('a', 'b', 'c'):
+        memory.put(key, key.upper(), {})
+    assert memory.get('a') is None and memory.get('c') == ('C', {})
+    memory.ttl = -1
+    assert memory.get('c') is None
+    assert not cache.is_enabled('off') and not cache.is_enabled('') and cache.is_enabled('memory')
+
+
+if __name__ == "__main__":
+    test_memory_cache()
+    test_sqlite_cache()
+    test_entries_and_ttl()
+    print("ok")
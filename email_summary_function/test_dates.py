@@ -0,0 +1,59 @@
+"""parse_timestamp gives the same epoch seconds on every path.
+
+    python test_dates.py      (or: python -m pytest test_dates.py)
+"""
+from benchmarks import synthetic
+from shared_code import dates
+from shared_code.dates import parse_timestamp, try_parse_timestamp
+
+EXPECTED = {
+    '2025-06-20T10:30:00Z': 1750415400,
+    '2025-06-20T10:30:00.1234567Z': 1750415400.123456,
+    '2025-06-20T10:30:00.5+00:00': 1750415400.5,
+    '2025-06-20T10:30:00+05:30': 1750395600,
+    '2025-06-20T10:30:00-07:00': 1750440600,
+    '2025-06-20T10:30:00': 1750415400,
+    '2025-06-20 10:30:00z': 1750415400,
+    ' 2025-06-20t10:30:00Z ': 1750415400,
+    'Fri, 20 Jun 2025 10:30:00 +0000': 1750415400,
+    'Fri, 20 Jun 2025 16:00:00 +0530': 1750415400,
+    '9999-12-31T23:00:00-05:00': 253402315200,
+}
+INVALID = ['', 'not a date', '2025-13-01T00:00:00Z', '2025-06-20T24:00:00Z', None, ['2025-06-20T10:30:00Z']]
+
+
+def check_expected():
+    for value, expected in EXPECTED.items():
+        assert abs(parse_timestamp(value) - expected) < 1e-6, (value, parse_timestamp(value), expected)
+    for value in INVALID:
+        assert try_parse_timestamp(value) is None, value
+
+
+def test_expected_timestamps():
+    check_expected()
+
+
+def test_before_python_3_11():
+    # The rewrite of Z and long fractions that older fromisoformat needs
+    reads_graph = dates._ISOFORMAT_READS_GRAPH
+    dates._ISOFORMAT_READS_GRAPH = False
+    try:
+        check_expected()
+        assert dates._parse_isoformat('2025-06-20T10:30:00.1234567Z') == EXPECTED['2025-06-20T10:30:00.1234567Z']
+    finally:
+        dates._ISOFORMAT_READS_GRAPH = reads_graph
+
+
+def test_same_as_the_slicer():
+    for email in synthetic.iter_folder('inbox', 5000, 7):
+        value = email.get('receivedDateTime', '')
+        sliced = dates._parse_iso(value) if isinstance(value, str) and value else None
+        if sliced is not None:
+            assert abs(parse_timestamp(value) - sliced) < 1e-6, value
+
+
+if __name__ == "__main__":
+    test_expected_timestamps()
+    test_before_python_3_11()
+    test_same_as_the_slicer()
+    print("ok")
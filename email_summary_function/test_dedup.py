@@ -0,0 +1,63 @@
+"""Repeated alerts fold into one inbox row; different mail does not.
+
+    python test_dedup.py      (or: python -m pytest test_dedup.py)
+"""
+from datetime import datetime, timezone
+
+from shared_code.classify import Classifier
+from shared_code.dedup import distance, simhash
+from shared_code.rules import RuleSet, default_rules
+
+NOW = datetime(2020, 2, 1, tzinfo=timezone.utc)
+
+
+def alert(number, copy=0, sender='ci@builds.example.com', subject='Urgent: build {} failed',
+          preview='Job {} failed on main'):
+    # Every notification comes in a conversation of its own
+    return ('inbox', {'conversationId': f"c{number}-{copy}-{sender}", 'subject': subject.format(number),
+                      'bodyPreview': preview.format(number), 'from': sender,
+                      'receivedDateTime': f"2020-01-{number % 28 + 1:02d}T00:00:00Z"})
+
+
+MAILBOX = [
+    alert(1), alert(1, 1), alert(1, 2),
+    alert(2), alert(3),
+    alert(1, sender='ops@example.com'),
+    alert(4, subject='Urgent: quarterly budget review', preview='Please send the numbers before Friday'),
+]
+
+
+def rows(dedup, emails=MAILBOX):
+    config = default_rules().config
+    classifier = Classifier(RuleSet(dict(config, dedup=dedup)), now=NOW).feed(emails)
+    return sorted((c.latest.sender_email, c.count, c.duplicates) for c in classifier.important_inbox)
+
+
+def test_simhash():
+    assert simhash('build 123 failed on main') == simhash('build 456 failed on main')
+    assert distance(simhash('the quick brown fox jumps'), simhash('the quick brown fox jumps')) == 0
+    assert distance(simhash('build failed on main'), simhash('please send the budget numbers')) > 3
+    assert simhash('') == 0
+
+
+def test_off_exact_and_near():
+    assert rows('off') == sorted([('ci@builds.example.com', 1, 0)] * 6 + [('ops@example.com', 1, 0)])
+    # Exact copies fold; other build numbers and other senders do not
+    assert rows('exact') == sorted([('ci@builds.example.com', 3, 2), ('ci@builds.example.com', 1, 0),
+                                    ('ci@builds.example.com', 1, 0), ('ci@builds.example.com', 1, 0),
+                                    ('ops@example.com', 1, 0)])
+    # Numbers do not count for near duplicates; the unrelated mail still has its own row
+    assert rows('near') == sorted([('ci@builds.example.com', 5, 4), ('ci@builds.example.com', 1, 0),
+                                   ('ops@example.com', 1, 0)])
+
+
+def test_order_does_not_change_the_counts():
+    for dedup in ('exact', 'near'):
+        assert rows(dedup, MAILBOX[::-1]) == rows(dedup), dedup
+
+
+if __name__ == "__main__":
+    test_simhash()
+    test_off_exact_and_near()
+    test_order_does_not_change_the_counts()
+    print("ok")
@@ -0,0 +1,56 @@
+"""Digest counts, including dates a datetime cannot show.
+
+    python test_digest.py      (or: python -m pytest test_digest.py)
+"""
+import json
+import logging
+
+from shared_code import pipeline, renderers
+from shared_code.digest import Digest
+from shared_code.records import EmailRecord
+
+SETTINGS = pipeline.settings_from_env({'EMAIL_SUMMARY_RESPONSE_CACHE': 'off'})
+
+# Parse, but fall before year 1 or after year 9999 in UTC
+OUT_OF_RANGE = ['9999-12-31T23:00:00-05:00', '0001-01-01T00:00:00+05:00', 'Fri, 31 Dec 9999 23:00:00 -0500',
+                1e20, -1e20, float('inf'), float('nan')]
+
+
+def record(timestamp):
+    return EmailRecord('inbox', 'Urgent', '', sender_email='boss@example.com', matched_keywords=['urgent'], timestamp=timestamp)
+
+
+def test_days_and_hours():
+    digest = Digest()
+    for timestamp in (0, 3600 * 25, 3600 * 26, None):
+        digest.add_inbox(record(timestamp))
+    assert digest.daily() == [('1970-01-01', 1), ('1970-01-02', 2)]
+    assert digest.hours[0] == 1 and digest.hours[1] == 1 and digest.hours[2] == 1
+    assert digest.undated == 1 and digest.messages == 4
+
+
+def test_out_of_range_dates_count_as_undated():
+    digest = Digest()
+    for timestamp in (float('inf'), float('nan'), 1e20, -1e20, 253402300800.0, -62135596801.0):
+        digest.add_inbox(record(timestamp))
+    assert digest.undated == 6 and digest.daily() == []
+    digest.add_inbox(record(253402300799.0))
+    digest.add_inbox(record(-62135596800.0))
+    assert digest.daily() == [('0001-01-01', 1), ('9999-12-31', 1)]
+
+
+def test_out_of_range_dates_in_a_request():
+    logging.disable(logging.WARNING)
+    for date in OUT_OF_RANGE:
+        email = {'subject': 'Urgent', 'receivedDateTime': date, 'from': 'boss@example.com'}
+        for name in renderers.RENDERERS:
+            response = pipeline.handle_emails(json.dumps({'inbox': [email]}), {'format': name}, SETTINGS)
+            assert response.status_code == 200, (date, name, response.body)
+    logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    test_days_and_hours()
+    test_out_of_range_dates_count_as_undated()
+    test_out_of_range_dates_in_a_request()
+    print("ok")
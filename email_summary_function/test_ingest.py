@@ -0,0 +1,32 @@
+"""Streaming ingestion must give the same emails for every chunk size.
+
+    python test_ingest.py      (or: python -m pytest test_ingest.py)
+"""
+import json
+
+from shared_code import ingest
+
+# Raw JSON, so the numbers keep their spelling: a chunk boundary after '.'
+# or inside an exponent cuts them into a shorter valid number ("1." -> 1)
+PAYLOADS = [
+    '{"inbox": [1.5e10]}',
+    '{"inbox": [1.5e10, -2.25E-3, 0.5, 10, -7, 3e0, 1E5], "sent": [7E+1, 0.125, 6.02e+23]}',
+    '{"inbox":[{"subject":"Budget","score":12.75,"size":1.0e6,"ratio":-4.5e-7,"count":1024}],'
+    '"sent":[{"sentDateTime":"2025-06-17T14:00:00Z","weight":2.5E2}]}',
+    '{"sent": [[1.25, 2e-2, [3.5e+3]]], "inbox": [100000, 0.0, -0e0]}',
+]
+
+
+def test_every_chunk_size():
+    for text in PAYLOADS:
+        payload = json.loads(text)
+        # Emails come out in the order their folders appear in the document
+        want = [(folder, email) for folder in payload for email in payload[folder]]
+        for chunk_size in range(1, len(text) + 1):
+            got = list(ingest.iter_emails(text.encode('utf-8'), chunk_size))
+            assert got == want, f"chunk size {chunk_size}: {got!r} != {want!r}"
+
+
+if __name__ == "__main__":
+    test_every_chunk_size()
+    print("ok")
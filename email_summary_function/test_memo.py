@@ -0,0 +1,63 @@
+"""The classification memo must not change what a request returns.
+
+    python test_memo.py      (or: python -m pytest test_memo.py)
+"""
+import json
+import logging
+
+from benchmarks import synthetic
+from shared_code import pipeline
+from shared_code.classify import Classifier
+from shared_code.memo import ClassificationMemo, memo_key
+from shared_code.rules import default_rules
+
+SETTINGS = pipeline.settings_from_env({'EMAIL_SUMMARY_RESPONSE_CACHE': 'off', 'EMAIL_SUMMARY_MEMO_ENTRIES': '1000'})
+
+
+def report(classifier):
+    return ([(c.latest.subject, c.latest.date, c.latest.nav_link, c.count) for c in classifier.important_inbox],
+            [(e.subject, e.nav_link) for e in classifier.vip_emails_needing_reply],
+            [(e.subject, e.recipients) for e in classifier.old_sent_emails])
+
+
+def test_warm_memo_gives_the_same_report():
+    # The synthetic mailboxes have broken dates on purpose
+    logging.disable(logging.WARNING)
+    rules = default_rules()
+    emails = list(synthetic.iter_mailbox(2000, 3))
+    expected = report(Classifier(rules, now=synthetic.REFERENCE_NOW).feed(emails))
+    memo = ClassificationMemo()
+    for _ in range(2):
+        classifier = Classifier(rules, now=synthetic.REFERENCE_NOW, memo=memo).feed(emails)
+        assert report(classifier) == expected
+    assert classifier.memo_hits
+    logging.disable(logging.NOTSET)
+
+
+def test_ids_that_cannot_key_the_memo():
+    assert memo_key({'id': ['a'], 'internetMessageId': '<m@x>'}) == '<m@x>'
+    assert memo_key({'id': {'a': 1}, 'internetMessageId': [1]}) is None
+    assert memo_key({'id': True}) is None
+    for value in (['a'], {'a': 1}):
+        email = {'id': value, 'internetMessageId': value, 'subject': 'Urgent', 'receivedDateTime': '2020-01-01T00:00:00Z'}
+        response = pipeline.handle_emails(json.dumps({'inbox': [email]}), {}, SETTINGS)
+        assert response.status_code == 200, response.body
+
+
+def test_one_message_in_two_mailboxes():
+    # Same internetMessageId, each mailbox with its own copy and link
+    email = {'internetMessageId': '<shared@example.com>', 'subject': 'Urgent: budget', 'bodyPreview': 'see attached',
+             'receivedDateTime': '2020-01-01T00:00:00Z', 'from': 'cfo@example.com'}
+    for mailbox in ('alice', 'bob', 'alice'):
+        copy = dict(email, webLink=f"https://outlook.office.com/owa/{mailbox}",
+                    receivedDateTime=f"2020-01-0{len(mailbox)}T00:00:00Z")
+        response = pipeline.handle_emails(json.dumps({'inbox': [copy]}), {'mailbox': mailbox, 'format': 'json'}, SETTINGS)
+        row, = json.loads(response.body)['inbox']
+        assert row['link'] == copy['webLink'] and row['received'] == copy['receivedDateTime'], row
+
+
+if __name__ == "__main__":
+    test_warm_memo_gives_the_same_report()
+    test_ids_that_cannot_key_the_memo()
+    test_one_message_in_two_mailboxes()
+    print("ok")
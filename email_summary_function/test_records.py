@@ -0,0 +1,47 @@
+"""Bad field values in one email must not fail the whole report.
+
+    python test_records.py      (or: python -m pytest test_records.py)
+"""
+import json
+
+from shared_code import pipeline, renderers
+
+SETTINGS = pipeline.settings_from_env({'EMAIL_SUMMARY_RESPONSE_CACHE': 'off'})
+
+# Kept emails (an old sent email, an overdue VIP one) whose preview or date is not a string
+PAYLOADS = [
+    {'sent': [{'sentDateTime': '2020-01-01T00:00:00Z', 'bodyPreview': None}]},
+    {'sent': [{'sentDateTime': '2020-01-01T00:00:00Z', 'bodyPreview': 42}]},
+    {'inbox': [{'subject': 'Urgent', 'receivedDateTime': '2020-01-01T00:00:00Z', 'bodyPreview': None,
+                'from': {'emailAddress': {'name': 'Sahithi N', 'address': 'sahithin@kensium.com'}}}]},
+    {'inbox': [{'subject': 'Urgent', 'receivedDateTime': '2020-01-01T00:00:00Z', 'bodyPreview': 7,
+                'from': 'sahithin@kensium.com'}]},
+    {'inbox': [{'subject': 'Urgent', 'receivedDateTime': ['2020-01-01T00:00:00Z'], 'from': 'sahithin@kensium.com'}]},
+    {'inbox': [{'subject': 'Urgent', 'receivedDateTime': {'dateTime': '2020-01-01'}, 'from': 'sahithin@kensium.com'}]},
+]
+
+
+def test_fields_that_are_not_strings():
+    for payload in PAYLOADS:
+        for name in renderers.RENDERERS:
+            response = pipeline.handle_emails(json.dumps(payload), {'format': name}, SETTINGS)
+            assert response.status_code == 200, (payload, name, response.body)
+
+
+def test_recipients_whatever_the_first_email():
+    # The first email picks the input adapter; the others must not depend on it
+    graph = {'sentDateTime': '2020-01-01T00:00:00Z', 'from': {'emailAddress': {'address': 'me@example.com'}},
+             'toRecipients': [{'emailAddress': {'name': 'Ann', 'address': 'ann@example.com'}}]}
+    flat = {'sentDateTime': '2020-01-02T00:00:00Z', 'from': 'me@example.com',
+            'toRecipients': 'bob@example.com; carol@example.com'}
+    bare = {'sentDateTime': '2020-01-03T00:00:00Z', 'toRecipients': 'dave@example.com'}
+    want = {'Ann', 'bob@example.com, carol@example.com', 'dave@example.com'}
+    for order in ([graph, flat, bare], [flat, graph, bare], [bare, graph, flat]):
+        response = pipeline.handle_emails(json.dumps({'sent': order}), {'format': 'json'}, SETTINGS)
+        assert {row['recipients'] for row in json.loads(response.body)['follow_ups']} == want, order
+
+
+if __name__ == "__main__":
+    test_fields_that_are_not_strings()
+    test_recipients_whatever_the_first_email()
+    print("ok")
@@ -0,0 +1,53 @@
+"""Format negotiation and the formats a request gets.
+
+    python test_renderers.py      (or: python -m pytest test_renderers.py)
+"""
+import json
+
+from shared_code import pipeline, renderers
+from shared_code.renderers import NotAcceptable, negotiate
+
+SETTINGS = pipeline.settings_from_env({'EMAIL_SUMMARY_RESPONSE_CACHE': 'off'})
+BODY = json.dumps({'inbox': [{'subject': 'Urgent: budget', 'receivedDateTime': '2020-01-01T00:00:00Z',
+                              'from': 'cfo@example.com'}]})
+
+
+def test_negotiate():
+    assert negotiate() == ('html',)
+    assert negotiate('JSON, text,json') == ('json', 'text')
+    assert negotiate('text', 'application/json') == ('text',)
+    assert negotiate(None, 'application/json') == ('json',)
+    assert negotiate(None, 'text/plain;q=0.5, application/json;q=0.9') == ('json',)
+    assert negotiate(None, 'text/*') == ('html',)
+    assert negotiate(None, '*/*') == ('html',)
+    # Nothing that can be produced: the page, as before formats were negotiated
+    assert negotiate(None, 'application/xml') == ('html',)
+    assert negotiate(None, 'application/json;q=0') == ('html',)
+    for format_param in ('xml', 'json,xml', ' , '):
+        try:
+            negotiate(format_param)
+        except NotAcceptable:
+            pass
+        else:
+            raise AssertionError(format_param)
+
+
+def test_request_formats():
+    response = pipeline.handle_emails(BODY, {}, SETTINGS, {'Accept': 'application/xml'})
+    assert response.status_code == 200 and response.body.lstrip().startswith('<!DOCTYPE html>'), response.body[:80]
+    assert pipeline.handle_emails(BODY, {'format': 'xml'}, SETTINGS).status_code == 406
+    for name in renderers.RENDERERS:
+        response = pipeline.handle_emails(BODY, {'format': name}, SETTINGS)
+        assert response.status_code == 200, name
+        # The digest has counts only, no rows
+        assert name == 'digest' or 'Urgent: budget' in response.body, name
+    both = json.loads(pipeline.handle_emails(BODY, {'format': 'json,text'}, SETTINGS).body)
+    alone = json.loads(pipeline.handle_emails(BODY, {'format': 'json'}, SETTINGS).body)
+    assert set(both) == {'json', 'text'}
+    assert dict(both['json'], generated=None) == dict(alone, generated=None)
+
+
+if __name__ == "__main__":
+    test_negotiate()
+    test_request_formats()
+    print("ok")
@@ -0,0 +1,49 @@
+"""An incremental run must render the report a full run renders.
+
+    python test_state.py      (or: python -m pytest test_state.py)
+"""
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from benchmarks import synthetic
+from shared_code import pipeline
+
+
+def report(settings, inbox, sent, params):
+    response = pipeline.handle_emails(json.dumps({'inbox': inbox, 'sent': sent}), dict(params, format='json'), settings)
+    assert response.status_code == 200, response.body
+    document = json.loads(response.body)
+    document.pop('generated')
+    return document
+
+
+def test_incremental_runs_match_a_full_run():
+    # The synthetic mailboxes have broken dates on purpose
+    logging.disable(logging.WARNING)
+    payload = json.loads(synthetic.make_payload(600, 7, now=datetime.now(timezone.utc)))
+    inbox, sent = payload['inbox'], payload['sent']
+    full = report(pipeline.settings_from_env({'EMAIL_SUMMARY_RESPONSE_CACHE': 'off'}), inbox, sent, {})
+    cuts = {'same payload': lambda emails: emails,
+            'older half first': lambda emails: emails[len(emails) // 2:],
+            'newer half first': lambda emails: emails[:len(emails) // 2]}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, cut in cuts.items():
+            path = os.path.join(tmp, f"{name}.db")
+            settings = pipeline.settings_from_env({'EMAIL_SUMMARY_RESPONSE_CACHE': 'off', 'EMAIL_SUMMARY_STATE_DB': path})
+            try:
+                report(settings, cut(inbox), cut(sent), {'mailbox': 'mb'})
+                assert report(settings, inbox, sent, {'mailbox': 'mb'}) == full, name
+                # A run with nothing new reads every row from the state
+                assert report(settings, inbox, sent, {'mailbox': 'mb'}) == full, name
+                assert report(settings, inbox, sent, {'mailbox': 'other'}) == full, name
+            finally:
+                pipeline._state_stores.pop(path).close()
+    logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    test_incremental_runs_match_a_full_run()
+    print("ok")
@@ -0,0 +1,64 @@
+"""Reply detection: a sent email only needs a follow-up if nothing came back.
+
+    python test_threads.py      (or: python -m pytest test_threads.py)
+"""
+from datetime import datetime, timezone
+
+from shared_code.classify import Classifier
+from shared_code.rules import default_rules
+from shared_code.threads import ThreadIndex, normalize_subject, thread_keys
+
+NOW = datetime(2020, 2, 1, tzinfo=timezone.utc)
+
+SENT = [
+    {'subject': 'Answered in its conversation', 'conversationId': 'c1', 'sentDateTime': '2020-01-10T09:00:00Z'},
+    {'subject': 'Budget', 'sentDateTime': '2020-01-10T09:00:00Z'},
+    {'subject': 'Answered before it was sent', 'conversationId': 'c3', 'sentDateTime': '2020-01-10T09:00:00Z'},
+    {'subject': 'Answered from another client', 'conversationId': 'c4', 'sentDateTime': '2020-01-10T09:00:00Z'},
+    {'subject': 'Never answered', 'conversationId': 'c6', 'sentDateTime': '2020-01-10T09:00:00Z'},
+    {'subject': 'Too recent to chase', 'conversationId': 'c5', 'sentDateTime': '2020-01-31T12:00:00Z'},
+]
+INBOX = [
+    {'subject': 'RE: Answered in its conversation', 'conversationId': 'c1', 'receivedDateTime': '2020-01-11T09:00:00Z'},
+    {'subject': 'Fw: RE:  budget', 'receivedDateTime': '2020-01-12T09:00:00Z'},
+    {'subject': 'RE: Answered before it was sent', 'conversationId': 'c3', 'receivedDateTime': '2020-01-09T09:00:00Z'},
+    # Nothing came in under c4, so the subject decides
+    {'subject': 'RE: Answered from another client', 'conversationId': 'c9', 'receivedDateTime': '2020-01-11T09:00:00Z'},
+]
+FOLLOW_UPS = ['Answered before it was sent', 'Never answered']
+
+
+def follow_ups(emails):
+    classifier = Classifier(default_rules(), now=NOW).feed(emails)
+    return sorted(email_data.subject for email_data in classifier.old_sent_emails)
+
+
+def test_keys():
+    assert normalize_subject('RE: Fw:  Re[2]:  The  Budget ') == 'the budget'
+    assert thread_keys({'conversationId': 'c1', 'subject': 'RE: x'}) == ('c:c1', 's:x')
+    assert thread_keys({}) == ('', '')
+
+
+def test_latest_inbound_prefers_the_conversation():
+    threads = ThreadIndex()
+    threads.add_inbound(('c:a', 's:x'), 10)
+    threads.add_inbound(('', 's:x'), 30)
+    assert threads.latest_inbound(('c:a', 's:x')) == 10
+    assert threads.latest_inbound(('c:b', 's:x')) == 30
+    assert threads.has_reply_after(('', 's:x'), 20) and not threads.has_reply_after(('c:a', 's:x'), 20)
+
+
+def test_follow_ups_in_either_order():
+    sent = [('sent', email) for email in SENT]
+    inbox = [('inbox', email) for email in INBOX]
+    # A reply later in the payload still rules a sent email out
+    assert follow_ups(sent + inbox) == FOLLOW_UPS
+    assert follow_ups(inbox + sent) == FOLLOW_UPS
+    assert follow_ups(sent) == sorted(email['subject'] for email in SENT[:5])
+
+
+if __name__ == "__main__":
+    test_keys()
+    test_latest_inbound_prefers_the_conversation()
+    test_follow_ups_in_either_order()
+    print("ok")